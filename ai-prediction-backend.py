@@ -2,7 +2,10 @@ import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 import json
+import joblib
 import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
 from typing import Dict, List, Tuple, Union, Optional
 
 # Forecasting models
@@ -11,11 +14,12 @@ from statsmodels.tsa.arima.model import ARIMA
 from tensorflow.keras.models import Sequential
 from tensorflow.keras.layers import LSTM, Dense
 from sklearn.preprocessing import MinMaxScaler
+from numpy.lib.stride_tricks import sliding_window_view
 
 # ML models for classification/regression
 from xgboost import XGBClassifier, XGBRegressor
 from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
-from sklearn.linear_model import LinearRegression, LogisticRegression
+from sklearn.linear_model import LinearRegression, LogisticRegression, SGDClassifier, SGDRegressor
 
 # Model explanation tools
 import shap
@@ -25,6 +29,14 @@ import lime.lime_tabular
 # Model drift detection
 from scipy.stats import ks_2samp
 import numpy as np
+from drift_engine import DriftEngine, ReferenceProfile
+from model_sweep import expand_search_space, run_sweep, seeded_config
+from panel_forecasting import forecast_panel
+from reference_store import ReferenceStore
+from batch_explanations import explain_batch, mean_abs_importance, row_explanations, shap_matrix
+from forecast_service import ForecastService, infer_frequency
+from artifact_bundle import ArtifactBundle, write_bundle
+from feature_schema import FeatureSchema, input_dtype, numeric_only
 
 # Setup logging
 logging.basicConfig(
@@ -36,10 +48,21 @@ logger = logging.getLogger(__name__)
 class ModelFactory:
     """Factory for creating and managing different types of predictive models."""
     
-    def __init__(self):
+    def __init__(self, reference_sample_size: int = 2000, reference_spill_dir: Optional[str] = None,
+                 prebuild_explainers: bool = False, forecast_cache_bytes: int = 64 * 2**20):
         self.models = {}
+        # Explainers (and surrogate models) are built on first use and cached here
         self.explainers = {}
-        self.training_data = {}
+        self.prebuild_explainers_on_create = prebuild_explainers
+        self._explainer_locks = {}
+        self._explainer_locks_guard = threading.Lock()
+        self._prebuild_executor = None
+        # Bundles models were loaded from, so saved explainers are read only when first used
+        self._bundles = {}
+        # Bounded samples, sketches and histograms of each training set, instead of full copies
+        self.reference_store = ReferenceStore(sample_size=reference_sample_size, spill_dir=reference_spill_dir)
+        # Forecast windows beyond the training horizon, extended from the fitted state on demand
+        self.forecast_service = ForecastService(self._forecast_lstm_batch, max_bytes=forecast_cache_bytes)
         self.feature_names = {}
         self.model_metrics = {}
         self.drift_metrics = {}
@@ -69,8 +92,9 @@ class ModelFactory:
         if config is None:
             config = {}
             
-        # Store training data for drift detection
-        self.training_data[model_id] = data.copy()
+        # Summarize training data for drift detection
+        self.reference_store.add(model_id, data)
+        self.drift_metrics.pop(model_id, None)
         
         # Extract features for explanation
         if model_type == 'prophet':
@@ -81,8 +105,9 @@ class ModelFactory:
             model = Prophet(**config)
             model.fit(df)
             
-            # Make forecast
-            future = model.make_future_dataframe(periods=forecast_periods)
+            # Make forecast, continuing the history's frequency
+            freq = infer_frequency(model.history_dates)
+            future = model.make_future_dataframe(periods=forecast_periods, freq=freq)
             forecast = model.predict(future)
             
             # Store model and metadata
@@ -90,20 +115,18 @@ class ModelFactory:
                 'model': model,
                 'type': model_type,
                 'forecast': forecast,
+                'config': config,
+                'target_col': target_col,
+                'date_col': date_col,
+                'freq': freq,
+                'forecast_periods': forecast_periods,
                 'last_trained': datetime.now().isoformat()
             }
             
-            # Extract feature names for Prophet (add decomposition components)
-            self.feature_names[model_id] = ['trend', 'yearly', 'weekly', 'daily']
-            
-            # Create SHAP explainer (using trend and seasonality components)
-            components = model.predict(df[['ds']])
-            feature_df = components[['trend', 'yearly', 'weekly', 'daily']]
-            explainer = shap.Explainer(feature_df.values)
-            self.explainers[model_id] = {
-                'shap': explainer,
-                'lime': None  # Prophet doesn't work well with LIME
-            }
+            # Extract feature names for Prophet (trend plus the seasonalities it fitted)
+            self.feature_names[model_id] = ['trend'] + [
+                name for name in ('yearly', 'weekly', 'daily') if name in model.seasonalities
+            ]
             
         elif model_type == 'arima':
             # Prepare data for ARIMA
@@ -125,36 +148,57 @@ class ModelFactory:
                 'model': model_fit,
                 'type': model_type,
                 'forecast': forecast,
+                'config': config,
+                'target_col': target_col,
+                'date_col': date_col,
+                'last_date': pd.Timestamp(data[date_col].max()),
+                'freq': infer_frequency(data[date_col]),
+                'forecast_periods': forecast_periods,
                 'last_trained': datetime.now().isoformat()
             }
             
-            # ARIMA doesn't have explicit features for SHAP, so we'll use lag features
-            X = self._create_lag_features(series, lags=[1, 2, 3, 4, 5, 12])
-            self.feature_names[model_id] = X.columns.tolist()
-            
-            # Create a surrogate model for explanation
-            surrogate = XGBRegressor()
-            surrogate.fit(X, series[X.index])
-            
-            # Create SHAP explainer using surrogate model
-            explainer = shap.Explainer(surrogate)
-            self.explainers[model_id] = {
-                'shap': explainer,
-                'lime': lime.lime_tabular.LimeTabularExplainer(
-                    X.values, feature_names=X.columns.tolist(), mode='regression'
-                )
-            }
+            # ARIMA doesn't have explicit features for SHAP, so it is explained through
+            # a surrogate on lag features, built on first use
+            self.models[model_id]['lags'] = [1, 2, 3, 4, 5, 12]
+            self.feature_names[model_id] = [f'lag_{lag}' for lag in self.models[model_id]['lags']]
             
         elif model_type == 'lstm':
             # Prepare data for LSTM
             sequence_length = config.get('sequence_length', 10)
+            series_col = config.get('series_col')
             
-            # Scale the data
-            scaler = MinMaxScaler()
-            scaled_data = scaler.fit_transform(data[[target_col]])
-            
-            # Create sequences
-            X, y = self._create_sequences(scaled_data, sequence_length)
+            if series_col is None:
+                # Scale the data
+                scaler = MinMaxScaler()
+                scaled_data = scaler.fit_transform(data[[target_col]])
+                series_ids = None
+                series_min = np.array([scaler.data_min_[0]])
+                series_scale = np.array([scaler.data_range_[0] or 1.0])
+                last_windows = scaled_data[-sequence_length:].reshape(1, sequence_length)
+                
+                # Create sequences
+                X, y = self._create_sequences(scaled_data, sequence_length)
+            else:
+                # Long-format panel: one global model trained on every series, each min-max scaled on its own
+                scaler = None
+                panel = data.sort_values([series_col, date_col])
+                series_ids, scaled_series = [], []
+                for series_id, group in panel.groupby(series_col, sort=True):
+                    if len(group) <= sequence_length:
+                        raise ValueError(f"Series {series_id} has {len(group)} rows; LSTM needs more than {sequence_length}")
+                    series_ids.append(series_id)
+                    scaled_series.append(group[target_col].to_numpy(dtype=np.float64))
+                series_min = np.array([values.min() for values in scaled_series])
+                series_scale = np.array([values.max() for values in scaled_series]) - series_min
+                series_scale[series_scale == 0] = 1.0
+                scaled_series = [((values - lo) / sc).reshape(-1, 1)
+                                 for values, lo, sc in zip(scaled_series, series_min, series_scale)]
+                last_windows = np.stack([values[-sequence_length:, 0] for values in scaled_series])
+                
+                # Create sequences
+                sequences = [self._create_sequences(values, sequence_length) for values in scaled_series]
+                X = np.concatenate([seq_X for seq_X, _ in sequences])
+                y = np.concatenate([seq_y for _, seq_y in sequences])
             
             # Build LSTM model
             model = Sequential()
@@ -166,8 +210,14 @@ class ModelFactory:
             model.compile(optimizer='adam', loss='mean_squared_error')
             model.fit(X, y, epochs=config.get('epochs', 100), batch_size=config.get('batch_size', 32), verbose=0)
             
-            # Make forecast
-            forecast = self._forecast_lstm(model, scaled_data, sequence_length, forecast_periods, scaler)
+            # Make forecast for every series at once, one model call per step
+            scaled_forecast = self._forecast_lstm_batch(model, last_windows, forecast_periods)
+            forecast = scaled_forecast * series_scale[:, None] + series_min[:, None]
+            if series_ids is None:
+                forecast = forecast[0]
+            else:
+                forecast = pd.DataFrame(forecast, index=pd.Index(series_ids, name=series_col),
+                                        columns=pd.RangeIndex(1, forecast_periods + 1, name='step'))
             
             # Store model and metadata
             self.models[model_id] = {
@@ -176,28 +226,77 @@ class ModelFactory:
                 'forecast': forecast,
                 'scaler': scaler,
                 'sequence_length': sequence_length,
+                'series_ids': series_ids,
+                'series_min': series_min,
+                'series_scale': series_scale,
+                'last_windows': last_windows,
+                # Panels are forecast by step; each series ends on its own date
+                'last_date': pd.Timestamp(data[date_col].max()) if series_col is None else None,
+                'freq': infer_frequency(data[date_col]) if series_col is None else None,
                 'last_trained': datetime.now().isoformat()
             }
             
-            # Use lag features for explanation
-            lag_df = self._create_lag_features(data[target_col], lags=list(range(1, sequence_length + 1)))
-            self.feature_names[model_id] = lag_df.columns.tolist()
-            
-            # Create a surrogate model for explanation
-            surrogate = XGBRegressor()
-            surrogate.fit(lag_df, data.loc[lag_df.index, target_col])
-            
-            # Create SHAP explainer using surrogate model
-            explainer = shap.Explainer(surrogate)
-            self.explainers[model_id] = {
-                'shap': explainer,
-                'lime': lime.lime_tabular.LimeTabularExplainer(
-                    lag_df.values, feature_names=lag_df.columns.tolist(), mode='regression'
-                )
-            }
+            # Explained through a surrogate on lag features, built on first use
+            self.models[model_id]['lags'] = list(range(1, sequence_length + 1))
+            self.models[model_id]['explain_series'] = (
+                [data[target_col].to_numpy(dtype=np.float32)] if series_col is None else
+                [group[target_col].to_numpy(dtype=np.float32)
+                 for _, group in panel.groupby(series_col, sort=True)]
+            )
+            self.feature_names[model_id] = [f'lag_{lag}' for lag in self.models[model_id]['lags']]
         else:
             raise ValueError(f"Unsupported time series model type: {model_type}")
         
+        self._reset_explainers(model_id)
+        self.forecast_service.invalidate(model_id)
+        return self.models[model_id]
+    
+    def create_panel_forecast_model(self, model_id: str, model_type: str, data: pd.DataFrame,
+                                    series_col: str, target_col: str, date_col: str,
+                                    forecast_periods: int = 12, config: Dict = None,
+                                    chunk_size: int = 50, max_workers: Optional[int] = None) -> Dict:
+        """Fit one Prophet or ARIMA model per series of a long-format panel, in parallel.
+        
+        Only the forecasts are kept: one frame indexed by (series id, ds) with
+        yhat/yhat_lower/yhat_upper, rather than a model entry per series.
+        
+        Args:
+            model_id: Unique identifier for the panel
+            model_type: 'prophet' or 'arima'
+            data: DataFrame with one row per series and date
+            series_col: Column name of the series identifier
+            target_col: Column name of the target variable
+            date_col: Column name of the date variable
+            forecast_periods: Number of periods to forecast per series
+            config: Model-specific configuration shared by every series
+            chunk_size: Number of series per worker task
+            max_workers: Process pool size (defaults to the number of CPUs)
+            
+        Returns:
+            Dictionary containing the forecast frame, failed series and run stats
+        """
+        logger.info(f"Creating panel forecast model: {model_id} of type {model_type}")
+        
+        if model_id in self.models:
+            logger.warning(f"Model {model_id} already exists. Overwriting.")
+        
+        result = forecast_panel(data, series_col, date_col, target_col, model_type,
+                                forecast_periods, config, chunk_size=chunk_size, max_workers=max_workers)
+        if result['failures']:
+            logger.warning(f"{len(result['failures'])} series failed to fit for model {model_id}")
+        
+        self.drift_metrics.pop(model_id, None)
+        self.models[model_id] = {
+            'model': None,
+            'type': model_type,
+            'panel': True,
+            'series_col': series_col,
+            'forecast': result['forecast'],
+            'failures': result['failures'],
+            'stats': result['stats'],
+            'last_trained': datetime.now().isoformat()
+        }
+        
         return self.models[model_id]
     
     def create_classification_model(self, model_id: str, model_type: str, X: pd.DataFrame, 
@@ -206,7 +305,7 @@ class ModelFactory:
         
         Args:
             model_id: Unique identifier for the model
-            model_type: Type of classification model ('xgboost', 'random_forest', 'logistic')
+            model_type: Type of classification model ('xgboost', 'random_forest', 'logistic', 'sgd')
             X: Feature DataFrame
             y: Target variable Series
             config: Dictionary of model-specific configuration parameters
@@ -222,8 +321,7 @@ class ModelFactory:
         if config is None:
             config = {}
             
-        # Store training data for drift detection
-        self.training_data[model_id] = X.copy()
+        self.drift_metrics.pop(model_id, None)
         self.feature_names[model_id] = X.columns.tolist()
         
         # Create and train the model based on type
@@ -236,6 +334,9 @@ class ModelFactory:
         elif model_type == 'logistic':
             model = LogisticRegression(**config)
             model.fit(X, y)
+        elif model_type == 'sgd':
+            model = SGDClassifier(**{'loss': 'log_loss', **config})
+            model.fit(X, y)
         else:
             raise ValueError(f"Unsupported classification model type: {model_type}")
         
@@ -247,15 +348,10 @@ class ModelFactory:
             'last_trained': datetime.now().isoformat()
         }
         
-        # Create explainers
-        explainer = shap.Explainer(model, X)
-        self.explainers[model_id] = {
-            'shap': explainer,
-            'lime': lime.lime_tabular.LimeTabularExplainer(
-                X.values, feature_names=X.columns.tolist(), class_names=y.unique().tolist(),
-                mode='classification'
-            )
-        }
+        # Summarize training data for drift detection and explainers
+        self.reference_store.add(model_id, X, y, model.predict(X), numeric_target=False)
+        
+        self._reset_explainers(model_id)
         
         return self.models[model_id]
     
@@ -265,7 +361,7 @@ class ModelFactory:
         
         Args:
             model_id: Unique identifier for the model
-            model_type: Type of regression model ('xgboost', 'random_forest', 'linear')
+            model_type: Type of regression model ('xgboost', 'random_forest', 'linear', 'sgd')
             X: Feature DataFrame
             y: Target variable Series
             config: Dictionary of model-specific configuration parameters
@@ -281,8 +377,7 @@ class ModelFactory:
         if config is None:
             config = {}
             
-        # Store training data for drift detection
-        self.training_data[model_id] = X.copy()
+        self.drift_metrics.pop(model_id, None)
         self.feature_names[model_id] = X.columns.tolist()
         
         # Create and train the model based on type
@@ -295,6 +390,9 @@ class ModelFactory:
         elif model_type == 'linear':
             model = LinearRegression(**config)
             model.fit(X, y)
+        elif model_type == 'sgd':
+            model = SGDRegressor(**config)
+            model.fit(X, y)
         else:
             raise ValueError(f"Unsupported regression model type: {model_type}")
         
@@ -305,27 +403,251 @@ class ModelFactory:
             'task': 'regression',
             'last_trained': datetime.now().isoformat()
         }
+        if model_type == 'linear':
+            # X'X and X'y let update_model re-solve with new rows only
+            self.models[model_id]['sufficient_stats'] = self._linear_sufficient_stats(X, y)
         
-        # Create explainers
-        explainer = shap.Explainer(model, X)
-        self.explainers[model_id] = {
-            'shap': explainer,
-            'lime': lime.lime_tabular.LimeTabularExplainer(
-                X.values, feature_names=X.columns.tolist(), mode='regression'
-            )
-        }
+        # Summarize training data for drift detection and explainers
+        self.reference_store.add(model_id, X, y, model.predict(X), numeric_target=True)
+        
+        self._reset_explainers(model_id)
         
         return self.models[model_id]
     
-    def predict(self, model_id: str, X: Union[pd.DataFrame, pd.Series, None] = None) -> np.ndarray:
+    def update_model(self, model_id: str, X_new: pd.DataFrame, y_new: Optional[pd.Series] = None,
+                     config: Dict = None) -> Dict:
+        """Update a trained model with new data instead of retraining from scratch.
+        
+        The cost is proportional to the new rows for every model type except
+        Prophet, which has no incremental fit and is refit on the full history
+        warm-started from the previous parameters. Logistic regression cannot be
+        updated: refitting lbfgs on the new rows alone would forget the original
+        training data, so train an ``sgd`` (log-loss) classifier to update incrementally.
+        
+        - xgboost: boosts ``config['n_estimators']`` (default 10) more trees on the new data via ``xgb_model``
+        - random_forest: grows ``config['n_estimators']`` (default 10) more trees on the new data via ``warm_start``
+        - linear: adds the new rows to the stored X'X/X'y and re-solves the normal equations (exact)
+        - sgd: ``partial_fit`` on the new data
+        - arima: ``append(refit=False)`` updates the state with the new observations, keeping the parameters
+        - prophet: refit on history plus new data, initialized from the previous fit
+        
+        Args:
+            model_id: Identifier of the model to update
+            X_new: New feature rows, or for time series new rows with the date and target columns
+            y_new: New targets (classification/regression only)
+            config: Update options such as ``n_estimators``
+            
+        Returns:
+            Dictionary containing the model and its metadata
+        """
+        if model_id not in self.models:
+            raise ValueError(f"Model {model_id} not found")
+        if config is None:
+            config = {}
+        
+        model_info = self.models[model_id]
+        model_type = model_info['type']
+        logger.info(f"Updating model {model_id} of type {model_type} with {len(X_new)} rows")
+        
+        if 'task' not in model_info:
+            self._update_time_series_model(model_id, X_new, config)
+        else:
+            if y_new is None:
+                raise ValueError("y_new must be provided for classification/regression models")
+            X_new = X_new[self.feature_names[model_id]]
+            model = model_info['model']
+            
+            if model_type == 'xgboost':
+                updated = type(model)(**{**model.get_params(), 'n_estimators': config.get('n_estimators', 10)})
+                updated.fit(X_new, y_new, xgb_model=model.get_booster())
+                model_info['model'] = updated
+            elif model_type == 'random_forest':
+                model.set_params(warm_start=True,
+                                 n_estimators=model.n_estimators + config.get('n_estimators', 10))
+                model.fit(X_new, y_new)
+            elif model_type == 'linear':
+                stats = model_info.get('sufficient_stats')
+                if stats is None:
+                    raise ValueError(f"Model {model_id} has no sufficient statistics to update from")
+                new_stats = self._linear_sufficient_stats(X_new, y_new)
+                for key in stats:
+                    stats[key] = stats[key] + new_stats[key]
+                self._solve_linear(model, stats)
+            elif model_type == 'sgd':
+                model.partial_fit(X_new, y_new)
+            elif model_type == 'logistic':
+                raise ValueError(f"Model type {model_type} does not support incremental updates; "
+                                 "use 'sgd' for an incrementally updatable classifier")
+            else:
+                raise ValueError(f"Model type {model_type} does not support incremental updates")
+            
+            # Keep the drift reference in line with the updated model
+            self.reference_store.update(model_id, X_new, y_new, model_info['model'].predict(X_new))
+        
+        self._reset_explainers(model_id)
+        self.drift_metrics.pop(model_id, None)
+        model_info['last_trained'] = datetime.now().isoformat()
+        model_info['updates'] = model_info.get('updates', 0) + 1
+        
+        return model_info
+    
+    def _update_time_series_model(self, model_id: str, data_new: pd.DataFrame, config: Dict):
+        model_info = self.models[model_id]
+        model_type = model_info['type']
+        target_col, date_col = model_info.get('target_col'), model_info.get('date_col')
+        if target_col is None:
+            raise ValueError(f"Model {model_type} {model_id} does not support incremental updates")
+        periods = config.get('forecast_periods', model_info['forecast_periods'])
+        
+        if model_type == 'arima':
+            model_fit = model_info['model']
+            # Continue the existing index so statsmodels accepts the new observations
+            start = len(model_fit.model.endog)
+            new_values = pd.Series(data_new[target_col].to_numpy(), name=target_col,
+                                   index=pd.RangeIndex(start, start + len(data_new)))
+            model_fit = model_fit.append(new_values, refit=False)
+            model_info['model'] = model_fit
+            model_info['forecast'] = model_fit.forecast(steps=periods)
+            model_info['last_date'] = max(model_info['last_date'], pd.Timestamp(data_new[date_col].max()))
+        elif model_type == 'prophet':
+            old = model_info['model']
+            new_df = data_new[[date_col, target_col]].rename(columns={date_col: 'ds', target_col: 'y'})
+            history = pd.concat([old.history[['ds', 'y']], new_df], ignore_index=True)
+            model = Prophet(**model_info['config'])
+            model.fit(history, init=self._prophet_warm_start_params(old))
+            model_info['model'] = model
+            model_info['freq'] = infer_frequency(model.history_dates)
+            model_info['forecast'] = model.predict(model.make_future_dataframe(periods=periods, freq=model_info['freq']))
+        else:
+            raise ValueError(f"Model type {model_type} does not support incremental updates")
+        
+        model_info['forecast_periods'] = periods
+        self.reference_store.update(model_id, data_new)
+        self.forecast_service.invalidate(model_id)
+    
+    @staticmethod
+    def _prophet_warm_start_params(model) -> Dict:
+        """Fitted parameters of a Prophet model in the form ``Prophet.fit(init=...)`` expects"""
+        params = {}
+        for name in ['k', 'm', 'sigma_obs']:
+            params[name] = model.params[name][0][0]
+        for name in ['delta', 'beta']:
+            params[name] = model.params[name][0]
+        return params
+    
+    @staticmethod
+    def _linear_sufficient_stats(X: pd.DataFrame, y: pd.Series) -> Dict:
+        """X'X and X'y of the intercept-augmented design matrix"""
+        design = np.column_stack([np.ones(len(X)), np.asarray(X, dtype=np.float64)])
+        target = np.asarray(y, dtype=np.float64)
+        return {'xtx': design.T @ design, 'xty': design.T @ target}
+    
+    @staticmethod
+    def _solve_linear(model: LinearRegression, stats: Dict):
+        """Set coefficients from accumulated normal equations"""
+        xtx, xty = stats['xtx'], stats['xty']
+        if not model.fit_intercept:
+            xtx, xty = xtx[1:, 1:], xty[1:]
+        beta = np.linalg.lstsq(xtx, xty, rcond=None)[0]
+        if model.fit_intercept:
+            model.intercept_, model.coef_ = beta[0], beta[1:]
+        else:
+            model.intercept_, model.coef_ = 0.0, beta
+    
+    def sweep_models(self, model_id: str, task: str, X: pd.DataFrame, y: pd.Series,
+                     search_space: Dict[str, Dict], search: str = 'grid', n_iter: int = 20,
+                     cv: int = 5, scoring: Optional[str] = None, eta: int = 3, min_folds: int = 1,
+                     max_workers: Optional[int] = None, seed: int = 0) -> Dict:
+        """Search over model types and configs in parallel and register the best one.
+        
+        Candidates are cross-validated in a process pool with successive
+        halving: each rung scores the survivors on more folds and keeps the
+        best 1/eta of them. The winner is refit on all of ``X`` through
+        ``create_classification_model``/``create_regression_model``.
+        
+        Args:
+            model_id: Identifier to register the winning model under
+            task: 'classification' or 'regression'
+            X: Feature DataFrame
+            y: Target variable Series
+            search_space: {model_type: {param: list of values or scipy distribution}}
+            search: 'grid' or 'random'
+            n_iter: Number of candidates for random search
+            cv: Number of cross-validation folds
+            scoring: sklearn scorer name; defaults to accuracy or r2
+            eta: Halving rate for early stopping
+            min_folds: Folds every candidate is scored on before the first cut
+            max_workers: Process pool size (defaults to the number of CPUs)
+            seed: Seed for candidate sampling, folds and estimator random_state
+            
+        Returns:
+            Sweep report with per-candidate fold scores and timings
+        """
+        if task not in ('classification', 'regression'):
+            raise ValueError(f"Unsupported sweep task: {task}")
+        
+        candidates = expand_search_space(search_space, search, n_iter, seed)
+        logger.info(f"Sweeping {len(candidates)} candidates for model {model_id}")
+        report = run_sweep(task, X, y, candidates, cv=cv, scoring=scoring, eta=eta,
+                           min_folds=min_folds, max_workers=max_workers, seed=seed)
+        
+        best = report['best']
+        config = seeded_config(task, best['model_type'], best['config'], seed)
+        if task == 'classification':
+            self.create_classification_model(model_id, best['model_type'], X, y, config)
+        else:
+            self.create_regression_model(model_id, best['model_type'], X, y, config)
+        self.models[model_id]['config'] = config
+        self.model_metrics[model_id] = {'sweep': report}
+        
+        return report
+    
+    def feature_schema(self, model_id: str) -> FeatureSchema:
+        """Feature schema of a classification or regression model, for decoding request dicts.
+        
+        Args:
+            model_id: Identifier of the model
+            
+        Returns:
+            FeatureSchema in the model's training column order
+        """
+        if model_id not in self.models or 'task' not in self.models[model_id]:
+            raise ValueError(f"Classification/regression model {model_id} not found")
+        if not self.feature_names.get(model_id):
+            raise ValueError(f"Model {model_id} has no recorded feature names")
+        model = self.models[model_id]['model']
+        return FeatureSchema(self.feature_names[model_id], dtype=input_dtype(model),
+                             numeric_features=None if numeric_only(model) else ())
+    
+    def _decode_features(self, model_id: str, X):
+        """Decode a feature dict or a list of them through the model's schema; DataFrames pass through"""
+        if isinstance(X, dict):
+            schema = self.feature_schema(model_id)
+            row = schema.decode(X)
+            return schema.frame(row) if row is not None else pd.DataFrame([X], columns=schema.feature_names)
+        if isinstance(X, list) and X and isinstance(X[0], dict):
+            schema = self.feature_schema(model_id)
+            rows = schema.decode_batch(X)
+            return schema.frame(rows) if rows is not None else pd.DataFrame(X, columns=schema.feature_names)
+        return X
+    
+    def predict(self, model_id: str, X: Union[pd.DataFrame, pd.Series, Dict, List[Dict], None] = None,
+                start=None, horizon: Optional[int] = None) -> np.ndarray:
         """Make predictions using the specified model.
         
+        Time series models return their training-time forecast unless dates
+        (or integer steps) are passed as ``X``, or a ``start``/``horizon``
+        window is asked for; those are served by the forecast service.
+        
         Args:
             model_id: Identifier of the model to use
-            X: Input features or dates for prediction
+            X: Input features (a DataFrame, or request dicts decoded through feature_schema),
+                or dates/steps to forecast for time series models
+            start: First forecast step or date of a time series window
+            horizon: Number of steps of a time series window
             
         Returns:
-            Numpy array of predictions
+            Numpy array of predictions (series x step for LSTM panels)
         """
         if model_id not in self.models:
             raise ValueError(f"Model {model_id} not found")
@@ -337,23 +659,500 @@ class ModelFactory:
             # Classification or regression model
             if X is None:
                 raise ValueError("Input features X must be provided for classification/regression models")
-            return model.predict(X)
+            return model.predict(self._decode_features(model_id, X))
         else:
             # Time series model
             model_type = model_info['type']
             
-            if model_type == 'prophet':
+            if X is not None or start is not None or horizon is not None:
+                if X is None:
+                    forecast = self.forecast(model_id, start=start, horizon=horizon)
+                else:
+                    if isinstance(X, pd.DataFrame):
+                        date_col = model_info.get('date_col')
+                        X = X[date_col] if date_col in X.columns else X['ds'] if 'ds' in X.columns else X.iloc[:, 0]
+                    steps = self.forecast_service.steps_for_dates(model_info, X)
+                    first = int(steps.min())
+                    forecast = self.forecast(model_id, start=first, horizon=int(steps.max()) - first + 1).loc[steps]
+                if 'yhat' in forecast.columns:
+                    return forecast['yhat'].values
+                return forecast.to_numpy().T
+            
+            if model_info.get('panel'):
+                return model_info['forecast']['yhat'].values
+            elif model_type == 'prophet':
                 return model_info['forecast']['yhat'].values
             elif model_type == 'arima':
                 return model_info['forecast'].values
             elif model_type == 'lstm':
-                return model_info['forecast']
+                return np.asarray(model_info['forecast'])
     
-    def explain_prediction(self, model_id: str, X: pd.DataFrame, 
+    def forecast(self, model_id: str, start=None, horizon: Optional[int] = None) -> pd.DataFrame:
+        """Forecast any window of a Prophet, ARIMA or LSTM model without refitting it.
+        
+        Windows are cut from a cached forecast frame that is extended from the
+        fitted state when a query reaches past it (see forecast_service).
+        
+        Args:
+            model_id: Identifier of a time series model
+            start: First step (1 = first period after the history) or date; defaults to 1
+            horizon: Number of steps (defaults to the training forecast horizon)
+            
+        Returns:
+            DataFrame indexed by step with ds (dated models), yhat, intervals and Prophet components;
+            LSTM panels have one column per series
+        """
+        if model_id not in self.models or 'task' in self.models[model_id]:
+            raise ValueError(f"Time series model {model_id} not found")
+        return self.forecast_service.forecast(model_id, self.models[model_id], start=start, horizon=horizon)
+    
+    def forecast_lstm(self, model_id: str, horizon: Optional[int] = None,
+                      series_ids: Optional[List] = None) -> Union[np.ndarray, pd.DataFrame]:
+        """Serve an LSTM forecast from the cached one, extending it only when a longer horizon is asked for.
+        
+        Args:
+            model_id: Identifier of an LSTM model
+            horizon: Number of steps (defaults to the training horizon)
+            series_ids: Subset of series for panel models (defaults to all)
+            
+        Returns:
+            Forecast array for single-series models, or a series x step DataFrame for panel models
+        """
+        if model_id not in self.models or self.models[model_id].get('type') != 'lstm':
+            raise ValueError(f"LSTM model {model_id} not found")
+        
+        model_info = self.models[model_id]
+        forecast = self.forecast(model_id, horizon=horizon)
+        if model_info['series_ids'] is None:
+            return forecast['yhat'].values
+        forecast = forecast.T
+        forecast.index.name = model_info['forecast'].index.name
+        forecast.columns = pd.RangeIndex(1, forecast.shape[1] + 1, name='step')
+        if series_ids is not None:
+            forecast = forecast.loc[series_ids]
+        return forecast
+    
+    def explain_prediction(self, model_id: str, X: Union[pd.DataFrame, Dict], 
                            method: str = 'shap', num_features: int = 10) -> Dict:
         """Generate explanations for model predictions.
         
         Args:
             model_id: Identifier of the model to explain
-            X: Input features for the instance to explain
-            method: Explanation metho
\ No newline at end of file
+            X: Input features for the instance to explain (a DataFrame or a request dict)
+            method: Explanation method ('shap' or 'lime')
+            num_features: Number of top features to return
+            
+        Returns:
+            Dictionary containing the top feature importances for the instance
+        """
+        if model_id not in self.models:
+            raise ValueError(f"No explainers found for model {model_id}")
+            
+        explainer = self.get_explainer(model_id, method)
+        if 'task' in self.models[model_id]:
+            X = self._decode_features(model_id, X)
+        
+        feature_names = X.columns.tolist() if isinstance(X, pd.DataFrame) else self.feature_names[model_id]
+        
+        if method == 'shap':
+            # Multi-output models: explain the last output (positive class)
+            values, base_values = shap_matrix(explainer(X))
+            explanation = row_explanations(values[:1], base_values[:1], feature_names, num_features, absolute=False)[0]
+            return {'method': 'shap', **explanation}
+        elif method == 'lime':
+            # Time series models are explained through their surrogate
+            if 'task' in self.models[model_id]:
+                model = self.models[model_id]['model']
+            else:
+                model = self.get_explainer(model_id, 'surrogate')
+            if self.models[model_id].get('task') == 'classification':
+                predict_fn = model.predict_proba
+            else:
+                predict_fn = model.predict
+            instance = X.values[0] if isinstance(X, pd.DataFrame) else np.asarray(X)[0]
+            exp = explainer.explain_instance(instance, predict_fn, num_features=num_features)
+            return {
+                'method': 'lime',
+                'feature_importance': dict(exp.as_list())
+            }
+        else:
+            raise ValueError(f"Unsupported explanation method: {method}")
+    
+    def explain_batch(self, model_id: str, X: pd.DataFrame, num_features: int = 10,
+                      batch_size: int = 5000) -> List[Dict]:
+        """Explain many rows with vectorized SHAP calls instead of one call per row.
+        
+        Args:
+            model_id: Identifier of the model to explain
+            X: Input features, one row per instance
+            num_features: Number of top features to return per row
+            batch_size: Rows per explainer call, bounding the size of the SHAP matrix
+            
+        Returns:
+            List with one dictionary of signed top feature contributions per row
+        """
+        explainer = self.get_explainer(model_id, 'shap')
+        explanations = []
+        for start in range(0, len(X), batch_size):
+            explanations.extend(explain_batch(explainer, X.iloc[start:start + batch_size],
+                                              num_features, absolute=False))
+        return explanations
+    
+    def global_feature_importance(self, model_id: str, X: Optional[pd.DataFrame] = None,
+                                  sample_size: int = 1000) -> Dict[str, float]:
+        """Mean |SHAP| per feature over a sample, computed with one explainer call.
+        
+        Args:
+            model_id: Identifier of a classification or regression model
+            X: Rows to summarize (defaults to the model's reference sample)
+            sample_size: Maximum number of rows to explain
+            
+        Returns:
+            Dictionary of feature -> mean absolute SHAP value, largest first
+        """
+        if X is None:
+            X = self.reference_store.background(model_id, sample_size)
+        elif len(X) > sample_size:
+            X = X.sample(sample_size, random_state=42)
+        importance = mean_abs_importance(self.get_explainer(model_id, 'shap'), X)
+        self.model_metrics.setdefault(model_id, {})['global_importance'] = importance
+        return importance
+    
+    def explainer_methods(self, model_id: str) -> List[str]:
+        """Explainers that can be built for a model, in dependency order"""
+        model_info = self.models[model_id]
+        if 'task' in model_info:
+            return ['shap', 'lime']
+        if model_info['type'] == 'prophet':
+            return ['shap']  # Prophet doesn't work well with LIME
+        if 'lags' in model_info:
+            return ['surrogate', 'shap', 'lime']
+        return []
+    
+    def get_explainer(self, model_id: str, method: str):
+        """Return a cached explainer, building it (at most once, even across threads) on first use.
+        
+        Args:
+            model_id: Identifier of the model to explain
+            method: 'shap', 'lime' or, for ARIMA/LSTM models, 'surrogate'
+            
+        Returns:
+            The explainer or surrogate model
+        """
+        if model_id not in self.models:
+            raise ValueError(f"Model {model_id} not found")
+        if method not in self.explainer_methods(model_id):
+            raise ValueError(f"Explanation method {method} is not available for model {model_id}")
+        
+        # Builds write into the dict they started from, so a build racing a retrain cannot leak in
+        cache = self.explainers.setdefault(model_id, {})
+        if method not in cache:
+            with self._explainer_lock(model_id):
+                if method not in cache:
+                    bundle = self._bundles.get(model_id)
+                    if bundle is not None and f'explainer_{method}' in bundle:
+                        cache[method] = bundle[f'explainer_{method}']
+                    else:
+                        start = datetime.now()
+                        cache[method] = self._build_explainer(model_id, method)
+                        logger.info(f"Built {method} explainer for model {model_id} in "
+                                    f"{(datetime.now() - start).total_seconds():.2f}s")
+        return cache[method]
+    
+    def prebuild_explainers(self, model_id: str, methods: Optional[List[str]] = None) -> Future:
+        """Build explainers in a background thread so the first explanation doesn't pay for them.
+        
+        Args:
+            model_id: Identifier of the model
+            methods: Explainers to build (defaults to all available ones)
+            
+        Returns:
+            Future that completes when the explainers are cached
+        """
+        if self._prebuild_executor is None:
+            self._prebuild_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='explainer-prebuild')
+        methods = methods or self.explainer_methods(model_id)
+        
+        def build():
+            for method in methods:
+                try:
+                    self.get_explainer(model_id, method)
+                except Exception as e:
+                    logger.warning(f"Prebuilding {method} explainer for model {model_id} failed: {e}")
+        
+        return self._prebuild_executor.submit(build)
+    
+    def _explainer_lock(self, model_id: str) -> threading.RLock:
+        with self._explainer_locks_guard:
+            return self._explainer_locks.setdefault(model_id, threading.RLock())
+    
+    def _reset_explainers(self, model_id: str):
+        """Drop explainers of a previous fit, prebuilding new ones if configured"""
+        self.explainers[model_id] = {}
+        self._bundles.pop(model_id, None)
+        if self.prebuild_explainers_on_create:
+            self.prebuild_explainers(model_id)
+    
+    def _build_explainer(self, model_id: str, method: str):
+        model_info = self.models[model_id]
+        model = model_info['model']
+        
+        if 'task' in model_info:
+            if method == 'shap':
+                return shap.Explainer(model, self.reference_store.background(model_id))
+            kwargs = {'feature_names': self.feature_names[model_id], 'mode': model_info['task']}
+            if model_info['task'] == 'classification' and hasattr(model, 'classes_'):
+                kwargs['class_names'] = model.classes_.tolist()
+            return lime.lime_tabular.LimeTabularExplainer(self.reference_store.get(model_id).sample().values, **kwargs)
+        
+        if model_info['type'] == 'prophet':
+            # The forecast is additive in its components, so SHAP over their sum attributes it exactly
+            components = model.predict(model.history[['ds']])[self.feature_names[model_id]].values
+            return shap.LinearExplainer((np.ones(components.shape[1]), 0.0), components)
+        
+        # ARIMA/LSTM: a surrogate on lag features stands in for the model
+        X, y = self._lag_training_set(model_id)
+        if method == 'surrogate':
+            surrogate = XGBRegressor()
+            surrogate.fit(X, y)
+            return surrogate
+        if method == 'shap':
+            return shap.Explainer(self.get_explainer(model_id, 'surrogate'))
+        return lime.lime_tabular.LimeTabularExplainer(X.values, feature_names=X.columns.tolist(), mode='regression')
+    
+    def _lag_training_set(self, model_id: str) -> Tuple[pd.DataFrame, pd.Series]:
+        """Lag features and targets for a time series surrogate, from the series the model was fit on"""
+        model_info = self.models[model_id]
+        if model_info['type'] == 'arima':
+            series_list = [np.asarray(model_info['model'].model.endog, dtype=np.float64).ravel()]
+        else:
+            series_list = model_info['explain_series']
+        frames, targets = [], []
+        for values in series_list:
+            series = pd.Series(values)
+            lagged = self._create_lag_features(series, lags=model_info['lags'])
+            frames.append(lagged)
+            targets.append(series[lagged.index])
+        return pd.concat(frames, ignore_index=True), pd.concat(targets, ignore_index=True)
+    
+    def save_model(self, model_id: str, path: str):
+        """Persist a model with its metadata, reference data and the explainers built so far.
+        
+        LIME explainers are not picklable and are rebuilt cheaply from the
+        reference sample after loading; SHAP explainers and surrogates are saved.
+        
+        Args:
+            model_id: Identifier of the model to save
+            path: Destination file (joblib)
+        """
+        if model_id not in self.models:
+            raise ValueError(f"Model {model_id} not found")
+        explainers = {method: explainer for method, explainer in self.explainers.get(model_id, {}).items()
+                      if method != 'lime'}
+        joblib.dump({
+            'model_info': self.models[model_id],
+            'feature_names': self.feature_names.get(model_id),
+            'model_metrics': self.model_metrics.get(model_id),
+            'reference': self.reference_store.get(model_id) if model_id in self.reference_store else None,
+            'explainers': explainers,
+        }, path)
+    
+    def load_model(self, model_id: str, path: str) -> Dict:
+        """Load a model saved with save_model, including its cached explainers.
+        
+        Args:
+            model_id: Identifier to register the model under
+            path: File written by save_model
+            
+        Returns:
+            Dictionary containing the model and its metadata
+        """
+        bundle = joblib.load(path)
+        self.models[model_id] = bundle['model_info']
+        self.feature_names[model_id] = bundle['feature_names']
+        if bundle.get('model_metrics') is not None:
+            self.model_metrics[model_id] = bundle['model_metrics']
+        if bundle.get('reference') is not None:
+            self.reference_store.put(model_id, bundle['reference'])
+        self.drift_metrics.pop(model_id, None)
+        self.explainers[model_id] = dict(bundle.get('explainers') or {})
+        self._bundles.pop(model_id, None)
+        self.forecast_service.invalidate(model_id)
+        return self.models[model_id]
+    
+    def save_bundle(self, model_id: str, directory: str, native: bool = True, compress: bool = False) -> Dict:
+        """Persist a model as an artifact bundle whose components load independently.
+        
+        The model, its forecast, LSTM scaling state, reference data, a SHAP
+        background sample and the explainers built so far are stored as
+        separate files next to a JSON manifest; XGBoost, Prophet and Keras
+        models use their native formats (see artifact_bundle).
+        
+        Args:
+            model_id: Identifier of the model to save
+            directory: Bundle directory (replaced if it already holds a bundle)
+            native: Use native model formats instead of joblib
+            compress: Trade memory-mappable arrays for smaller files
+            
+        Returns:
+            The manifest that was written
+        """
+        if model_id not in self.models:
+            raise ValueError(f"Model {model_id} not found")
+        model_info = self.models[model_id]
+        scaler_keys = ('scaler', 'series_min', 'series_scale', 'last_windows')
+        
+        # JSON-friendly metadata goes into the manifest; everything else is a component
+        metadata_info, state = {}, {}
+        for key, value in model_info.items():
+            if key in ('model', 'forecast') or key in scaler_keys:
+                continue
+            try:
+                json.dumps(value)
+                metadata_info[key] = value
+            except (TypeError, ValueError):
+                state[key] = value
+        
+        has_reference = model_id in self.reference_store
+        components = {
+            'model': model_info['model'],
+            'forecast': model_info.get('forecast'),
+            'scaler': {key: model_info[key] for key in scaler_keys if key in model_info} or None,
+            'state': state or None,
+            'reference': self.reference_store.get(model_id) if has_reference else None,
+            'background': self.reference_store.background(model_id) if has_reference and 'task' in model_info else None,
+            'metrics': self.model_metrics.get(model_id),
+        }
+        for method, explainer in self.explainers.get(model_id, {}).items():
+            # LIME explainers are not picklable and cheap to rebuild
+            if method != 'lime':
+                components[f'explainer_{method}'] = explainer
+        
+        metadata = {'model_id': model_id, 'feature_names': self.feature_names.get(model_id),
+                    'model_info': metadata_info}
+        return write_bundle(directory, components, metadata, version=model_info.get('last_trained'),
+                            native=native, compress=compress)
+    
+    def load_bundle(self, model_id: str, directory: str, mmap: bool = True) -> Dict:
+        """Load a model saved with save_bundle.
+        
+        The model and its metadata are read right away; reference data and
+        saved explainers are read from the bundle when first used.
+        
+        Args:
+            model_id: Identifier to register the model under
+            directory: Bundle directory written by save_bundle
+            mmap: Memory-map array components instead of reading them into memory
+            
+        Returns:
+            Dictionary containing the model and its metadata
+        """
+        bundle = ArtifactBundle(directory, mmap=mmap)
+        model_info = dict(bundle.metadata.get('model_info', {}))
+        model_info['model'] = bundle['model']
+        if 'forecast' in bundle:
+            model_info['forecast'] = bundle['forecast']
+        model_info.update(bundle.get('scaler') or {})
+        model_info.update(bundle.get('state') or {})
+        
+        self.models[model_id] = model_info
+        self.feature_names[model_id] = bundle.metadata.get('feature_names')
+        if 'metrics' in bundle:
+            self.model_metrics[model_id] = bundle['metrics']
+        if 'reference' in bundle:
+            self.reference_store.put_lazy(model_id, lambda: bundle['reference'])
+        else:
+            self.reference_store.remove(model_id)
+        self.drift_metrics.pop(model_id, None)
+        self.explainers[model_id] = {}
+        self._bundles[model_id] = bundle
+        self.forecast_service.invalidate(model_id)
+        return model_info
+    
+    def detect_drift(self, model_id: str, X_new: pd.DataFrame, 
+                     predictions: Optional[np.ndarray] = None) -> Dict:
+        """Compare new data against the training distribution with KS, PSI and KL.
+        
+        Args:
+            model_id: Identifier of the model to check
+            X_new: Recent feature rows
+            predictions: Recent predictions (computed from X_new if omitted)
+            
+        Returns:
+            Drift report, also stored in self.drift_metrics[model_id]['latest']
+        """
+        profile = self.get_reference_profile(model_id)
+        model_info = self.models[model_id]
+        if predictions is None and 'task' in model_info:
+            predictions = model_info['model'].predict(X_new[self.feature_names[model_id]])
+        
+        feature_window = X_new.reindex(columns=profile.feature_names).to_numpy(dtype=np.float64)
+        report = DriftEngine().evaluate(profile, feature_window, predictions)
+        report['timestamp'] = datetime.now().isoformat()
+        self.drift_metrics.setdefault(model_id, {})['latest'] = report
+        return report
+    
+    def get_reference_profile(self, model_id: str) -> ReferenceProfile:
+        """Reference histograms for drift detection, kept up to date by the reference store.
+        
+        ``profile.to_dict()`` is what the API expects under ``reference_profile``
+        in a model's info.json.
+        """
+        if model_id not in self.models or model_id not in self.reference_store:
+            raise ValueError(f"Model {model_id} not found")
+        
+        metrics = self.drift_metrics.setdefault(model_id, {})
+        metrics['reference'] = self.reference_store.get(model_id).profile
+        return metrics['reference']
+    
+    def memory_report(self, model_id: Optional[str] = None) -> Dict:
+        """Memory used by reference data per model, next to the full training copy it replaces.
+        
+        Args:
+            model_id: Model to report on (defaults to all models)
+            
+        Returns:
+            Byte counts for the sample, quantile sketches and histograms
+        """
+        return self.reference_store.memory_report(model_id)
+    
+    def _create_lag_features(self, series: pd.Series, lags: List[int]) -> pd.DataFrame:
+        """Build a frame of lagged copies of a series, dropping rows with missing lags"""
+        lagged = pd.concat({f'lag_{lag}': series.shift(lag) for lag in lags}, axis=1)
+        return lagged.dropna()
+    
+    def _create_sequences(self, data: np.ndarray, sequence_length: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Split a scaled (n, 1) series into LSTM input windows and next-step targets.
+        
+        The windows are a strided view over ``data`` (no copy), shaped
+        (n - sequence_length, sequence_length, 1).
+        """
+        windows = sliding_window_view(data[:-1], sequence_length, axis=0)
+        return np.swapaxes(windows, 1, 2), data[sequence_length:, 0]
+    
+    def _forecast_lstm(self, model, scaled_data: np.ndarray, sequence_length: int, 
+                       forecast_periods: int, scaler: MinMaxScaler) -> np.ndarray:
+        """Recursively forecast forecast_periods steps, feeding predictions back as inputs"""
+        window = scaled_data[-sequence_length:].reshape(1, sequence_length)
+        predictions = self._forecast_lstm_batch(model, window, forecast_periods)
+        return scaler.inverse_transform(predictions.reshape(-1, 1)).ravel()
+    
+    def _forecast_lstm_batch(self, model, windows: np.ndarray, forecast_periods: int) -> np.ndarray:
+        """Recursively forecast many series together, one batched model call per step.
+        
+        Args:
+            model: Fitted Keras model taking (batch, sequence_length, 1) inputs
+            windows: Scaled last observations, shape (n_series, sequence_length)
+            forecast_periods: Number of steps to forecast
+            
+        Returns:
+            Scaled forecasts of shape (n_series, forecast_periods)
+        """
+        n_series, sequence_length = windows.shape
+        # History and forecasts share one buffer; each step's input is a view sliding along it
+        buffer = np.empty((n_series, sequence_length + forecast_periods), dtype=np.float32)
+        buffer[:, :sequence_length] = windows
+        for step in range(forecast_periods):
+            inputs = buffer[:, step:step + sequence_length, None]
+            buffer[:, sequence_length + step] = np.asarray(model.predict_on_batch(inputs)).reshape(-1)
+        return buffer[:, sequence_length:].astype(np.float64)
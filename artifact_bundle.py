@@ -0,0 +1,316 @@
+"""Versioned model artifacts as a manifest plus separately stored components.
+
+A bundle is a directory holding ``manifest.json`` and one file per component
+(model, explainer background, reference sketches, scaler, forecast, ...).
+``ArtifactBundle`` reads only the manifest when opened and loads each
+component on first access, so metadata or a background sample never pays for
+unpickling a large model.
+
+Components are written in the cheapest format that fits them:
+
+- XGBoost models as native UBJSON, Prophet models as Prophet JSON and Keras
+  models as ``.keras`` archives (``native=True``)
+- numpy arrays, and DataFrames whose columns share one numeric dtype, as
+  ``.npy`` files that load memory-mapped (``.npz`` when ``compress=True``)
+- other DataFrames as Parquet
+- anything else with joblib (uncompressed, so arrays inside can be memory-mapped)
+
+Component files carry a per-write tag and the manifest is replaced last, so a
+reader holding the previous manifest keeps working while a new version is
+written; files older than the previous version are removed. A bundle can also
+be written to a staging directory and moved in later with ``promote_bundle``,
+which keeps the files of any older versions the caller still serves; those
+are removed with ``remove_released`` once their last reader is done.
+"""
+import importlib
+import json
+import os
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import joblib
+import numpy as np
+import pandas as pd
+
+MANIFEST = "manifest.json"
+FORMAT = "artifact-bundle"
+FORMAT_VERSION = 1
+
+# Objects whose unpickling writes into its arrays, so they cannot be loaded memory-mapped read-only
+_NO_MMAP_MODULES = ("statsmodels",)
+
+
+def is_bundle(directory: str) -> bool:
+    return os.path.isfile(os.path.join(directory, MANIFEST))
+
+
+def artifact_fingerprint(path: str) -> Tuple[int, int, int]:
+    """Identity of a model.joblib or bundle (its manifest) on disk: inode, mtime and size.
+
+    Files are replaced by rename, so any new version changes it, and a rename
+    of the same file (e.g. promoting a staged version) keeps it.
+    """
+    stat = os.stat(os.path.join(path, MANIFEST) if os.path.isdir(path) else path)
+    return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+
+def _class_path(value) -> str:
+    return f"{type(value).__module__}.{type(value).__qualname__}"
+
+
+def _import_class(path: str):
+    module, _, name = path.rpartition(".")
+    return getattr(importlib.import_module(module), name)
+
+
+def _root_module(value) -> str:
+    return type(value).__module__.split(".")[0]
+
+
+def _atomic_write(path: str, write):
+    """Write through a temporary file and rename, so readers never see a partial file"""
+    root, ext = os.path.splitext(path)
+    tmp_path = f"{root}.tmp{ext}"
+    write(tmp_path)
+    os.replace(tmp_path, path)
+
+
+def _write_component(directory: str, name: str, value: Any, tag: str, native: bool, compress: bool) -> Dict[str, Any]:
+    """Write one component and return its manifest entry"""
+    stem = os.path.join(directory, f"{name}-{tag}")
+    entry = {}
+
+    if native and _root_module(value) == "xgboost" and hasattr(value, "save_model"):
+        entry.update(format="xgboost-ubj", file=stem + ".ubj", **{"class": _class_path(value)})
+        _atomic_write(entry["file"], value.save_model)
+    elif native and _root_module(value) == "prophet":
+        from prophet.serialize import model_to_json
+
+        entry.update(format="prophet-json", file=stem + ".json")
+
+        def write_prophet(path):
+            with open(path, "w") as f:
+                f.write(model_to_json(value))
+        _atomic_write(entry["file"], write_prophet)
+    elif native and _root_module(value) in ("keras", "tensorflow", "tf_keras") and hasattr(value, "save"):
+        entry.update(format="keras", file=stem + ".keras")
+        _atomic_write(entry["file"], value.save)
+    elif isinstance(value, np.ndarray) and value.dtype != object:
+        entry.update(_write_array(stem, np.asarray(value), compress))
+    elif (isinstance(value, pd.DataFrame) and len(value.columns) and value.dtypes.nunique() == 1
+          and pd.api.types.is_numeric_dtype(value.dtypes.iloc[0]) and not pd.api.types.is_bool_dtype(value.dtypes.iloc[0])
+          and value.index.equals(pd.RangeIndex(len(value))) and all(isinstance(c, str) for c in value.columns)):
+        entry.update(_write_array(stem, value.to_numpy(), compress), kind="frame", columns=value.columns.tolist())
+    elif isinstance(value, pd.DataFrame) and all(isinstance(c, str) for c in value.columns):
+        entry.update(format="parquet", file=stem + ".parquet")
+        _atomic_write(entry["file"], lambda path: value.to_parquet(path, compression="zstd" if compress else "snappy"))
+    else:
+        entry.update(format="joblib", file=stem + ".joblib",
+                     mmap=not compress and _root_module(value) not in _NO_MMAP_MODULES)
+        _atomic_write(entry["file"], lambda path: joblib.dump(value, path, compress=3 if compress else 0))
+
+    entry["bytes"] = os.path.getsize(entry["file"])
+    entry["file"] = os.path.basename(entry["file"])
+    return entry
+
+
+def _write_array(stem: str, values: np.ndarray, compress: bool) -> Dict[str, Any]:
+    if compress:
+        path = stem + ".npz"
+        _atomic_write(path, lambda tmp: np.savez_compressed(tmp, values=values))
+        return {"format": "npz", "file": path, "dtype": values.dtype.str, "shape": list(values.shape)}
+    path = stem + ".npy"
+    _atomic_write(path, lambda tmp: np.save(tmp, np.ascontiguousarray(values)))
+    return {"format": "npy", "file": path, "dtype": values.dtype.str, "shape": list(values.shape)}
+
+
+def write_bundle(directory: str, components: Dict[str, Any], metadata: Optional[Dict[str, Any]] = None,
+                 version: Optional[str] = None, native: bool = True, compress: bool = False) -> Dict[str, Any]:
+    """Write (or replace) a bundle.
+
+    Args:
+        directory: Bundle directory, created if needed
+        components: Name -> object; None values are skipped
+        metadata: JSON-serializable metadata stored in the manifest itself
+        version: Version string recorded in the manifest (defaults to the write time)
+        native: Use native formats for XGBoost, Prophet and Keras models instead of joblib
+        compress: Compress arrays (npz), frames (zstd Parquet) and joblib parts; arrays are then no longer memory-mappable
+
+    Returns:
+        The manifest that was written
+    """
+    os.makedirs(directory, exist_ok=True)
+    manifest_path = os.path.join(directory, MANIFEST)
+    previous = _read_manifest(directory)
+
+    tag = uuid.uuid4().hex[:8]
+    created_at = datetime.now().isoformat()
+    manifest = {
+        "format": FORMAT,
+        "format_version": FORMAT_VERSION,
+        "version": str(version) if version is not None else created_at,
+        "created_at": created_at,
+        "metadata": metadata or {},
+        "components": {},
+    }
+    for name, value in components.items():
+        if value is not None:
+            manifest["components"][name] = _write_component(directory, name, value, tag, native, compress)
+
+    def write_manifest(path):
+        with open(path, "w") as f:
+            json.dump(manifest, f, indent=2, default=str)
+    _atomic_write(manifest_path, write_manifest)
+    _remove_stale(directory, manifest, previous)
+    return manifest
+
+
+def _read_manifest(directory: str) -> Optional[Dict[str, Any]]:
+    manifest_path = os.path.join(directory, MANIFEST)
+    if not os.path.isfile(manifest_path):
+        return None
+    with open(manifest_path, "r") as f:
+        return json.load(f)
+
+
+def _manifest_files(manifest: Optional[Dict[str, Any]]) -> Set[str]:
+    return {entry["file"] for entry in manifest.get("components", {}).values()} if manifest is not None else set()
+
+
+def _remove_stale(directory: str, manifest: Dict[str, Any], previous: Optional[Dict[str, Any]],
+                  keep: Iterable[str] = ()):
+    """Keep the previous version's files for readers still holding its manifest, and ``keep``; drop anything older"""
+    keep = {MANIFEST} | _manifest_files(manifest) | _manifest_files(previous) | set(keep)
+    for filename in os.listdir(directory):
+        if filename not in keep and ".tmp" not in filename:
+            os.remove(os.path.join(directory, filename))
+
+
+def promote_bundle(source: str, directory: str, keep: Iterable[str] = ()) -> Dict[str, Any]:
+    """Move a bundle written to ``source`` into ``directory`` (same filesystem), replacing its manifest last.
+
+    Component files keep their names, so an ArtifactBundle opened on ``source``
+    can be pointed at ``directory`` afterwards. Files of older versions are
+    removed except the previous version's and ``keep`` (e.g. ``ArtifactBundle.files()``
+    of versions still in use, which may not have loaded every component yet).
+    Returns the promoted manifest.
+    """
+    manifest = _read_manifest(source)
+    if manifest is None:
+        raise ValueError(f"{source} is not an artifact bundle")
+    os.makedirs(directory, exist_ok=True)
+    previous = _read_manifest(directory)
+    for entry in manifest["components"].values():
+        os.replace(os.path.join(source, entry["file"]), os.path.join(directory, entry["file"]))
+    os.replace(os.path.join(source, MANIFEST), os.path.join(directory, MANIFEST))
+    _remove_stale(directory, manifest, previous, keep)
+    return manifest
+
+
+def remove_released(directory: str, files: Iterable[str], keep: Iterable[str] = ()):
+    """Delete component files of a version nobody reads any more, unless the current manifest or ``keep`` lists them"""
+    keep = _manifest_files(_read_manifest(directory)) | set(keep)
+    for filename in set(files) - keep:
+        try:
+            os.remove(os.path.join(directory, filename))
+        except FileNotFoundError:
+            pass
+
+
+class ArtifactBundle:
+    """Read side of a bundle: the manifest up front, components on first access.
+
+    Args:
+        directory: Bundle directory written by write_bundle
+        mmap: Memory-map ``.npy`` components (and arrays inside uncompressed joblib parts)
+    """
+
+    def __init__(self, directory: str, mmap: bool = True):
+        self.directory = directory
+        self.mmap = mmap
+        with open(os.path.join(directory, MANIFEST), "r") as f:
+            self.manifest = json.load(f)
+        if self.manifest.get("format") != FORMAT:
+            raise ValueError(f"{directory} is not an artifact bundle")
+        if self.manifest.get("format_version", 0) > FORMAT_VERSION:
+            raise ValueError(f"Bundle format version {self.manifest['format_version']} in {directory} "
+                             f"is newer than the supported version {FORMAT_VERSION}")
+        self.version = self.manifest["version"]
+        self.metadata = self.manifest.get("metadata", {})
+        self._components = self.manifest.get("components", {})
+        self._loaded = {}
+        self._lock = threading.Lock()
+        self.load_seconds = {}
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._components
+
+    def __getitem__(self, name: str) -> Any:
+        return self.load(name)
+
+    def components(self) -> List[str]:
+        return list(self._components)
+
+    def files(self) -> Set[str]:
+        """Component file names of this version"""
+        return _manifest_files(self.manifest)
+
+    def get(self, name: str, default: Any = None) -> Any:
+        return self.load(name) if name in self._components else default
+
+    def is_loaded(self, name: str) -> bool:
+        return name in self._loaded
+
+    def nbytes(self) -> int:
+        """Total size of the component files on disk"""
+        return sum(entry["bytes"] for entry in self._components.values())
+
+    def load(self, name: str) -> Any:
+        """Load a component once; later calls return the same object"""
+        if name in self._loaded:
+            return self._loaded[name]
+        if name not in self._components:
+            raise KeyError(f"Bundle {self.directory} has no component {name}")
+        with self._lock:
+            if name not in self._loaded:
+                start = time.perf_counter()
+                self._loaded[name] = self._read(self._components[name])
+                self.load_seconds[name] = time.perf_counter() - start
+        return self._loaded[name]
+
+    def _read(self, entry: Dict[str, Any]) -> Any:
+        path = os.path.join(self.directory, entry["file"])
+        fmt = entry["format"]
+        if fmt == "xgboost-ubj":
+            cls = _import_class(entry["class"])
+            if entry["class"] == "xgboost.core.Booster":
+                return cls(model_file=path)
+            model = cls()
+            model.load_model(path)
+            return model
+        if fmt == "prophet-json":
+            from prophet.serialize import model_from_json
+
+            with open(path, "r") as f:
+                return model_from_json(f.read())
+        if fmt == "keras":
+            from tensorflow.keras.models import load_model
+
+            return load_model(path)
+        if fmt in ("npy", "npz"):
+            if fmt == "npy":
+                values = np.load(path, mmap_mode="r" if self.mmap else None)
+            else:
+                with np.load(path) as archive:
+                    values = archive["values"]
+            if entry.get("kind") == "frame":
+                return pd.DataFrame(values, columns=entry["columns"], copy=False)
+            return values
+        if fmt == "parquet":
+            return pd.read_parquet(path)
+        if fmt == "joblib":
+            return joblib.load(path, mmap_mode="r" if self.mmap and entry.get("mmap") else None)
+        raise ValueError(f"Unknown component format {fmt} in {self.directory}")
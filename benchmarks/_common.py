@@ -0,0 +1,90 @@
+"""Shared helpers for the backend benchmarks.
+
+The API lives in ``fastapi-backend.py``, which is not importable by name,
+so benchmarks load it from its file path and run it through a TestClient
+against synthetic models written to a temporary ``models/`` directory.
+"""
+import importlib.util
+import json
+import os
+import sys
+import tempfile
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+
+def load_module(filename, name):
+    """Import one of the hyphenated top-level scripts as a module"""
+    spec = importlib.util.spec_from_file_location(name, os.path.join(REPO_ROOT, filename))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def load_backend():
+    return load_module("fastapi-backend.py", "fastapi_backend")
+
+
+def load_model_factory():
+    return load_module("ai-prediction-backend.py", "ai_prediction_backend")
+
+
+def make_regression_data(n_rows=2000, n_features=20, seed=0):
+    rng = np.random.default_rng(seed)
+    X = pd.DataFrame(rng.normal(size=(n_rows, n_features)),
+                     columns=[f"f{i}" for i in range(n_features)])
+    coef = rng.normal(size=n_features)
+    y = pd.Series(X.values @ coef + rng.normal(scale=0.1, size=n_rows), name="target")
+    return X, y
+
+
+def write_model_dir(models_dir, model_id, model, X, task="regression", background_rows=100, **extra):
+    """Persist a model the way the API expects: model.joblib plus info.json"""
+    path = os.path.join(models_dir, model_id)
+    os.makedirs(path, exist_ok=True)
+    joblib.dump(model, os.path.join(path, "model.joblib"))
+    predictions = np.asarray(model.predict(X), dtype=float)
+    info = {
+        "task": task,
+        "version": "1",
+        "feature_names": X.columns.tolist(),
+        "historical_mean": float(predictions.mean()),
+        "historical_std": float(predictions.std()),
+        "background_data": X.sample(min(background_rows, len(X)), random_state=0).to_dict("records"),
+    }
+    info.update(extra)
+    with open(os.path.join(path, "info.json"), "w") as f:
+        json.dump(info, f)
+    return path
+
+
+def temp_workdir():
+    """Create a temporary working directory containing an empty models/ folder"""
+    workdir = tempfile.mkdtemp(prefix="bench_")
+    os.makedirs(os.path.join(workdir, "models"))
+    return workdir
+
+
+def time_calls(fn, n):
+    """Run fn n times and return per-call latencies in milliseconds"""
+    latencies = []
+    for i in range(n):
+        start = time.perf_counter()
+        fn(i)
+        latencies.append((time.perf_counter() - start) * 1000.0)
+    return np.asarray(latencies)
+
+
+def summarize(label, latencies_ms):
+    p50, p99 = np.percentile(latencies_ms, [50, 99])
+    print(f"{label:<40} n={len(latencies_ms):<6} p50={p50:9.3f} ms  p99={p99:9.3f} ms  "
+          f"mean={latencies_ms.mean():9.3f} ms")
+    return {"p50_ms": float(p50), "p99_ms": float(p99), "mean_ms": float(latencies_ms.mean())}
@@ -0,0 +1,79 @@
+"""Benchmark model artifacts: one joblib pickle vs an artifact bundle.
+
+For a random forest and an XGBoost model built through ModelFactory (with a
+SHAP explainer cached), compares save time, size on disk and load time of
+``save_model``/``load_model`` against ``save_bundle``/``load_bundle`` (native
+and compressed), plus what a bundle makes cheap: reading only the manifest,
+only the model, or only the explainer background.
+
+Usage: python benchmarks/bench_artifacts.py [n_rows]
+"""
+import os
+import shutil
+import sys
+import time
+
+import joblib
+import numpy as np
+
+from _common import load_model_factory, make_regression_data, temp_workdir
+
+from artifact_bundle import ArtifactBundle
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, (time.perf_counter() - start) * 1000.0
+
+
+def disk_bytes(path):
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+
+
+def best_of(fn, repeats=3):
+    return min(timed(fn)[1] for _ in range(repeats))
+
+
+def run(n_rows=10000):
+    ModelFactory = load_model_factory().ModelFactory
+    X, y = make_regression_data(n_rows=n_rows)
+    factory = ModelFactory()
+    factory.create_regression_model("random_forest", "random_forest", X, y, {"n_estimators": 100, "max_depth": 14})
+    factory.create_regression_model("xgboost", "xgboost", X, y, {"n_estimators": 500, "max_depth": 6})
+    workdir = temp_workdir()
+
+    print(f"{'model':<14} {'artifact':<18} {'size_MB':>8} {'save_ms':>9} {'load_ms':>9}  partial loads")
+    for model_id in ("random_forest", "xgboost"):
+        factory.get_explainer(model_id, "shap")
+        expected = factory.predict(model_id, X.iloc[:100])
+
+        path = os.path.join(workdir, f"{model_id}.joblib")
+        _, save_ms = timed(lambda: factory.save_model(model_id, path))
+        load_ms = best_of(lambda: ModelFactory().load_model(model_id, path))
+        model_path = os.path.join(workdir, f"{model_id}_model.joblib")
+        joblib.dump(factory.models[model_id]["model"], model_path)
+        model_only_ms = best_of(lambda: joblib.load(model_path, mmap_mode="r"))
+        print(f"{model_id:<14} {'joblib':<18} {disk_bytes(path) / 1e6:8.2f} {save_ms:9.1f} {load_ms:9.1f}"
+              f"  model only (registry, mmap) {model_only_ms:.1f} ms")
+
+        for label, compress in (("bundle", False), ("bundle compressed", True)):
+            directory = os.path.join(workdir, f"{model_id}_{'z' if compress else 'n'}")
+            _, save_ms = timed(lambda: factory.save_bundle(model_id, directory, compress=compress))
+            load_ms = best_of(lambda: ModelFactory().load_bundle(model_id, directory))
+            manifest_ms = best_of(lambda: ArtifactBundle(directory))
+            model_ms = best_of(lambda: ArtifactBundle(directory)["model"])
+            background_ms = best_of(lambda: ArtifactBundle(directory)["background"])
+            restored = ModelFactory()
+            restored.load_bundle(model_id, directory)
+            assert np.array_equal(restored.predict(model_id, X.iloc[:100]), expected)
+            print(f"{model_id:<14} {label:<18} {disk_bytes(directory) / 1e6:8.2f} {save_ms:9.1f} {load_ms:9.1f}"
+                  f"  manifest {manifest_ms:.2f} ms, model {model_ms:.1f} ms, background {background_ms:.2f} ms")
+
+    shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 10000)
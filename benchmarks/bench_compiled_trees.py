@@ -0,0 +1,77 @@
+"""Benchmark compiled tree-ensemble inference against model.predict.
+
+For random forests (depth-limited and fully grown), a forest classifier and
+XGBoost, times a single row through ``model.predict`` on a one-row DataFrame
+and through the compiled predictor (feature dict in, prediction out), then
+a 64-row batch both ways, and checks the outputs are identical. Finally
+/predict is timed end to end with COMPILED_INFERENCE on and off.
+
+Usage: python benchmarks/bench_compiled_trees.py [n_calls]
+"""
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from _common import load_backend, make_regression_data, summarize, temp_workdir, time_calls, write_model_dir
+
+from fastapi.testclient import TestClient
+from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
+from xgboost import XGBRegressor
+
+from compiled_trees import compile_model
+
+
+def make_models(X, y):
+    labels = np.digitize(y, np.quantile(y, [1 / 3, 2 / 3]))
+    return {
+        "rf_depth10": RandomForestRegressor(n_estimators=100, max_depth=10, random_state=0).fit(X, y),
+        "rf_full": RandomForestRegressor(n_estimators=100, random_state=0).fit(X, y),
+        "rf_classifier": RandomForestClassifier(n_estimators=100, max_depth=10, random_state=0).fit(X, labels),
+        "xgb": XGBRegressor(n_estimators=500, max_depth=6).fit(X, y),
+    }
+
+
+def run(n_calls=1000):
+    X, y = make_regression_data(n_rows=10000)
+    models = make_models(X, y)
+    rows = X.sample(n_calls, replace=True, random_state=1).to_dict("records")
+    batch = X.sample(64, random_state=2)
+
+    for model_id, model in models.items():
+        start = time.perf_counter()
+        predictor = compile_model(model, X.columns.tolist(), X.sample(100, random_state=0))
+        compile_ms = (time.perf_counter() - start) * 1000.0
+        test = X.sample(1000, random_state=3)
+        assert np.array_equal(predictor.predict_frame(test), model.predict(test))
+        print(f"\n{model_id}: {type(predictor).__name__}, depth {predictor.depth}, compiled in {compile_ms:.0f} ms")
+
+        summarize("model.predict, 1 row DataFrame",
+                  time_calls(lambda i: model.predict(pd.DataFrame([rows[i]])), min(n_calls, 200)))
+        summarize("compiled, 1 row dict", time_calls(lambda i: predictor.predict_one(rows[i]), n_calls))
+        summarize("model.predict, 64 rows", time_calls(lambda i: model.predict(batch), 50))
+        summarize("compiled, 64 rows", time_calls(lambda i: predictor.predict_frame(batch), 50))
+
+    workdir = temp_workdir()
+    os.chdir(workdir)
+    for model_id in ("rf_depth10", "xgb"):
+        write_model_dir("models", model_id, models[model_id], X)
+    backend = load_backend()
+    print()
+    with TestClient(backend.app) as client:
+        for model_id in ("rf_depth10", "xgb"):
+            for compiled in (False, True):
+                backend.COMPILED_INFERENCE = compiled
+
+                def call(i):
+                    response = client.post("/predict", json={"model_id": model_id, "features": rows[i]})
+                    response.raise_for_status()
+
+                call(0)  # warm up model loading (and compilation)
+                summarize(f"/predict {model_id} compiled={compiled}", time_calls(call, min(n_calls, 300)))
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 1000)
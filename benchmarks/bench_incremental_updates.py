@@ -0,0 +1,83 @@
+"""Benchmark full refits against ModelFactory.update_model on a growing dataset.
+
+The data grows from an initial training set by a fixed increment per step.
+"full refit" retrains on everything seen so far (the old behaviour), while
+"incremental" only passes the new rows to update_model. Holdout R^2 is
+printed next to the timings so the cost of the shortcut is visible.
+
+Usage: python benchmarks/bench_incremental_updates.py [initial_rows] [increment_rows] [steps]
+"""
+import logging
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from _common import load_model_factory, make_regression_data
+
+REGRESSORS = {
+    "linear": None,
+    "sgd": None,
+    "xgboost": {"n_estimators": 100, "max_depth": 6},
+    "random_forest": {"n_estimators": 50, "max_depth": 10, "n_jobs": -1},
+}
+
+
+def timed(fn):
+    start = time.perf_counter()
+    fn()
+    return (time.perf_counter() - start) * 1000.0
+
+
+def run_regressors(factory, initial_rows, increment_rows, steps):
+    total = initial_rows + increment_rows * steps
+    X, y = make_regression_data(n_rows=total + 2000, n_features=20)
+    X_test, y_test = X.iloc[total:], y.iloc[total:]
+
+    for model_type, config in REGRESSORS.items():
+        factory.create_regression_model("incremental", model_type, X.iloc[:initial_rows], y.iloc[:initial_rows], config)
+        print(f"\n{model_type}")
+        print(f"{'rows':>8} {'full refit ms':>14} {'update ms':>10} {'full R2':>8} {'update R2':>10}")
+        for step in range(1, steps + 1):
+            end = initial_rows + increment_rows * step
+            new = slice(end - increment_rows, end)
+            full_ms = timed(lambda: factory.create_regression_model(
+                "full", model_type, X.iloc[:end], y.iloc[:end], config))
+            update_ms = timed(lambda: factory.update_model("incremental", X.iloc[new], y.iloc[new]))
+            full_r2 = factory.models["full"]["model"].score(X_test, y_test)
+            update_r2 = factory.models["incremental"]["model"].score(X_test, y_test)
+            print(f"{end:>8} {full_ms:>14.1f} {update_ms:>10.1f} {full_r2:>8.4f} {update_r2:>10.4f}")
+
+
+def run_arima(factory, initial_rows, increment_rows, steps):
+    rng = np.random.default_rng(0)
+    total = initial_rows + increment_rows * steps
+    values = np.zeros(total)
+    noise = rng.normal(size=total)
+    for t in range(2, total):
+        values[t] = 0.6 * values[t - 1] - 0.2 * values[t - 2] + noise[t]
+    data = pd.DataFrame({"ds": pd.date_range("2000-01-01", periods=total, freq="h"), "y": values})
+    config = {"order": (2, 0, 0)}
+
+    factory.create_time_series_model("incremental", "arima", data.iloc[:initial_rows], "y", "ds", 12, config)
+    print("\narima")
+    print(f"{'rows':>8} {'full refit ms':>14} {'update ms':>10}")
+    for step in range(1, steps + 1):
+        end = initial_rows + increment_rows * step
+        full_ms = timed(lambda: factory.create_time_series_model(
+            "full", "arima", data.iloc[:end], "y", "ds", 12, config))
+        update_ms = timed(lambda: factory.update_model("incremental", data.iloc[end - increment_rows:end]))
+        print(f"{end:>8} {full_ms:>14.1f} {update_ms:>10.1f}")
+
+
+def run(initial_rows=20000, increment_rows=5000, steps=5):
+    factory = load_model_factory().ModelFactory()
+    # Every full refit overwrites a model id, which the factory logs as a warning
+    logging.getLogger("ai_prediction_backend").setLevel(logging.ERROR)
+    run_regressors(factory, initial_rows, increment_rows, steps)
+    run_arima(factory, initial_rows // 10, increment_rows // 10, steps)
+
+
+if __name__ == "__main__":
+    run(*(int(arg) for arg in sys.argv[1:4]))
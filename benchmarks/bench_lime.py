@@ -0,0 +1,58 @@
+"""Benchmark LIME explanations: per-row LimeTabularExplainer vs the cached LimeEngine.
+
+"before" builds a LimeTabularExplainer and calls explain_instance for every
+row, drawing and scoring a fresh 5,000-row neighborhood each time. "after"
+uses one LimeEngine whose perturbation sample is scored once and whose local
+models are solved for all rows together. The latency/fidelity table shows
+how neighborhood size trades explanation time against stability.
+
+Usage: python benchmarks/bench_lime.py [n_rows]
+"""
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from lime.lime_tabular import LimeTabularExplainer
+from xgboost import XGBRegressor
+
+from _common import make_regression_data, summarize, time_calls
+
+from lime_engine import LimeEngine, latency_fidelity_report
+
+NUM_FEATURES = 10
+
+
+def run(n_rows=200):
+    X, y = make_regression_data()
+    model = XGBRegressor(n_estimators=300, max_depth=6).fit(X, y)
+    reference = X.sample(1000, random_state=0)
+    rows = X.sample(n_rows, random_state=1)
+
+    def predict(values):
+        return model.predict(pd.DataFrame(values, columns=X.columns))
+
+    def before(i):
+        explainer = LimeTabularExplainer(reference.values, feature_names=X.columns.tolist(),
+                                         mode="regression", random_state=i)
+        explainer.explain_instance(rows.values[i % n_rows], predict, num_features=NUM_FEATURES)
+
+    serial_rows = min(n_rows, 20)
+    summarize("before (explainer + 5000 predictions per row)", time_calls(before, serial_rows))
+
+    engine = LimeEngine(reference, model.predict, "regression", num_samples=5000)
+    engine.prepare()
+    print(f"after: perturbation sample scored once in {engine.setup_seconds * 1000:.1f} ms")
+    summarize("after (single row)", time_calls(lambda i: engine.explain(rows.iloc[[i]], NUM_FEATURES), serial_rows))
+    start = time.perf_counter()
+    engine.explain(rows, NUM_FEATURES)
+    print(f"after (all {n_rows} rows in one call): {(time.perf_counter() - start) * 1000 / n_rows:.3f} ms per row")
+
+    print("\nnum_samples  setup_ms  ms/row  mean_score  top-k agreement")
+    for row in latency_fidelity_report(reference, model.predict, rows.iloc[:100], num_features=NUM_FEATURES):
+        print(f"{row['num_samples']:>11}  {row['setup_seconds'] * 1000:8.1f}  {row['ms_per_instance']:6.3f}"
+              f"  {row['mean_score']:10.3f}  {row['top_feature_agreement']:15.3f}")
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
@@ -0,0 +1,80 @@
+"""Benchmark recursive LSTM forecasting: one series per call vs all series batched per step.
+
+Trains one small global LSTM on a synthetic panel (N_SERIES series) through
+ModelFactory, then forecasts HORIZON steps for every series both ways and
+times repeated requests served from the cached forecast.
+
+Run from the repository root:
+
+    python benchmarks/bench_lstm_forecast.py
+"""
+import os
+import sys
+import time
+
+os.environ.setdefault("TF_CPP_MIN_LOG_LEVEL", "3")
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+import pandas as pd
+
+from _common import load_model_factory
+
+N_SERIES = int(os.getenv("BENCH_SERIES", "1000"))
+HORIZON = int(os.getenv("BENCH_HORIZON", "52"))
+HISTORY = 60
+SEQUENCE_LENGTH = 12
+SERIAL_SAMPLE = 20  # series forecast one at a time, extrapolated to N_SERIES
+
+
+def make_panel(seed=0):
+    rng = np.random.default_rng(seed)
+    weeks = np.arange(HISTORY)
+    level = rng.uniform(50, 500, size=(N_SERIES, 1))
+    season = np.sin(2 * np.pi * weeks / 52)[None, :] * level * 0.2
+    values = level + season + rng.normal(scale=5, size=(N_SERIES, HISTORY))
+    return pd.DataFrame({
+        "sku": np.repeat([f"sku_{i}" for i in range(N_SERIES)], HISTORY),
+        "week": np.tile(pd.date_range("2023-01-01", periods=HISTORY, freq="W"), N_SERIES),
+        "sales": values.ravel(),
+    })
+
+
+def main():
+    ModelFactory = load_model_factory().ModelFactory
+    factory = ModelFactory()
+    data = make_panel()
+
+    start = time.perf_counter()
+    factory.create_time_series_model(
+        "panel", "lstm", data, "sales", "week", forecast_periods=HORIZON,
+        config={"series_col": "sku", "sequence_length": SEQUENCE_LENGTH, "epochs": 1, "batch_size": 1024},
+    )
+    print(f"train + batched forecast of {N_SERIES} series x {HORIZON} steps: {time.perf_counter() - start:.1f}s")
+
+    info = factory.models["panel"]
+    model, windows = info["model"], info["last_windows"]
+
+    start = time.perf_counter()
+    batched = factory._forecast_lstm_batch(model, windows, HORIZON)
+    batched_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    serial = np.vstack([factory._forecast_lstm_batch(model, windows[i:i + 1], HORIZON)
+                        for i in range(SERIAL_SAMPLE)])
+    serial_seconds = (time.perf_counter() - start) * N_SERIES / SERIAL_SAMPLE
+
+    start = time.perf_counter()
+    for _ in range(100):
+        factory.forecast_lstm("panel", HORIZON, series_ids=["sku_0", "sku_1"])
+    cached_ms = (time.perf_counter() - start) * 10
+
+    print(f"batched forecast:          {batched_seconds:.2f}s")
+    print(f"one series per call (est): {serial_seconds:.2f}s")
+    print(f"speedup:                   {serial_seconds / batched_seconds:.1f}x")
+    print(f"cached forecast request:   {cached_ms:.3f} ms")
+    print(f"max |batched - serial|:    {np.abs(batched[:SERIAL_SAMPLE] - serial).max():.2e}")
+
+
+if __name__ == "__main__":
+    main()
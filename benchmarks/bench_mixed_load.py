@@ -0,0 +1,73 @@
+"""Mixed load test: fast predictions running alongside slow LIME explanations.
+
+Fires ``concurrency`` concurrent clients at the app in-process; a share of
+them request LIME explanations while the rest only ask for predictions.
+Prints throughput and the latency of the plain predictions, which should
+stay low when explanations run in the worker pools rather than on the
+event loop.
+
+Usage: python benchmarks/bench_mixed_load.py [n_requests] [concurrency] [lime_share]
+"""
+import asyncio
+import os
+import sys
+import time
+
+import httpx
+import numpy as np
+from xgboost import XGBRegressor
+
+from _common import load_backend, make_regression_data, summarize, temp_workdir, write_model_dir
+
+
+async def run_load(app, rows, n_requests, concurrency, lime_share):
+    transport = httpx.ASGITransport(app=app)
+    latencies = {"predict": [], "lime": []}
+    statuses = {}
+    queue = asyncio.Queue()
+    for i in range(n_requests):
+        queue.put_nowait(i)
+
+    async def worker(client):
+        while not queue.empty():
+            i = queue.get_nowait()
+            kind = "lime" if (i % 100) < lime_share * 100 else "predict"
+            payload = {
+                "model_id": "xgb",
+                "features": dict(rows[i % len(rows)], f0=float(i)),
+                "explanation_method": "lime" if kind == "lime" else None,
+            }
+            start = time.perf_counter()
+            response = await client.post("/predict", json=payload)
+            latencies[kind].append((time.perf_counter() - start) * 1000.0)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    return latencies, statuses, elapsed
+
+
+def run(n_requests=400, concurrency=32, lime_share=0.1):
+    X, y = make_regression_data(n_features=10)
+    os.chdir(temp_workdir())
+    write_model_dir("models", "xgb", XGBRegressor(n_estimators=200).fit(X, y), X)
+    backend = load_backend()
+    rows = X.head(100).to_dict("records")
+
+    latencies, statuses, elapsed = asyncio.run(run_load(backend.app, rows, n_requests, concurrency, lime_share))
+    print(f"cpus={os.cpu_count()} requests={n_requests} concurrency={concurrency} "
+          f"throughput={n_requests / elapsed:.1f} req/s statuses={statuses}")
+    for kind, values in latencies.items():
+        if values:
+            summarize(kind, np.asarray(values))
+    print(backend.execution_pool.stats())
+    backend.execution_pool.shutdown()
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    run(int(args[0]) if len(args) > 0 else 400,
+        int(args[1]) if len(args) > 1 else 32,
+        float(args[2]) if len(args) > 2 else 0.1)
@@ -0,0 +1,74 @@
+"""Benchmark nearest-neighbour explanation reuse on dashboard-like traffic.
+
+Requests revisit a few hundred rows with small perturbations (as when users
+tweak one input in a dashboard) plus a share of new rows. For each reuse
+radius the NeighborIndex either returns the SHAP values of an explained
+row nearby or the exact values are computed and added. The exact TreeSHAP
+values of every request are computed up front, so the error of every reused
+explanation is measured.
+
+Usage: python benchmarks/bench_neighbor_reuse.py [n_requests]
+"""
+import sys
+import time
+
+import numpy as np
+import shap
+from xgboost import XGBRegressor
+
+from _common import make_regression_data
+
+from batch_explanations import top_k
+from neighbor_index import NeighborIndex
+
+RADII = (0.01, 0.02, 0.05, 0.1, 0.2)
+TOP_K = 5
+
+
+def make_traffic(X, n_requests, n_hot=300, noise=0.02, new_share=0.2, seed=2):
+    rng = np.random.default_rng(seed)
+    values = X.to_numpy()
+    hot = values[rng.choice(len(values), n_hot, replace=False)]
+    requests = hot[rng.integers(n_hot, size=n_requests)]
+    requests = requests + rng.normal(scale=noise, size=requests.shape) * values.std(axis=0)
+    fresh = rng.random(n_requests) < new_share
+    requests[fresh] = values[rng.integers(len(values), size=int(fresh.sum()))]
+    return requests
+
+
+def run(n_requests=5000):
+    X, y = make_regression_data()
+    model = XGBRegressor(n_estimators=200, max_depth=6).fit(X, y)
+    background = X.sample(100, random_state=0)
+    explainer = shap.TreeExplainer(model, background)
+    requests = make_traffic(X, n_requests)
+
+    start = time.perf_counter()
+    exact = explainer(requests).values
+    exact_ms = (time.perf_counter() - start) * 1000 / n_requests
+    exact_top = top_k(exact, TOP_K)
+    print(f"exact TreeSHAP: {exact_ms:.3f} ms per row (batched)")
+    print("\nradius  reuse_rate  rel_L1_error  top5_agreement  lookup_p50_us  lookup_p99_us  rebuilds")
+
+    center, scale = background.to_numpy().mean(axis=0), background.to_numpy().std(axis=0)
+    for radius in RADII:
+        index = NeighborIndex(center, scale, radius=radius, max_size=2000)
+        errors, agreement, lookups = [], [], []
+        for i, row in enumerate(requests):
+            start = time.perf_counter()
+            reused, _ = index.nearest(row)
+            lookups.append((time.perf_counter() - start) * 1e6)
+            if reused is None:
+                index.add(row, i)
+                continue
+            values = exact[reused]
+            errors.append(np.abs(values - exact[i]).sum() / max(np.abs(exact[i]).sum(), 1e-12))
+            agreement.append(len(set(exact_top[reused]) & set(exact_top[i])) / TOP_K)
+        stats = index.stats()
+        p50, p99 = np.percentile(lookups, [50, 99])
+        print(f"{radius:6.2f}  {stats['reuse_rate']:10.3f}  {np.mean(errors) if errors else 0:12.4f}"
+              f"  {np.mean(agreement) if agreement else 1:14.3f}  {p50:13.1f}  {p99:13.1f}  {stats['rebuilds']:8d}")
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 5000)
@@ -0,0 +1,38 @@
+"""Benchmark request decoding: pandas DataFrames vs a precompiled FeatureSchema.
+
+Times turning one request dict (and a 1,000-row batch) into model input the
+old way, ``pd.DataFrame([features])`` built again for prediction, SHAP and
+LIME, against decoding once into a NumPy row with FeatureSchema and sharing
+it (plus a DataFrame view of it where a model needs column names).
+
+Usage: python benchmarks/bench_request_decoding.py [n_calls]
+"""
+import sys
+
+import numpy as np
+import pandas as pd
+
+from _common import make_regression_data, summarize, time_calls
+
+from feature_schema import FeatureSchema
+
+
+def run(n_calls=2000):
+    X, _ = make_regression_data(n_rows=5000, n_features=20)
+    schema = FeatureSchema(X.columns.tolist(), dtype=np.float32)
+    rows = X.sample(n_calls, replace=True, random_state=1).to_dict("records")
+    batch = X.sample(1000, random_state=2).to_dict("records")
+
+    summarize("1 row: pd.DataFrame([features])", time_calls(lambda i: pd.DataFrame([rows[i]]), n_calls))
+    summarize("1 row: 3 x pd.DataFrame (predict, SHAP, LIME)",
+              time_calls(lambda i: [pd.DataFrame([rows[i]]) for _ in range(3)], n_calls))
+    summarize("1 row: schema.decode", time_calls(lambda i: schema.decode(rows[i]), n_calls))
+    summarize("1 row: schema.decode + frame view", time_calls(lambda i: schema.frame(schema.decode(rows[i])), n_calls))
+
+    summarize("1000 rows: pd.DataFrame(records)", time_calls(lambda i: pd.DataFrame(batch), 50))
+    summarize("1000 rows: schema.decode_batch", time_calls(lambda i: schema.decode_batch(batch), 50))
+    assert np.array_equal(schema.decode_batch(batch), pd.DataFrame(batch)[schema.feature_names].to_numpy(np.float32))
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
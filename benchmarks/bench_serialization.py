@@ -0,0 +1,71 @@
+"""Benchmark response serialization for batch predictions.
+
+For batches of 1k, 10k and 100k predictions (and 1k rows with per-row
+explanations), times the old path, ``tolist()`` plus Starlette's
+JSONResponse, against fast_json's FastJSONResponse on the NumPy array and
+the optional MessagePack and Arrow IPC responses, then gzip and brotli (when
+installed) on the JSON body at the levels CompressionMiddleware uses.
+
+Usage: python benchmarks/bench_serialization.py [n_calls]
+"""
+import gzip
+import sys
+
+import numpy as np
+from starlette.responses import JSONResponse
+
+from _common import summarize, time_calls
+
+import fast_json
+from fast_json import FastJSONResponse
+
+
+def make_content(n_rows, explain=False, seed=0):
+    rng = np.random.default_rng(seed)
+    predictions = rng.normal(size=n_rows)
+    explanations = None
+    if explain:
+        explanations = [{"method": "shap", "base_value": 0.5,
+                         "feature_importance": {f"f{j}": float(v) for j, v in enumerate(rng.normal(size=10))}}
+                        for _ in range(n_rows)]
+    content = {"model_id": "bench", "model_version": "1", "predictions": predictions,
+               "explanations": explanations, "count": n_rows, "timestamp": "2024-01-01T00:00:00"}
+    return content, predictions, explanations
+
+
+def run(n_calls=50):
+    cases = [(1000, False), (10000, False), (100000, False), (1000, True)]
+    for n_rows, explain in cases:
+        content, predictions, explanations = make_content(n_rows, explain)
+        calls = max(5, n_calls * 1000 // (n_rows * (10 if explain else 1)))
+        label = f"{n_rows} rows" + (" + explanations" if explain else "")
+        print(f"\n{label}")
+
+        summarize("tolist + JSONResponse", time_calls(
+            lambda i: JSONResponse({**content, "predictions": predictions.tolist()}), calls))
+        summarize("FastJSONResponse (ndarray)", time_calls(lambda i: FastJSONResponse(content), calls))
+        assert fast_json.dumps(content) == fast_json.dumps({**content, "predictions": predictions.tolist()})
+
+        columns = {"prediction": predictions}
+        if explanations is not None:
+            columns["explanation"] = [fast_json.dumps(explanation).decode() for explanation in explanations]
+        if fast_json.msgpack is not None:
+            summarize("MessagePackResponse", time_calls(
+                lambda i: fast_json.negotiated_response(content, "application/msgpack"), calls))
+        if fast_json.pa is not None:
+            summarize("ArrowResponse", time_calls(
+                lambda i: fast_json.negotiated_response(content, fast_json.ARROW_STREAM_TYPE, columns), calls))
+
+        body = fast_json.dumps(content)
+        sizes = {"json": len(body)}
+        summarize("gzip level 6", time_calls(lambda i: gzip.compress(body, 6), calls))
+        summarize("gzip level 1", time_calls(lambda i: gzip.compress(body, 1), calls))
+        sizes["gzip 6"], sizes["gzip 1"] = len(gzip.compress(body, 6)), len(gzip.compress(body, 1))
+        if fast_json.brotli is not None:
+            summarize("brotli quality 4", time_calls(lambda i: fast_json.brotli.compress(body, quality=4), calls))
+            sizes["brotli 4"] = len(fast_json.brotli.compress(body, quality=4))
+        print("  bytes: " + ", ".join(f"{name} {size:,}" for name, size in sizes.items()))
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 50)
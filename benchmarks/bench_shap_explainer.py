@@ -0,0 +1,59 @@
+"""Benchmark /predict?explanation_method=shap with and without explainer reuse.
+
+"before" rebuilds the SHAP explainer on every request (the old behaviour),
+"after" uses the shared ExplainerRegistry. Every request uses distinct
+features so the explanation cache never hits.
+
+Usage: python benchmarks/bench_shap_explainer.py [n_requests]
+"""
+import os
+import sys
+
+from _common import load_backend, make_regression_data, summarize, temp_workdir, time_calls, write_model_dir
+
+from fastapi.testclient import TestClient
+from sklearn.ensemble import RandomForestRegressor
+from xgboost import XGBRegressor
+
+from explainer_registry import ExplainerRegistry
+
+
+class RebuildingRegistry(ExplainerRegistry):
+    """Reproduces the previous per-request shap.Explainer(model) construction"""
+
+    def get(self, model_id, model, info, version=None):
+        return self.build(model_id, model, info)
+
+
+def run(n_requests=200):
+    X, y = make_regression_data()
+    workdir = temp_workdir()
+    os.chdir(workdir)
+    write_model_dir("models", "xgb", XGBRegressor(n_estimators=300, max_depth=6).fit(X, y), X)
+    write_model_dir("models", "rf", RandomForestRegressor(n_estimators=100, max_depth=10).fit(X, y), X)
+
+    backend = load_backend()
+    rows = X.sample(n_requests, replace=True, random_state=1).to_dict("records")
+
+    with TestClient(backend.app) as client:
+        for model_id in ("xgb", "rf"):
+            for label, registry in (("before (rebuild per request)", RebuildingRegistry()),
+                                    ("after (shared registry)", ExplainerRegistry())):
+                backend.explainer_registry = registry
+                backend.explanation_cache.clear()
+
+                def call(i):
+                    features = dict(rows[i], f0=rows[i]["f0"] + i * 1e-9)
+                    response = client.post("/predict", json={
+                        "model_id": model_id,
+                        "features": features,
+                        "explanation_method": "shap",
+                    })
+                    response.raise_for_status()
+
+                call(-1)  # warm up imports and model loading
+                summarize(f"{model_id}: {label}", time_calls(call, n_requests))
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
@@ -0,0 +1,219 @@
+"""SHAP explanations under a latency budget.
+
+BudgetedExplainer picks the cheapest algorithm that is exact for the model:
+closed-form SHAP for linear models, TreeSHAP for tree ensembles, and
+KernelSHAP for everything else. KernelSHAP runs in rounds with a growing
+sample count, sized from the previous round's cost, and the last round that
+finished before the deadline is returned. When even the cheapest algorithm
+would miss the deadline, the stored explanation of the nearest previously
+explained row predicted as the same class (within ``max_neighbor_distance``)
+is returned instead. Estimates only change when the algorithm runs, so after
+``reprobe_after`` consecutive fallbacks one request runs it anyway to measure
+the cost again. Every result carries an ``approximate`` flag and the
+algorithm that produced it.
+"""
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+import numpy as np
+import pandas as pd
+import shap
+
+from batch_explanations import output_indices, row_explanations, shap_matrix
+from neighbor_index import NeighborIndex
+
+LINEAR, TREE, KERNEL, NEIGHBOR = "linear", "tree", "kernel", "neighbor"
+
+_TREE_MODULES = ("xgboost", "lightgbm", "catboost")
+_TREE_CLASS_HINTS = ("Forest", "Tree", "GradientBoosting", "HistGradientBoosting")
+
+
+def select_algorithm(model) -> str:
+    """Fastest exact SHAP algorithm for a model"""
+    module = type(model).__module__
+    name = type(model).__name__
+    if module.startswith(_TREE_MODULES) or (module.startswith("sklearn.") and any(h in name for h in _TREE_CLASS_HINTS)):
+        return TREE
+    if hasattr(model, "coef_") and hasattr(model, "intercept_"):
+        return LINEAR
+    return KERNEL
+
+
+class BudgetedExplainer:
+    """Deadline-aware SHAP for one model version.
+
+    Args:
+        model: Fitted model
+        background: Reference rows (SHAP background and neighbour normalization)
+        mode: 'classification' or 'regression'
+        tree_explainer: Callable returning the model's TreeExplainer (so an existing one can be shared)
+        memory_size: Exact explanations kept per predicted class for the nearest-neighbour fallback
+        kernel_background: Background rows used by KernelSHAP
+        min_kernel_samples: First KernelSHAP round size (defaults to 2 * n_features + 2)
+        max_neighbor_distance: Ignore stored explanations further than this (RMS distance, see NeighborIndex)
+        reprobe_after: Consecutive fallbacks after which the next request with time left runs the
+            algorithm anyway, refreshing a stale cost estimate (0 never re-probes)
+    """
+
+    def __init__(self, model, background: pd.DataFrame, mode: str = "regression",
+                 tree_explainer: Optional[Callable[[], Any]] = None, memory_size: int = 1000,
+                 kernel_background: int = 20, min_kernel_samples: Optional[int] = None,
+                 max_neighbor_distance: float = 0.25, reprobe_after: int = 50, random_state: int = 0):
+        self.model = model
+        self.mode = mode
+        self.feature_names = list(background.columns)
+        self.algorithm = select_algorithm(model)
+        self.max_neighbor_distance = max_neighbor_distance
+        self.reprobe_after = reprobe_after
+        n_features = len(self.feature_names)
+        self.min_kernel_samples = min_kernel_samples or 2 * n_features + 2
+        # KernelSHAP enumerates every coalition once the sample count covers them all
+        self.exhaustive_samples = 2 ** n_features - 2 if n_features < 31 else None
+
+        values = background.to_numpy(dtype=np.float64)
+        self.background_mean = values.mean(axis=0)
+        self.background_std = values.std(axis=0)
+        self.memory_size = memory_size
+        self.memories = {}  # explained output (None for regression) -> NeighborIndex of exact explanations
+        self._kernel_background = background.sample(min(kernel_background, len(background)),
+                                                     random_state=random_state)
+        self._tree_explainer = tree_explainer or (lambda: shap.TreeExplainer(model, background))
+        # KernelExplainer keeps per-call state on the instance, so each worker thread gets its own
+        self._local = threading.local()
+        self._latency = {}  # algorithm -> EWMA seconds per call (kernel: per sample)
+        self._fallbacks = 0  # Requests answered without running the algorithm since it last ran
+
+    def _record_latency(self, algorithm: str, seconds: float):
+        previous = self._latency.get(algorithm)
+        self._latency[algorithm] = seconds if previous is None else 0.8 * previous + 0.2 * seconds
+
+    def _memory(self, output: Optional[int]) -> NeighborIndex:
+        """Stored explanations of rows explained for ``output``"""
+        memory = self.memories.get(output)
+        if memory is None:
+            memory = self.memories.setdefault(output, NeighborIndex(
+                self.background_mean, self.background_std, radius=self.max_neighbor_distance,
+                max_size=self.memory_size))
+        return memory
+
+    def _output_index(self, X: pd.DataFrame, prediction=None) -> Optional[int]:
+        if self.mode != "classification":
+            return None
+        outputs = output_indices(self.model, None if prediction is None else [prediction])
+        return int(outputs[0]) if outputs is not None else None
+
+    def _linear(self, X: pd.DataFrame, output: Optional[int]):
+        coef = np.atleast_2d(np.asarray(self.model.coef_, dtype=np.float64))
+        intercept = np.atleast_1d(np.asarray(self.model.intercept_, dtype=np.float64))
+        # Binary classifiers have a single row of coefficients for the positive class
+        row = 0 if len(coef) == 1 else (output if output is not None else len(coef) - 1)
+        values = coef[row] * (X.to_numpy(dtype=np.float64) - self.background_mean)
+        base = intercept[min(row, len(intercept) - 1)] + coef[row] @ self.background_mean
+        return values, np.full(len(X), base)
+
+    def _tree(self, X: pd.DataFrame, output: Optional[int], explainer):
+        return shap_matrix(explainer(X), None if output is None else np.array([output]))
+
+    def _kernel_explainer(self, output: Optional[int]) -> shap.KernelExplainer:
+        explainers = getattr(self._local, "explainers", None)
+        if explainers is None:
+            explainers = self._local.explainers = {}
+        explainer = explainers.get(output)
+        if explainer is None:
+            columns = self.feature_names
+            if self.mode == "classification" and hasattr(self.model, "predict_proba"):
+                column = -1 if output is None else output
+
+                def predict(values):
+                    return self.model.predict_proba(pd.DataFrame(values, columns=columns))[:, column]
+            else:
+                def predict(values):
+                    return np.asarray(self.model.predict(pd.DataFrame(values, columns=columns)), dtype=np.float64)
+            explainer = shap.KernelExplainer(predict, self._kernel_background.to_numpy(dtype=np.float64))
+            explainers[output] = explainer
+        return explainer
+
+    def _kernel(self, X: pd.DataFrame, output: Optional[int], deadline: float):
+        """Rounds of KernelSHAP with doubling sample counts until the next round would miss the deadline"""
+        explainer = self._kernel_explainer(output)
+        row = X.to_numpy(dtype=np.float64)
+        n_samples = self.min_kernel_samples
+        result, used = None, 0
+        while True:
+            start = time.monotonic()
+            values = np.asarray(explainer.shap_values(row, nsamples=n_samples, silent=True)).reshape(1, -1)
+            elapsed = time.monotonic() - start
+            self._record_latency(KERNEL, elapsed / n_samples)
+            result, used = values, n_samples
+            if self.exhaustive_samples is not None and used >= self.exhaustive_samples:
+                break
+            next_samples = n_samples * 2
+            if self.exhaustive_samples is not None:
+                next_samples = min(next_samples, self.exhaustive_samples)
+            if time.monotonic() + elapsed * next_samples / n_samples > deadline:
+                break
+            n_samples = next_samples
+        base = float(np.ravel(explainer.expected_value)[0])
+        exact = self.exhaustive_samples is not None and used >= self.exhaustive_samples
+        return result, np.array([base]), used, exact
+
+    def estimated_seconds(self) -> Optional[float]:
+        """Expected cost of the cheapest exact-algorithm result, if it has been measured"""
+        per_call = self._latency.get(self.algorithm)
+        if per_call is None:
+            return None
+        return per_call * self.min_kernel_samples if self.algorithm == KERNEL else per_call
+
+    def explain(self, X: pd.DataFrame, deadline: float, num_features: int = 10,
+                prediction=None) -> Optional[Dict[str, Any]]:
+        """Explain one row, returning by ``deadline`` (a time.monotonic() value) when possible.
+
+        Returns:
+            Explanation dict with ``approximate``, ``algorithm`` and ``elapsed_ms``,
+            or None when the deadline left no time and no stored explanation exists
+        """
+        start = time.monotonic()
+        output = self._output_index(X, prediction)
+        row = X.to_numpy(dtype=np.float64)[0]
+        estimate = self.estimated_seconds()
+        remaining = deadline - start
+
+        over_budget = estimate is not None and estimate > remaining
+        if over_budget and remaining > 0 and self.reprobe_after and self._fallbacks >= self.reprobe_after:
+            # Re-measure from scratch: the estimate may be stale
+            over_budget = False
+            self._latency.pop(self.algorithm, None)
+        if remaining <= 0 or over_budget:
+            self._fallbacks += 1
+            stored, distance = self._memory(output).nearest(row)
+            if stored is None:
+                return None
+            explanation = row_explanations(stored[0][None, :], np.array([stored[1]]), self.feature_names,
+                                           num_features, include_values=True)[0]
+            return dict(explanation, approximate=True, algorithm=NEIGHBOR, neighbor_distance=distance,
+                        elapsed_ms=(time.monotonic() - start) * 1000.0)
+
+        self._fallbacks = 0
+        extra = {}
+        if self.algorithm == KERNEL:
+            values, base_values, used, exact = self._kernel(X, output, deadline)
+            extra["kernel_samples"] = used
+        elif self.algorithm == LINEAR:
+            call_start = time.monotonic()
+            values, base_values = self._linear(X, output)
+            self._record_latency(LINEAR, time.monotonic() - call_start)
+            exact = True
+        else:
+            # The explainer is built once on first use; only the explanation itself is timed
+            tree_explainer = self._tree_explainer()
+            call_start = time.monotonic()
+            values, base_values = self._tree(X, output, tree_explainer)
+            self._record_latency(TREE, time.monotonic() - call_start)
+            exact = True
+
+        if exact:
+            self._memory(output).add(row, (values[0], float(base_values[0])))
+        explanation = row_explanations(values, base_values, self.feature_names, num_features, include_values=True)[0]
+        return dict(explanation, approximate=not exact, algorithm=self.algorithm,
+                    elapsed_ms=(time.monotonic() - start) * 1000.0, **extra)
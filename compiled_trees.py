@@ -0,0 +1,493 @@
+"""Compiled single-row and small-batch inference for tree ensembles.
+
+``model.predict`` on a one-row DataFrame spends almost all of its time in
+pandas construction, input validation and (for forests) thread dispatch,
+not in the trees. A compiled predictor takes float rows in a fixed feature
+order, checked once against the model's feature names, and skips all of it:
+
+- scikit-learn random forests, extra-trees and decision trees are flattened
+  into one set of node arrays and every tree is walked at once with
+  vectorized NumPy gathers, one step per tree level
+- XGBoost sklearn-API models call ``Booster.inplace_predict`` on a float32
+  array, with the same iteration range and label mapping as ``predict``
+
+``compile_model`` only returns a predictor after it reproduced
+``model.predict`` exactly (values and dtype) on a reference sample plus rows
+probing both sides of every split threshold; anything unsupported or
+mismatching returns None and callers keep using ``model.predict``. Rows the
+predictor cannot take as-is (missing or unknown fields, non-numeric values,
+NaN for forests) are likewise reported as None so they take the pandas path.
+"""
+import json
+import logging
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+FOREST, XGBOOST = "forest", "xgboost"
+
+# Rows probing split thresholds in the self-check
+_PROBE_ROWS = 256
+# Levels walked between checks whether a single row has reached a leaf in every tree
+_LEAF_CHECK_LEVELS = 4
+# XGBoost objectives whose prediction is the raw margin, and classifier objectives labelled from margins
+_MARGIN_OBJECTIVES = ("reg:squarederror", "reg:linear", "reg:absoluteerror", "reg:pseudohubererror")
+_LABEL_OBJECTIVES = ("binary:logistic", "multi:softprob")
+# Margins closer than this to a label tie are resolved by XGBoost itself
+_TIE_MARGIN = 1e-5
+
+
+def _numeric(value) -> bool:
+    return isinstance(value, (int, float, np.number)) and not isinstance(value, (bool, np.bool_))
+
+
+def _model_feature_names(model) -> Optional[List[str]]:
+    names = getattr(model, "feature_names_in_", None)
+    if names is not None:
+        return [str(name) for name in names]
+    if type(model).__module__.startswith("xgboost") and hasattr(model, "get_booster"):
+        try:
+            names = model.get_booster().feature_names
+        except Exception:
+            return None
+        return list(names) if names else None
+    return None
+
+
+def resolve_feature_order(model, feature_names: Optional[Sequence[str]] = None) -> Optional[List[str]]:
+    """Feature order shared by the model and its metadata, or None if they disagree or neither has one"""
+    declared = list(feature_names) if feature_names else None
+    learned = _model_feature_names(model)
+    if declared and learned and declared != learned:
+        return None
+    order = declared or learned
+    n_features = getattr(model, "n_features_in_", None)
+    if not order or (n_features is not None and len(order) != n_features):
+        return None
+    return order
+
+
+class CompiledPredictor(ABC):
+    """Base class: feature decoding shared by every compiled model.
+
+    Args:
+        model: The fitted model this predictor reproduces
+        feature_names: Column order of the rows passed to ``predict``
+    """
+
+    kind = None
+    allow_nan = False
+
+    def __init__(self, model, feature_names: List[str]):
+        self.model = model
+        self.feature_names = list(feature_names)
+        self.n_features = len(self.feature_names)
+        self._names = set(self.feature_names)
+
+    def vector(self, features: Dict[str, Any]) -> Optional[np.ndarray]:
+        """One float32 row in feature order, or None if the dict does not match the schema exactly"""
+        if len(features) != self.n_features:
+            return None
+        try:
+            values = [features[name] for name in self.feature_names]
+        except KeyError:
+            return None
+        if not all(_numeric(value) for value in values):
+            return None
+        row = np.array([values], dtype=np.float32)
+        if not self.allow_nan and np.isnan(row).any():
+            return None
+        return row
+
+    def matrix(self, df: pd.DataFrame) -> Optional[np.ndarray]:
+        """A DataFrame as float32 rows in feature order, or None if its columns or dtypes do not fit"""
+        if len(df.columns) != self.n_features or set(df.columns) != self._names:
+            return None
+        if not all(isinstance(dtype, np.dtype) and dtype.kind in "iuf" for dtype in df.dtypes):
+            return None
+        X = df.to_numpy(dtype=np.float32)
+        if list(df.columns) != self.feature_names:
+            X = X[:, [df.columns.get_loc(name) for name in self.feature_names]]
+        if not self.allow_nan and np.isnan(X).any():
+            return None
+        return X
+
+    @abstractmethod
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        """Predictions for float32 rows in feature order; identical to ``model.predict``"""
+
+    def predict_rows(self, X: np.ndarray) -> Optional[np.ndarray]:
+        """Predictions for already decoded float32 rows, or None if they hold NaN this predictor cannot take"""
+        if not self.allow_nan and np.isnan(X).any():
+            return None
+        return self.predict(X)
+
+    def predict_one(self, features: Dict[str, Any]):
+        """Prediction for a feature dict, or None when it must take the pandas path"""
+        row = self.vector(features)
+        if row is None:
+            return None
+        return self.predict(row)[0]
+
+    def predict_frame(self, df: pd.DataFrame) -> Optional[np.ndarray]:
+        """Predictions for a DataFrame, or None when it must take the pandas path"""
+        X = self.matrix(df)
+        if X is None:
+            return None
+        return self.predict(X)
+
+    def probe_rows(self, n_rows: int, seed: int = 0) -> Optional[np.ndarray]:
+        """Rows landing on and around split thresholds, for the compile-time self-check"""
+        return None
+
+
+class TreeEnsemblePredictor(CompiledPredictor):
+    """Trees flattened into shared node arrays and walked level by level.
+
+    Node ``k`` occupies slots ``2k`` (go left) and ``2k + 1`` (go right) of the
+    child table, and the walk carries doubled node indices, so one step for
+    all trees at once is
+    ``nodes = children[nodes + (x[feature[nodes]] > threshold[nodes])]``.
+    Leaves point back to themselves, so every tree can take the same number
+    of steps; one row costs a handful of NumPy calls per level of the deepest
+    tree, whatever the number of trees.
+    """
+
+    def _flatten(self, trees: List[Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]]):
+        """Build the node arrays from (feature, threshold, left, right) per tree, -1 marking leaves.
+
+        Rows go right when ``x > threshold``.
+        """
+        features, thresholds, children, roots = [], [], [], []
+        offset, depth = 0, 0
+        for feature, threshold, left, right in trees:
+            leaf = left == -1
+            node_ids = np.arange(offset, offset + len(left))
+            left = np.where(leaf, node_ids, left + offset)
+            right = np.where(leaf, node_ids, right + offset)
+            features.append(np.where(leaf, 0, feature))
+            thresholds.append(np.where(leaf, np.inf, threshold))
+            children.append(np.stack([left, right], axis=1).ravel() * 2)
+            roots.append(offset * 2)
+            depth = max(depth, _tree_depth(left - offset, right - offset, leaf))
+            offset += len(leaf)
+
+        self.depth = depth
+        self.n_nodes = offset
+        self._features = np.repeat(np.concatenate(features), 2).astype(np.intp)
+        self._thresholds = np.repeat(np.concatenate(thresholds), 2).astype(np.float64)
+        self._children = np.concatenate(children).astype(np.intp)
+        self._roots = np.array(roots, dtype=np.intp)
+
+    def leaves(self, X: np.ndarray) -> np.ndarray:
+        """Leaf node index per (row, tree)"""
+        x = X.astype(np.float64).ravel()
+        features, thresholds, children = self._features, self._thresholds, self._children
+        if len(X) == 1:
+            nodes = self._roots.copy()
+            for level in range(self.depth):
+                # A single row rarely needs the deepest path; stop once every tree sits on a leaf
+                if level % _LEAF_CHECK_LEVELS == _LEAF_CHECK_LEVELS - 1 and (children[nodes] == nodes).all():
+                    break
+                nodes = children[nodes + (x[features[nodes]] > thresholds[nodes])]
+            nodes = nodes[np.newaxis, :]
+        else:
+            nodes = np.repeat(self._roots[np.newaxis, :], len(X), axis=0)
+            base = (np.arange(len(X)) * X.shape[1])[:, np.newaxis]
+            for _ in range(self.depth):
+                nodes = children[nodes + (x[features[nodes] + base] > thresholds[nodes])]
+        return nodes >> 1
+
+    def probe_rows(self, n_rows: int, seed: int = 0) -> Optional[np.ndarray]:
+        rng = np.random.default_rng(seed)
+        split = np.isfinite(self._thresholds[::2])
+        if not split.any():
+            return None
+        features = self._features[::2][split]
+        thresholds = self._thresholds[::2][split]
+        X = np.zeros((n_rows, self.n_features), dtype=np.float32)
+        for column in range(self.n_features):
+            candidates = thresholds[features == column]
+            if not len(candidates):
+                continue
+            picked = candidates[rng.integers(len(candidates), size=n_rows)]
+            # float32 values just below, at and just above each threshold
+            nudged = picked + np.abs(picked) * rng.choice([-1e-6, 0.0, 1e-6], size=n_rows)
+            X[:, column] = nudged.astype(np.float32)
+        return X
+
+
+def _tree_depth(left: np.ndarray, right: np.ndarray, leaf: np.ndarray) -> int:
+    """Levels below the root (0-based node ids, leaves pointing to themselves)"""
+    frontier, depth = np.array([0]), 0
+    while True:
+        frontier = frontier[~leaf[frontier]]
+        if not len(frontier):
+            return depth
+        frontier = np.concatenate([left[frontier], right[frontier]])
+        depth += 1
+
+
+class ForestPredictor(TreeEnsemblePredictor):
+    """Scikit-learn random forests, extra-trees and decision trees (single output).
+
+    Tree outputs are summed in estimator order and divided by the tree count,
+    as scikit-learn does, which keeps results bit-identical.
+    """
+
+    kind = FOREST
+
+    def __init__(self, model, feature_names: List[str]):
+        super().__init__(model, feature_names)
+        estimators = list(getattr(model, "estimators_", None) or [model])
+        self.n_trees = len(estimators)
+        self.is_forest = hasattr(model, "estimators_")
+        self.classes = getattr(model, "classes_", None)
+        # scikit-learn sends rows with x <= threshold left, on float32 inputs
+        self._flatten([(e.tree_.feature, e.tree_.threshold, e.tree_.children_left, e.tree_.children_right)
+                       for e in estimators])
+        self._values = np.concatenate([self._leaf_values(e.tree_.value) for e in estimators])
+
+    def _leaf_values(self, value: np.ndarray) -> np.ndarray:
+        if self.classes is None:
+            return value[:, 0, 0].astype(np.float64)
+        counts = value[:, 0, :len(self.classes)].astype(np.float64)
+        if not self.is_forest:
+            # DecisionTreeClassifier.predict takes the argmax of the raw node values
+            return counts
+        normalizer = counts.sum(axis=1)[:, np.newaxis]
+        normalizer[normalizer == 0.0] = 1.0
+        return counts / normalizer
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        outputs = self._values[self.leaves(X)]
+        # Sequential sum in estimator order (np.sum would add pairwise and round differently)
+        total = np.cumsum(outputs, axis=1)[:, -1]
+        if self.is_forest:
+            total /= self.n_trees
+        if self.classes is None:
+            return total
+        return self.classes.take(np.argmax(total, axis=1), axis=0)
+
+
+class XGBoostPredictor(CompiledPredictor):
+    """XGBoost sklearn-API models predicted through ``Booster.inplace_predict`` on float32 arrays."""
+
+    kind = XGBOOST
+    allow_nan = True
+
+    def __init__(self, model, feature_names: List[str]):
+        super().__init__(model, feature_names)
+        self.booster = model.get_booster()
+        self.iteration_range = model._get_iteration_range(None)
+        self.missing = model.missing
+        self.is_classifier = hasattr(model, "n_classes_")
+
+    def margin(self, X: np.ndarray) -> np.ndarray:
+        return self.booster.inplace_predict(X, iteration_range=self.iteration_range, predict_type="margin",
+                                            missing=self.missing, validate_features=False)
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        predictions = self.booster.inplace_predict(
+            X,
+            iteration_range=self.iteration_range,
+            predict_type="value",
+            missing=self.missing,
+            validate_features=False,
+        )
+        if not self.is_classifier:
+            return predictions
+        # Same label mapping as XGBClassifier.predict
+        if len(predictions.shape) > 1 and self.model.n_classes_ != 2:
+            return np.argmax(predictions, axis=1)
+        if len(predictions.shape) > 1 and predictions.shape[1] != 1:
+            labels = np.zeros(predictions.shape)
+            labels[predictions > 0.5] = 1
+            return labels
+        if self.model.objective == "multi:softmax":
+            return predictions.astype(np.int32)
+        labels = np.repeat(0, predictions.shape[0])
+        labels[predictions > 0.5] = 1
+        return labels
+
+
+class XGBoostTreePredictor(TreeEnsemblePredictor):
+    """XGBoost gbtree models flattened from their JSON dump.
+
+    The margin is the base score plus the leaf values summed in float32 in
+    tree order, as XGBoost's CPU predictor does. Regression objectives whose
+    prediction is the margin itself are served directly; binary:logistic and
+    multi:softprob classifiers take their label from the margins, and rows
+    whose label is within float rounding of a tie (or that contain a missing
+    value, NaN or the model's ``missing``, which follows each node's default
+    direction) are passed to ``inplace_predict``.
+    """
+
+    kind = XGBOOST
+    allow_nan = True
+
+    def __init__(self, model, feature_names: List[str]):
+        super().__init__(model, feature_names)
+        self._inplace = XGBoostPredictor(model, feature_names)
+        missing = self._inplace.missing
+        self.missing = None if missing is None or np.isnan(missing) else np.float32(missing)
+        learner = json.loads(model.get_booster().save_raw("json"))["learner"]
+        self.objective = learner["objective"]["name"]
+        self.is_classifier = hasattr(model, "n_classes_")
+        supported = _LABEL_OBJECTIVES if self.is_classifier else _MARGIN_OBJECTIVES
+        booster = learner["gradient_booster"]
+        if booster["name"] != "gbtree" or self.objective not in supported:
+            raise ValueError(f"{booster['name']} booster with {self.objective} is not compiled")
+        if int(learner["learner_model_param"].get("num_target", "1")) != 1:
+            raise ValueError("multi-target models are not compiled")
+
+        trees = booster["model"]["trees"]
+        tree_info = booster["model"]["tree_info"]
+        indptr = booster["model"].get("iteration_indptr") or list(range(len(trees) + 1))
+        begin, end = self._inplace.iteration_range
+        end = end or len(indptr) - 1
+        selected = range(indptr[begin], indptr[end])
+        if any(any(trees[i]["split_type"]) for i in selected):
+            raise ValueError("categorical splits are not compiled")
+        self.n_groups = max(int(learner["learner_model_param"].get("num_class", "0")), 1)
+
+        # Trees are laid out group by group (keeping their order within a group), each group
+        # led by a single-leaf pseudo tree holding the base margin, so a running float32
+        # sum over the group starts from it exactly as XGBoost's does
+        groups = np.asarray(tree_info)[list(selected)]
+        arrays, values = [], []
+        for group in range(self.n_groups):
+            arrays.append((np.zeros(1), np.zeros(1), np.full(1, -1), np.full(1, -1)))
+            values.append(np.zeros(1, dtype=np.float32))
+            for i in np.asarray(selected)[groups == group]:
+                tree = trees[i]
+                left = np.asarray(tree["left_children"], dtype=np.int64)
+                conditions = np.asarray(tree["split_conditions"], dtype=np.float32)
+                # XGBoost sends x < threshold left; on float32 inputs that is x > (threshold - 1 ulp) right
+                threshold = np.nextafter(conditions.astype(np.float64), -np.inf)
+                arrays.append((np.asarray(tree["split_indices"], dtype=np.int64), threshold, left,
+                               np.asarray(tree["right_children"], dtype=np.int64)))
+                values.append(np.where(left == -1, conditions, np.float32(0)))
+        if len(arrays) % self.n_groups:
+            raise ValueError("output groups have different numbers of trees")
+        self._flatten(arrays)
+        self._values = np.concatenate(values)
+        self._base_nodes = self._roots[::len(arrays) // self.n_groups] >> 1
+        self._set_base_margin(learner["learner_model_param"]["base_score"])
+
+    def _set_base_margin(self, base_score: str):
+        """Pick the float32 base margin that reproduces XGBoost's margins on probe rows"""
+        scores = np.atleast_1d(np.asarray(json.loads(base_score), dtype=np.float64))
+        scores = np.broadcast_to(scores, (self.n_groups,))
+        candidates = [scores.astype(np.float32)]
+        if self.objective == "binary:logistic":
+            candidates.append(-np.log(1.0 / scores - 1.0).astype(np.float32))
+            score32 = scores.astype(np.float32)
+            candidates.append(-np.log(np.float32(1.0) / score32 - np.float32(1.0)))
+        probes = self.probe_rows(64)
+        probes = probes[~self.missing_rows(probes)]
+        if not len(probes):
+            raise ValueError("no probe rows without missing values")
+        expected = self._inplace.margin(probes).reshape(len(probes), -1)
+        for candidate in candidates:
+            self._values[self._base_nodes] = candidate
+            if np.array_equal(self.margin(probes), expected):
+                return
+        raise ValueError("could not reproduce the model's base margin")
+
+    def margin(self, X: np.ndarray) -> np.ndarray:
+        """Raw scores, one column per output group"""
+        outputs = self._values[self.leaves(X)].reshape(len(X), self.n_groups, -1)
+        return np.cumsum(outputs, axis=2, dtype=np.float32)[:, :, -1]
+
+    def missing_rows(self, X: np.ndarray) -> np.ndarray:
+        """Rows holding a value XGBoost treats as missing: NaN, or the model's ``missing`` value"""
+        missing = np.isnan(X)
+        if self.missing is not None:
+            missing |= X == self.missing
+        return missing.any(axis=1)
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        if self.missing_rows(X).any():
+            return self._inplace.predict(X)
+        margin = self.margin(X)
+        if not self.is_classifier:
+            return margin[:, 0]
+        if self.n_groups == 1:
+            labels = np.repeat(0, len(X))
+            labels[margin[:, 0] > 0] = 1
+            unsure = np.abs(margin[:, 0]) < _TIE_MARGIN
+        else:
+            labels = np.argmax(margin, axis=1)
+            top = np.sort(margin, axis=1)[:, -2:]
+            unsure = top[:, 1] - top[:, 0] < _TIE_MARGIN
+        if unsure.any():
+            labels[unsure] = self._inplace.predict(X[unsure])
+        return labels
+
+
+def _predictor_classes(model) -> list:
+    """Compiled predictors that may serve a model, fastest first"""
+    module = type(model).__module__
+    if module.startswith("sklearn."):
+        estimators = getattr(model, "estimators_", None)
+        trees = estimators if estimators is not None else [model]
+        if len(trees) and all(hasattr(tree, "tree_") for tree in trees) and getattr(model, "n_outputs_", 1) == 1:
+            return [ForestPredictor]
+        return []
+    if module.startswith("xgboost") and hasattr(model, "get_booster") and hasattr(model, "_get_iteration_range"):
+        if getattr(model, "_can_use_inplace_predict", lambda: False)():
+            return [XGBoostTreePredictor, XGBoostPredictor]
+    return []
+
+
+def _self_check(model, predictor: CompiledPredictor, order: List[str], sample: Optional[pd.DataFrame]) -> bool:
+    """Whether the predictor reproduces model.predict on the sample and on threshold probes"""
+    checks = []
+    if sample is not None and set(order) <= set(sample.columns):
+        frame = sample[order] if predictor.allow_nan else sample[order].dropna()
+        X = predictor.matrix(frame)
+        if X is not None and len(X):
+            checks.append((frame, X))
+    probes = predictor.probe_rows(_PROBE_ROWS)
+    if probes is not None:
+        checks.append((pd.DataFrame(probes, columns=order), probes))
+    if not checks:
+        return False
+    for frame, X in checks:
+        expected = np.asarray(model.predict(frame))
+        actual = predictor.predict(X)
+        if expected.dtype != actual.dtype or not np.array_equal(expected, actual, equal_nan=expected.dtype.kind == "f"):
+            return False
+    return True
+
+
+def compile_model(model, feature_names: Optional[Sequence[str]] = None,
+                  sample: Optional[pd.DataFrame] = None) -> Optional[CompiledPredictor]:
+    """Build a compiled predictor that reproduces ``model.predict`` exactly, or return None.
+
+    Args:
+        model: Fitted model
+        feature_names: Feature order from the model's metadata, validated against the model's own names
+        sample: Reference rows (e.g. the explainer background) for the self-check
+
+    Returns:
+        A CompiledPredictor, or None when the model type is unsupported, the feature
+        order is unknown or inconsistent, or the compiled outputs differ from the model's
+    """
+    order = resolve_feature_order(model, feature_names)
+    if order is None:
+        return None
+    for predictor_class in _predictor_classes(model):
+        try:
+            predictor = predictor_class(model, order)
+        except Exception as e:
+            logger.info(f"Could not compile {type(model).__name__} as {predictor_class.__name__}: {e}")
+            continue
+        if _self_check(model, predictor, order, sample):
+            return predictor
+    return None
@@ -0,0 +1,241 @@
+"""Vectorized distribution drift metrics (KS, PSI, KL) over binned windows.
+
+A ReferenceProfile holds quantile bin edges and bin probabilities for every
+feature (plus, optionally, the model's predictions) computed once from the
+training data. Current windows are binned against it for all features in a
+single NumPy pass, and the metrics are derived from the two histograms, so
+the cost of a check depends on window size x features x bins only.
+
+Many features are tested at once, so the KS p-values are adjusted with
+Benjamini-Hochberg, windows must hold enough rows per bin for PSI/KL noise to
+stay well under their thresholds (sampling noise alone gives PSI of about
+(bins - 1) / n), and drift is only reported when a minimum share of the
+features drifted or the predictions did.
+"""
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+from scipy.stats import kstwobign
+
+PREDICTION_KEY = "__prediction__"
+
+DEFAULT_THRESHOLDS = {
+    "psi": 0.2,          # > 0.2 is the usual "significant shift" rule of thumb
+    "kl": 0.1,
+    "ks_pvalue": 0.01,
+}
+
+
+def _quantile_edges(values: np.ndarray, n_bins: int) -> np.ndarray:
+    """Quantile bin edges per column, shape (n_columns, n_bins + 1)"""
+    quantiles = np.linspace(0.0, 1.0, n_bins + 1)
+    with np.errstate(all="ignore"):
+        edges = np.nanquantile(values, quantiles, axis=0).T
+    # Columns that are entirely NaN get a dummy range
+    return np.nan_to_num(edges, nan=0.0)
+
+
+def bin_counts(values: np.ndarray, edges: np.ndarray, block_rows: int = 2048) -> np.ndarray:
+    """Histogram every column of ``values`` against its own edges in one pass.
+
+    Args:
+        values: Array of shape (n_rows, n_columns); NaNs are ignored
+        edges: Array of shape (n_columns, n_bins + 1); outer edges are open,
+            so out-of-range values fall into the first/last bin
+
+    Returns:
+        Integer counts of shape (n_columns, n_bins)
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if values.ndim == 1:
+        values = values[:, None]
+    n_columns, n_bins = edges.shape[0], edges.shape[1] - 1
+    interior = edges[:, 1:-1]
+    offsets = np.arange(n_columns) * n_bins
+    counts = np.zeros(n_columns * n_bins, dtype=np.int64)
+
+    # Rows are processed in blocks to bound the (rows, columns, bins) temporary
+    for start in range(0, len(values), block_rows):
+        block = values[start:start + block_rows]
+        idx = (block[:, :, None] >= interior[None, :, :]).sum(axis=2)
+        flat = (idx + offsets)[~np.isnan(block)]
+        counts += np.bincount(flat, minlength=n_columns * n_bins)
+    return counts.reshape(n_columns, n_bins)
+
+
+def benjamini_hochberg(pvalues: np.ndarray) -> np.ndarray:
+    """Benjamini-Hochberg adjusted p-values, controlling the false discovery rate across columns"""
+    pvalues = np.asarray(pvalues, dtype=np.float64)
+    m = len(pvalues)
+    if m == 0:
+        return pvalues
+    order = np.argsort(pvalues)
+    ranked = pvalues[order] * m / np.arange(1, m + 1)
+    adjusted = np.empty(m)
+    adjusted[order] = np.minimum(np.minimum.accumulate(ranked[::-1])[::-1], 1.0)
+    return adjusted
+
+
+def distribution_metrics(reference_probs: np.ndarray, current_counts: np.ndarray,
+                         reference_count: int, eps: float = 1e-6) -> Dict[str, np.ndarray]:
+    """PSI, KL divergence and binned KS statistic/p-value for every column at once"""
+    n = current_counts.sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        current_probs = current_counts / np.maximum(n, 1)[:, None]
+
+    p = np.clip(current_probs, eps, None)
+    q = np.clip(reference_probs, eps, None)
+    p = p / p.sum(axis=1, keepdims=True)
+    q = q / q.sum(axis=1, keepdims=True)
+    log_ratio = np.log(p / q)
+
+    psi = ((p - q) * log_ratio).sum(axis=1)
+    kl = (p * log_ratio).sum(axis=1)
+    # KS on binned CDFs; a lower bound of the exact statistic at bin resolution
+    ks = np.abs(np.cumsum(current_probs, axis=1) - np.cumsum(reference_probs, axis=1)).max(axis=1)
+    n_eff = n * reference_count / np.maximum(n + reference_count, 1)
+    ks_pvalue = kstwobign.sf(np.sqrt(n_eff) * ks)
+
+    return {"n": n, "psi": psi, "kl": kl, "ks": ks, "ks_pvalue": ks_pvalue}
+
+
+class ReferenceProfile:
+    """Reference histograms for a model's features and predictions"""
+
+    def __init__(self, columns: List[str], edges: np.ndarray, probs: np.ndarray, count: int):
+        self.columns = list(columns)
+        self.edges = np.asarray(edges, dtype=np.float64)
+        self.probs = np.asarray(probs, dtype=np.float64)
+        self.count = int(count)
+        self._index = {name: i for i, name in enumerate(self.columns)}
+
+    @classmethod
+    def from_data(cls, X: pd.DataFrame, predictions: Optional[Sequence[float]] = None,
+                  n_bins: int = 20) -> "ReferenceProfile":
+        """Build a profile from training features (numeric columns only) and predictions"""
+        numeric = X.select_dtypes(include=[np.number])
+        columns = numeric.columns.tolist()
+        values = numeric.to_numpy(dtype=np.float64)
+        if predictions is not None:
+            try:
+                prediction_values = np.asarray(predictions, dtype=np.float64).reshape(-1, 1)
+            except (TypeError, ValueError):
+                prediction_values = None
+            if prediction_values is not None and len(prediction_values) == len(values):
+                values = np.hstack([values, prediction_values])
+                columns.append(PREDICTION_KEY)
+
+        edges = _quantile_edges(values, n_bins)
+        counts = bin_counts(values, edges)
+        probs = counts / np.maximum(counts.sum(axis=1, keepdims=True), 1)
+        return cls(columns, edges, probs, len(values))
+
+    @property
+    def feature_names(self) -> List[str]:
+        return [c for c in self.columns if c != PREDICTION_KEY]
+
+    def has_predictions(self) -> bool:
+        return PREDICTION_KEY in self._index
+
+    def select(self, names: Sequence[str]):
+        idx = [self._index[name] for name in names]
+        return self.edges[idx], self.probs[idx]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "columns": self.columns,
+            "edges": self.edges.tolist(),
+            "probs": self.probs.tolist(),
+            "count": self.count,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ReferenceProfile":
+        return cls(data["columns"], data["edges"], data["probs"], data["count"])
+
+
+class DriftEngine:
+    """Compares feature and prediction windows against a ReferenceProfile.
+
+    Args:
+        thresholds: Overrides of DEFAULT_THRESHOLDS; the KS p-value threshold applies after correction
+        min_samples: Fewest rows a window needs before it is tested
+        min_samples_per_bin: Also require this many rows per reference bin
+        min_drifted_features: Fewest drifted features that count as feature drift
+        min_drifted_fraction: Also require this share of the profiled features to have drifted
+    """
+
+    def __init__(self, thresholds: Optional[Dict[str, float]] = None, min_samples: int = 100,
+                 min_samples_per_bin: int = 25, min_drifted_features: int = 1,
+                 min_drifted_fraction: float = 0.1):
+        self.thresholds = dict(DEFAULT_THRESHOLDS, **(thresholds or {}))
+        self.min_samples = min_samples
+        self.min_samples_per_bin = min_samples_per_bin
+        self.min_drifted_features = min_drifted_features
+        self.min_drifted_fraction = min_drifted_fraction
+
+    def required_samples(self, n_bins: int) -> int:
+        """Rows a window needs before it is tested against ``n_bins`` reference bins"""
+        return max(self.min_samples, self.min_samples_per_bin * n_bins)
+
+    def required_drifted_features(self, n_features: int) -> int:
+        """Drifted features needed to report feature drift"""
+        return max(self.min_drifted_features, int(np.ceil(self.min_drifted_fraction * n_features)))
+
+    def _flags(self, metrics: Dict[str, np.ndarray], n_bins: int, correct: bool = True) -> np.ndarray:
+        """Per-column drift flags; ``metrics['ks_pvalue_adjusted']`` is filled in"""
+        tested = metrics["n"] >= self.required_samples(n_bins)
+        adjusted = np.ones_like(metrics["ks_pvalue"])
+        if tested.any():
+            pvalues = metrics["ks_pvalue"][tested]
+            adjusted[tested] = benjamini_hochberg(pvalues) if correct else pvalues
+        metrics["ks_pvalue_adjusted"] = adjusted
+        return (tested &
+                ((metrics["psi"] > self.thresholds["psi"]) |
+                 (metrics["kl"] > self.thresholds["kl"]) |
+                 (adjusted < self.thresholds["ks_pvalue"])))
+
+    def evaluate(self, profile: ReferenceProfile, feature_window: Optional[np.ndarray] = None,
+                 prediction_window: Optional[np.ndarray] = None, top_k: int = 10) -> Dict[str, Any]:
+        """Compute drift metrics for every profiled feature and the predictions.
+
+        Args:
+            profile: Reference histograms built from training data
+            feature_window: Recent feature rows, columns in ``profile.feature_names`` order
+            prediction_window: Recent predictions
+            top_k: Number of most drifted features (by PSI) to list in the report
+
+        Returns:
+            Report with a summary, per-feature metrics and prediction metrics
+        """
+        n_bins = profile.edges.shape[1] - 1
+        report = {"drift_detected": False, "features": {}, "top_features": [], "prediction": None,
+                  "min_samples": self.required_samples(n_bins)}
+
+        features = profile.feature_names
+        if feature_window is not None and len(feature_window) and features:
+            edges, probs = profile.select(features)
+            metrics = distribution_metrics(probs, bin_counts(feature_window, edges), profile.count)
+            flags = self._flags(metrics, n_bins)
+            for i, name in enumerate(features):
+                report["features"][name] = {
+                    key: float(metrics[key][i]) for key in ("psi", "kl", "ks", "ks_pvalue", "ks_pvalue_adjusted")
+                }
+                report["features"][name]["drifted"] = bool(flags[i])
+            top = np.argsort(-metrics["psi"])[:top_k]
+            report["top_features"] = [features[i] for i in top]
+            report["n_drifted_features"] = int(flags.sum())
+            report["feature_samples"] = int(metrics["n"].max()) if len(metrics["n"]) else 0
+            report["min_drifted_features"] = self.required_drifted_features(len(features))
+            report["drift_detected"] = report["n_drifted_features"] >= report["min_drifted_features"]
+
+        if prediction_window is not None and len(prediction_window) and profile.has_predictions():
+            edges, probs = profile.select([PREDICTION_KEY])
+            metrics = distribution_metrics(probs, bin_counts(prediction_window, edges), profile.count)
+            flags = self._flags(metrics, n_bins, correct=False)
+            report["prediction"] = {key: float(metrics[key][0]) for key in ("n", "psi", "kl", "ks", "ks_pvalue")}
+            report["prediction"]["drifted"] = bool(flags[0])
+            report["drift_detected"] = report["drift_detected"] or bool(flags[0])
+
+        return report
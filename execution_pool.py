@@ -0,0 +1,139 @@
+import asyncio
+import functools
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+
+class PoolSaturatedError(RuntimeError):
+    """Raised when a pool already has as many tasks in flight as it accepts"""
+
+    def __init__(self, kind: str, limit: int):
+        super().__init__(f"{kind} pool is saturated ({limit} tasks in flight)")
+        self.kind = kind
+        self.limit = limit
+
+
+class TaskTimeoutError(TimeoutError):
+    """Raised when a task does not finish within its timeout"""
+
+    def __init__(self, kind: str, timeout: float):
+        super().__init__(f"{kind} task did not finish within {timeout:.1f}s")
+        self.kind = kind
+        self.timeout = timeout
+
+
+class ExecutionPool:
+    """Runs CPU-bound work off the event loop with bounded queues and timeouts.
+
+    Two executors are available: a thread pool for libraries that release the
+    GIL (NumPy, XGBoost, SHAP's C++ tree code) and a process pool for pure
+    Python work such as LIME sampling. Each executor admits at most
+    ``workers + max_queue`` tasks at a time; beyond that ``run`` fails fast
+    with PoolSaturatedError so callers can shed load instead of queueing
+    without bound.
+    """
+
+    def __init__(self, thread_workers: Optional[int] = None, process_workers: Optional[int] = None,
+                 max_queue: int = 64, default_timeout: Optional[float] = 30.0,
+                 start_method: str = "spawn"):
+        cpus = os.cpu_count() or 1
+        self.workers = {
+            "thread": thread_workers or min(32, cpus + 4),
+            "process": process_workers or cpus,
+        }
+        self.max_queue = max_queue
+        self.default_timeout = default_timeout
+        self.start_method = start_method
+        self._executors = {}
+        self._in_flight = {"thread": 0, "process": 0}
+        self._stats = {
+            kind: {"submitted": 0, "completed": 0, "rejected": 0, "timeouts": 0, "failed": 0, "busy_seconds": 0.0}
+            for kind in self._in_flight
+        }
+        self._lock = threading.Lock()
+
+    def _executor(self, kind: str):
+        executor = self._executors.get(kind)
+        if executor is None:
+            with self._lock:
+                executor = self._executors.get(kind)
+                if executor is None:
+                    if kind == "thread":
+                        executor = ThreadPoolExecutor(max_workers=self.workers["thread"],
+                                                      thread_name_prefix="inference")
+                    elif kind == "process":
+                        executor = ProcessPoolExecutor(
+                            max_workers=self.workers["process"],
+                            mp_context=multiprocessing.get_context(self.start_method),
+                        )
+                    else:
+                        raise ValueError(f"Unknown executor kind: {kind}")
+                    self._executors[kind] = executor
+        return executor
+
+    def limit(self, kind: str) -> int:
+        return self.workers[kind] + self.max_queue
+
+    def _acquire(self, kind: str):
+        with self._lock:
+            if self._in_flight[kind] >= self.limit(kind):
+                self._stats[kind]["rejected"] += 1
+                raise PoolSaturatedError(kind, self.limit(kind))
+            self._in_flight[kind] += 1
+            self._stats[kind]["submitted"] += 1
+
+    def _release(self, kind: str, started: float, future):
+        # Runs when the underlying task really finishes, which may be after a
+        # timeout was already reported, so the slot stays taken until then.
+        with self._lock:
+            self._in_flight[kind] -= 1
+            stats = self._stats[kind]
+            stats["busy_seconds"] += time.perf_counter() - started
+            if future.cancelled() or future.exception() is not None:
+                stats["failed"] += 1
+            else:
+                stats["completed"] += 1
+
+    async def run(self, fn: Callable, *args, kind: str = "thread", timeout: Optional[float] = None,
+                  **kwargs) -> Any:
+        """Run ``fn(*args, **kwargs)`` on the given executor and await its result"""
+        executor = self._executor(kind)
+        self._acquire(kind)
+        started = time.perf_counter()
+        try:
+            future = executor.submit(functools.partial(fn, *args, **kwargs))
+        except BaseException:
+            with self._lock:
+                self._in_flight[kind] -= 1
+            raise
+        future.add_done_callback(functools.partial(self._release, kind, started))
+
+        timeout = self.default_timeout if timeout is None else timeout
+        try:
+            # shield() keeps wait_for from cancelling the executor future, which
+            # would drop a queued task without the caller being told why
+            return await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), timeout)
+        except asyncio.TimeoutError:
+            future.cancel()
+            with self._lock:
+                self._stats[kind]["timeouts"] += 1
+            raise TaskTimeoutError(kind, timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                kind: dict(self._stats[kind], in_flight=self._in_flight[kind],
+                           workers=self.workers[kind], limit=self.limit(kind),
+                           started=kind in self._executors)
+                for kind in self._in_flight
+            }
+
+    def shutdown(self, wait: bool = True):
+        with self._lock:
+            executors, self._executors = self._executors, {}
+        for executor in executors.values():
+            executor.shutdown(wait=wait, cancel_futures=True)
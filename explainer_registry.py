@@ -0,0 +1,90 @@
+import os
+import threading
+from typing import Any, Dict, Optional
+
+import pandas as pd
+import shap
+
+
+def load_background_data(model_id: str, info: Dict[str, Any], max_samples: int = 100,
+                         models_dir: str = "models", random_state: int = 0,
+                         bundle=None) -> Optional[pd.DataFrame]:
+    """Load a background sample for SHAP from a model's artifact bundle or info.json.
+
+    Supports a ``background`` bundle component, inline rows (``background_data``)
+    or a CSV/Parquet file (``background_data_path``, relative to the model directory).
+    """
+    if bundle is not None and "background" in bundle:
+        background = bundle["background"]
+    elif info.get("background_data"):
+        background = pd.DataFrame(info["background_data"])
+    elif info.get("background_data_path"):
+        path = info["background_data_path"]
+        if not os.path.isabs(path):
+            path = os.path.join(models_dir, model_id, path)
+        if path.endswith(".parquet"):
+            background = pd.read_parquet(path)
+        else:
+            background = pd.read_csv(path)
+    else:
+        return None
+
+    feature_names = info.get("feature_names")
+    if feature_names:
+        background = background[feature_names]
+    if len(background) > max_samples:
+        background = background.sample(max_samples, random_state=random_state)
+    return background
+
+
+class ExplainerRegistry:
+    """Builds one SHAP explainer per (model_id, version) and shares it across requests."""
+
+    def __init__(self, max_background_samples: int = 100, models_dir: str = "models"):
+        self.max_background_samples = max_background_samples
+        self.models_dir = models_dir
+        self._explainers = {}  # (model_id, version) -> explainer
+        self._locks = {}
+        self._guard = threading.Lock()
+        self.builds = 0
+
+    def _lock_for(self, model_id: str) -> threading.Lock:
+        with self._guard:
+            return self._locks.setdefault(model_id, threading.Lock())
+
+    def build(self, model_id: str, model, info: Dict[str, Any], bundle=None):
+        """Construct a fresh explainer, using the background sample when one is available"""
+        background = load_background_data(model_id, info, self.max_background_samples, self.models_dir,
+                                          bundle=bundle)
+        self.builds += 1
+        if background is not None:
+            return shap.Explainer(model, background)
+        return shap.Explainer(model)
+
+    def get(self, model_id: str, model, info: Dict[str, Any], version: Any = None, bundle=None):
+        """Return the cached explainer for this model version, building it at most once"""
+        key = (model_id, version)
+        explainer = self._explainers.get(key)
+        if explainer is not None:
+            return explainer
+
+        with self._lock_for(model_id):
+            # Another request may have built it while we waited
+            explainer = self._explainers.get(key)
+            if explainer is None:
+                explainer = self.build(model_id, model, info, bundle)
+                self._explainers[key] = explainer
+            return explainer
+
+    def invalidate(self, model_id: str, version: Any = None):
+        """Forget the explainers of a model (or of one version) so they are rebuilt on next use"""
+        with self._lock_for(model_id):
+            for key in list(self._explainers):
+                if key[0] == model_id and (version is None or key[1] == version):
+                    del self._explainers[key]
+
+    def stats(self) -> Dict[str, Any]:
+        models = {}
+        for model_id, version in list(self._explainers):
+            models.setdefault(model_id, []).append(version)
+        return {"builds": self.builds, "models": models}
@@ -0,0 +1,137 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+
+def _json_default(value):
+    """Fallback encoder for numpy scalars/arrays and other odd values"""
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    return str(value)
+
+
+def make_cache_key(model_id: str, model_version: Any, features: Dict[str, Any],
+                   method: Optional[str], num_features: Optional[int]) -> str:
+    """Build a canonical, hashed cache key.
+
+    Features are serialized with sorted keys so that dicts with the same
+    content but a different insertion order map to the same entry.
+    """
+    payload = json.dumps(
+        {
+            "model_id": model_id,
+            "model_version": model_version,
+            "features": features,
+            "method": method.lower() if isinstance(method, str) else method,
+            "num_features": num_features,
+        },
+        sort_keys=True,
+        separators=(",", ":"),
+        default=_json_default,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ExplanationCache:
+    """Thread-safe LRU cache bounded by entry count and approximate bytes, with per-entry TTL."""
+
+    def __init__(self, max_entries: int = 10000, max_bytes: int = 64 * 1024 * 1024,
+                 ttl_seconds: float = 3600.0):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()  # key -> (model_id, value, size, expires_at)
+        self._model_keys = {}  # model_id -> set of keys
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def _estimate_size(value: Any) -> int:
+        return len(json.dumps(value, separators=(",", ":"), default=_json_default))
+
+    def _remove(self, key: str):
+        model_id, _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+        keys = self._model_keys.get(model_id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._model_keys[model_id]
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value or None, refreshing its LRU position"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[3] is not None and entry[3] < time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: str, model_id: str, value: Any, ttl_seconds: Optional[float] = None):
+        """Insert a value, evicting least recently used entries to stay within bounds"""
+        size = self._estimate_size(value)
+        if size > self.max_bytes:
+            return
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        expires_at = time.monotonic() + ttl if ttl and ttl > 0 else None
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (model_id, value, size, expires_at)
+            self._model_keys.setdefault(model_id, set()).add(key)
+            self._bytes += size
+
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def invalidate_model(self, model_id: str) -> int:
+        """Drop every entry belonging to a model, e.g. after it was retrained"""
+        with self._lock:
+            keys = list(self._model_keys.get(model_id, ()))
+            for key in keys:
+                self._remove(key)
+            self.invalidations += len(keys)
+            return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+            self._model_keys.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+                "models": {model_id: len(keys) for model_id, keys in self._model_keys.items()},
+            }
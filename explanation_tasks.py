@@ -0,0 +1,107 @@
+"""Explanation work that can run inside a worker process.
+
+Functions here are module-level so they can be pickled and sent to a
+ProcessPoolExecutor. Models are passed as ``(path, fingerprint)`` references
+(model.joblib or an artifact bundle directory, plus the ``artifact_fingerprint``
+of the version the caller serves) and cached per worker by fingerprint. A
+worker finding a different artifact at the path raises StaleArtifactError
+instead of explaining with a model other than the one that made the
+prediction. LIME engines, with their scored perturbation samples, are cached
+the same way, together with a hash of the training data their statistics
+came from.
+"""
+import hashlib
+import os
+from typing import Any, Dict, List, Tuple, Union
+
+import joblib
+import pandas as pd
+
+from artifact_bundle import ArtifactBundle, artifact_fingerprint
+from lime_engine import LimeEngine
+
+ArtifactRef = Tuple[str, Tuple[int, int, int]]
+
+_model_cache = {}  # path -> (fingerprint, model)
+# (model key, training data hash, num_samples) -> (model, LimeEngine); bounded so retired versions don't accumulate
+_engine_cache = {}
+MAX_CACHED_ENGINES = 32
+
+
+class StaleArtifactError(RuntimeError):
+    """Raised when the artifact at a path is no longer the version a task was sent for"""
+
+
+def _check_fingerprint(path: str, expected) -> None:
+    if artifact_fingerprint(path) != tuple(expected):
+        raise StaleArtifactError(f"{path} was replaced by another model version")
+
+
+def load_cached_model(model_ref: Union[ArtifactRef, Any]):
+    """Return the model itself, or load the referenced artifact once per worker process"""
+    if not isinstance(model_ref, tuple):
+        return model_ref
+    path, fingerprint = model_ref
+    _check_fingerprint(path, fingerprint)
+    cached = _model_cache.get(path)
+    if cached is None or cached[0] != tuple(fingerprint):
+        model = ArtifactBundle(path)["model"] if os.path.isdir(path) else joblib.load(path)
+        # The file may have been replaced while it was read
+        _check_fingerprint(path, fingerprint)
+        cached = (tuple(fingerprint), model)
+        _model_cache[path] = cached
+    return cached[1]
+
+
+def _predict_fn(model, mode: str):
+    return model.predict_proba if mode == "classification" else model.predict
+
+
+def data_fingerprint(df: pd.DataFrame) -> str:
+    """Hash of a DataFrame's columns and values"""
+    digest = hashlib.sha1(repr(list(df.columns)).encode())
+    digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def get_lime_engine(model_ref: Union[ArtifactRef, Any], training_data: pd.DataFrame, mode: str,
+                    num_samples: int = 5000) -> LimeEngine:
+    """Return this process's LimeEngine for a model, building it (and its perturbations) once.
+
+    Artifact references are keyed by fingerprint like the model cache;
+    in-process models are keyed by identity, so each model version gets its own engine.
+    A change in the training data builds a new engine as well.
+    """
+    model = load_cached_model(model_ref)
+    data_key = data_fingerprint(training_data)
+    if isinstance(model_ref, tuple):
+        key = (model_ref[0], tuple(model_ref[1]), data_key, num_samples)
+    else:
+        key = (id(model), data_key, num_samples)
+    cached = _engine_cache.get(key)
+    if cached is None or cached[0] is not model:
+        engine = LimeEngine(
+            training_data,
+            _predict_fn(model, mode),
+            mode=mode,
+            num_samples=num_samples,
+            class_names=getattr(model, "classes_", None),
+        )
+        cached = (model, engine)
+        _engine_cache[key] = cached
+        while len(_engine_cache) > MAX_CACHED_ENGINES:
+            _engine_cache.pop(next(iter(_engine_cache)))
+    return cached[1]
+
+
+def forget_model(model):
+    """Drop the engines built for an in-process model so it can be garbage collected"""
+    for key in [key for key, (cached_model, _) in _engine_cache.items() if cached_model is model]:
+        del _engine_cache[key]
+
+
+def lime_explanations(model_ref: Union[ArtifactRef, Any], training_data: pd.DataFrame, mode: str,
+                      rows: pd.DataFrame, num_features: int = 10, num_samples: int = 5000) -> List[Dict[str, Any]]:
+    """Explain a block of rows with the model's cached LimeEngine; returns JSON-friendly results"""
+    engine = get_lime_engine(model_ref, training_data, mode, num_samples)
+    return engine.explain(rows, num_features)
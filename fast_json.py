@@ -0,0 +1,256 @@
+"""Fast response serialization and compression for the API.
+
+- ``dumps`` serializes with orjson when it is installed, writing NumPy arrays
+  and scalars natively instead of through ``tolist()``; without orjson it
+  falls back to the standard library with a NumPy-aware ``default``
+- ``FastJSONResponse`` is a JSONResponse rendered by ``dumps``
+- ``negotiated_response`` answers batch results as JSON, MessagePack or an
+  Arrow IPC stream depending on the Accept header (binary formats only when
+  msgpack / pyarrow are installed)
+- ``CompressionMiddleware`` compresses responses with brotli (when
+  installed) or gzip, as the client accepts, once they reach a minimum
+  size; very large bodies use the fastest level to bound CPU, and streamed
+  bodies are flushed chunk by chunk so NDJSON lines still arrive promptly
+"""
+import json
+import zlib
+from datetime import date, datetime
+from typing import Any, Callable, Dict, Optional, Union
+
+import numpy as np
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import JSONResponse, Response
+
+try:
+    import orjson
+except ImportError:  # Falls back to the standard library
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    try:
+        import brotlicffi as brotli
+    except ImportError:  # gzip only
+        brotli = None
+
+try:
+    import msgpack
+except ImportError:  # MessagePack responses are optional
+    msgpack = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+except ImportError:  # Arrow responses are optional
+    pa = None
+
+JSON, MSGPACK, ARROW = "json", "msgpack", "arrow"
+MSGPACK_TYPES = {"application/msgpack", "application/x-msgpack", "application/vnd.msgpack"}
+ARROW_STREAM_TYPE = "application/vnd.apache.arrow.stream"
+
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+
+def _default(value):
+    """Types neither serializer handles natively (non-contiguous or object arrays, NumPy scalars, dates)"""
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    """Serialize to JSON bytes; NaN and infinity become null with orjson and raise without it"""
+    if orjson is not None:
+        return orjson.dumps(content, default=_default, option=_ORJSON_OPTIONS)
+    return json.dumps(content, default=_default, ensure_ascii=False, allow_nan=False,
+                      separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse serialized by ``dumps`` (content may hold NumPy arrays and scalars)"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+class MessagePackResponse(Response):
+    media_type = "application/msgpack"
+
+    def render(self, content: Any) -> bytes:
+        return msgpack.packb(content, default=_default, use_bin_type=True)
+
+
+class ArrowResponse(Response):
+    """Arrow IPC stream of one table; ``content`` is already serialized"""
+
+    media_type = ARROW_STREAM_TYPE
+
+
+def _accepted(header: Optional[str]):
+    """(media type or coding, q) pairs of an Accept or Accept-Encoding header, best first"""
+    accepted = []
+    for part in (header or "").split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if name and q > 0:
+            accepted.append((name.strip().lower(), q))
+    return sorted(accepted, key=lambda item: -item[1])
+
+
+def negotiate_format(accept: Optional[str]) -> str:
+    """Batch response format for an Accept header: JSON unless a binary format is preferred and available"""
+    for media_type, _ in _accepted(accept):
+        if media_type == ARROW_STREAM_TYPE and pa is not None:
+            return ARROW
+        if media_type in MSGPACK_TYPES and msgpack is not None:
+            return MSGPACK
+        if media_type in ("application/json", "application/*", "*/*"):
+            return JSON
+    return JSON
+
+
+def arrow_stream(columns: Dict[str, Any], metadata: Optional[Dict[str, Any]] = None) -> bytes:
+    """One-table Arrow IPC stream; metadata values are stored JSON-encoded in the schema metadata"""
+    table = pa.table({name: pa.array(values) for name, values in columns.items()})
+    if metadata:
+        table = table.replace_schema_metadata({key: dumps(value) for key, value in metadata.items()})
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def negotiated_response(content: Dict[str, Any], accept: Optional[str],
+                        columns: Union[Dict[str, Any], Callable[[], Dict[str, Any]], None] = None) -> Response:
+    """Respond in the format the client prefers.
+
+    Args:
+        content: Response body for JSON and MessagePack
+        accept: The request's Accept header
+        columns: Per-row columns of the Arrow table, or a callable building them only when Arrow is chosen;
+            the scalar fields of ``content`` become its metadata. Arrow is only offered when columns are given.
+    """
+    response_format = negotiate_format(accept)
+    if response_format == ARROW and columns is not None:
+        if callable(columns):
+            columns = columns()
+        metadata = {key: value for key, value in content.items() if not isinstance(value, (list, dict, np.ndarray))}
+        return ArrowResponse(arrow_stream(columns, metadata))
+    if response_format == MSGPACK:
+        return MessagePackResponse(content)
+    return FastJSONResponse(content)
+
+
+class _Encoder:
+    """Incremental brotli or gzip stream"""
+
+    def __init__(self, encoding: str, fast: bool, gzip_level: int, brotli_quality: int):
+        self.encoding = encoding
+        if encoding == "br":
+            self._brotli = brotli.Compressor(quality=1 if fast else brotli_quality)
+        else:
+            self._zlib = zlib.compressobj(1 if fast else gzip_level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes, flush: bool = False, finish: bool = False) -> bytes:
+        if self.encoding == "br":
+            out = self._brotli.process(data)
+            if finish:
+                return out + self._brotli.finish()
+            return out + self._brotli.flush() if flush else out
+        out = self._zlib.compress(data)
+        if finish:
+            return out + self._zlib.flush(zlib.Z_FINISH)
+        return out + self._zlib.flush(zlib.Z_SYNC_FLUSH) if flush else out
+
+
+class CompressionMiddleware:
+    """ASGI middleware compressing response bodies of at least ``minimum_size`` bytes.
+
+    Args:
+        app: The wrapped ASGI app
+        minimum_size: Smaller bodies are sent as they are (streamed bodies are always compressed)
+        large_size: Bodies at least this large use the fastest compression level
+        gzip_level: zlib level for other bodies
+        brotli_quality: brotli quality for other bodies
+    """
+
+    def __init__(self, app, minimum_size: int = 1024, large_size: int = 64 * 1024,
+                 gzip_level: int = 6, brotli_quality: int = 4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.large_size = large_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    @staticmethod
+    def select_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+        """Preferred supported coding of an Accept-Encoding header (brotli only when installed)"""
+        supported = {"gzip"} | ({"br"} if brotli is not None else set())
+        best = None
+        for coding, q in _accepted(accept_encoding):
+            if coding == "*":
+                coding = "br" if "br" in supported else "gzip"
+            if coding in supported and (best is None or q > best[1] or (q == best[1] and coding == "br")):
+                best = (coding, q)
+        return best[0] if best is not None else None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = self.select_encoding(Headers(scope=scope).get("accept-encoding"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start = None
+        encoder = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start, encoder, passthrough
+            if message["type"] == "http.response.start":
+                start = message
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if encoder is None:
+                headers = MutableHeaders(raw=start["headers"])
+                if "content-encoding" in headers or (not more_body and len(body) < self.minimum_size):
+                    passthrough = True
+                    await send(start)
+                    await send(message)
+                    return
+                encoder = _Encoder(encoding, fast=len(body) >= self.large_size,
+                                   gzip_level=self.gzip_level, brotli_quality=self.brotli_quality)
+                headers["content-encoding"] = encoding
+                headers.add_vary_header("Accept-Encoding")
+                if more_body:
+                    del headers["content-length"]
+                    body = encoder.compress(body, flush=True)
+                else:
+                    body = encoder.compress(body, finish=True)
+                    headers["content-length"] = str(len(body))
+                await send(start)
+                await send({"type": "http.response.body", "body": body, "more_body": more_body})
+                return
+            body = encoder.compress(body, flush=more_body, finish=not more_body)
+            await send({"type": "http.response.body", "body": body, "more_body": more_body})
+
+        await self.app(scope, receive, send_compressed)
@@ -1,4 +1,4 @@
-from fastapi import FastAPI, HTTPException, Depends, BackgroundTasks
+from fastapi import FastAPI, HTTPException, Depends, BackgroundTasks, Request
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from typing import List, Dict, Any, Optional, Union
@@ -11,10 +11,32 @@ import lime
 import lime.lime_tabular
 from datetime import datetime
 import asyncio
-from fastapi.responses import JSONResponse
+import os
+import time
+from contextlib import asynccontextmanager
+from fastapi.responses import JSONResponse, StreamingResponse
+
+import batch_explanations
+from budgeted_explanations import BudgetedExplainer
+from compiled_trees import compile_model
+import explanation_tasks
+from execution_pool import ExecutionPool, PoolSaturatedError, TaskTimeoutError
+from explainer_registry import ExplainerRegistry, load_background_data
+from explanation_cache import ExplanationCache, make_cache_key
+import fast_json
+from fast_json import CompressionMiddleware, FastJSONResponse
+from feature_schema import FeatureSchema, SchemaError
+from drift_engine import DriftEngine, ReferenceProfile
+from micro_batcher import MicroBatcher
+from model_registry import ModelNotFoundError, ModelRegistry, ModelSlot
+from neighbor_index import NeighborIndex
+from prediction_history import FeatureHistory, PredictionHistory
+from retraining_queue import RetrainingJobStore, RetrainingService
+import streaming_io
 
 # Initialize FastAPI app
-app = FastAPI(title="AI-Powered Predictive Dashboard API")
+# Responses are serialized by fast_json (orjson when installed, NumPy arrays written natively)
+app = FastAPI(title="AI-Powered Predictive Dashboard API", default_response_class=FastJSONResponse)
 
 # Add CORS middleware
 app.add_middleware(
@@ -25,17 +47,141 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Load models from disk
-models = {}
-model_info = {}
+# gzip/brotli response compression, negotiated with Accept-Encoding, for bodies of at least RESPONSE_COMPRESSION_MIN_BYTES
+RESPONSE_COMPRESSION = os.getenv("RESPONSE_COMPRESSION", "true").lower() == "true"
+RESPONSE_COMPRESSION_MIN_BYTES = int(os.getenv("RESPONSE_COMPRESSION_MIN_BYTES", "1024"))
+if RESPONSE_COMPRESSION:
+    app.add_middleware(CompressionMiddleware, minimum_size=RESPONSE_COMPRESSION_MIN_BYTES)
+
+# Models on disk: metadata is scanned at startup, artifacts are loaded on demand
+# (or preloaded) and kept in an LRU-bounded resident set
+model_registry = ModelRegistry(
+    models_dir=os.getenv("MODEL_DIR", "models"),
+    max_resident=int(os.getenv("MAX_RESIDENT_MODELS", "0")),
+    mmap=os.getenv("MODEL_MMAP", "true").lower() == "true",
+)
+model_info = model_registry.catalog
+# PRELOAD_MODELS is a comma-separated list of model ids, or "*" for every scanned model
+PRELOAD_MODELS = [m.strip() for m in os.getenv("PRELOAD_MODELS", "").split(",") if m.strip()]
+PRELOAD_WORKERS = int(os.getenv("PRELOAD_WORKERS", "4"))
+MODEL_SWAP_TIMEOUT_SECONDS = float(os.getenv("MODEL_SWAP_TIMEOUT_SECONDS", "600"))
 
 # Track model performance and drift
 performance_metrics = {}
+prediction_histories = {}  # model_id -> PredictionHistory
+PREDICTION_HISTORY_SIZE = int(os.getenv("PREDICTION_HISTORY_SIZE", "10000"))
+feature_histories = {}  # model_id -> FeatureHistory
+FEATURE_HISTORY_SIZE = int(os.getenv("FEATURE_HISTORY_SIZE", "5000"))
 drift_detected = {}
 retraining_status = {}
 
-# In-memory cache for frequently requested explanations
-explanation_cache = {}
+# Bounded in-memory cache for frequently requested explanations
+explanation_cache = ExplanationCache(
+    max_entries=int(os.getenv("EXPLANATION_CACHE_MAX_ENTRIES", "10000")),
+    max_bytes=int(os.getenv("EXPLANATION_CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+    ttl_seconds=float(os.getenv("EXPLANATION_CACHE_TTL_SECONDS", "3600")),
+)
+
+# SHAP explainers shared across requests, one per model version
+explainer_registry = ExplainerRegistry(
+    max_background_samples=int(os.getenv("SHAP_BACKGROUND_SAMPLES", "100")),
+    models_dir=model_registry.models_dir,
+)
+PREBUILD_EXPLAINERS = os.getenv("SHAP_PREBUILD_ON_LOAD", "false").lower() == "true"
+EXPLANATION_METHODS = ("shap", "lime")
+# Rows per vectorized SHAP call in batch explanations, and rows summarized for global importance
+SHAP_BATCH_ROWS = int(os.getenv("SHAP_BATCH_ROWS", "2000"))
+GLOBAL_IMPORTANCE_SAMPLE_SIZE = int(os.getenv("GLOBAL_IMPORTANCE_SAMPLE_SIZE", "1000"))
+# Deadline-aware SHAP for requests with a latency budget, one per model version
+budgeted_explainers = {}  # (model_id, version) -> BudgetedExplainer
+EXPLANATION_MEMORY_SIZE = int(os.getenv("EXPLANATION_MEMORY_SIZE", "1000"))
+# Furthest stored row (RMS distance in standard deviations) whose explanation answers a request out of time
+EXPLANATION_MEMORY_MAX_DISTANCE = float(os.getenv("EXPLANATION_MEMORY_MAX_DISTANCE", "0.25"))
+# Optional reuse of the explanation of an already explained row close to the request (0 disables)
+NEIGHBOR_REUSE_RADIUS = float(os.getenv("NEIGHBOR_REUSE_RADIUS", "0"))
+NEIGHBOR_INDEX_SIZE = int(os.getenv("NEIGHBOR_INDEX_SIZE", "10000"))
+neighbor_indexes = {}  # (model_id, version, method, num_features, predicted class) -> (feature names, NeighborIndex)
+
+# Compiled tree-ensemble predictors, one per model version (None when a model cannot be compiled).
+# Single rows are predicted inline on the event loop; batches up to COMPILED_INFERENCE_MAX_ROWS
+# use them too, larger ones are faster through the model's own predict
+COMPILED_INFERENCE = os.getenv("COMPILED_INFERENCE", "true").lower() == "true"
+COMPILED_INFERENCE_MAX_ROWS = int(os.getenv("COMPILED_INFERENCE_MAX_ROWS", "64"))
+compiled_predictors = {}  # (model_id, version) -> CompiledPredictor or None
+# Request decoding straight into NumPy rows, one schema per model version (None without feature names)
+feature_schemas = {}  # (model_id, version) -> FeatureSchema or None
+# Background samples read from a model version's bundle or background file, once per sample size
+background_samples = {}  # (model_id, version, sample size) -> DataFrame or None
+
+# Worker pools for CPU-bound inference and explanations, so the event loop stays responsive
+execution_pool = ExecutionPool(
+    thread_workers=int(os.getenv("INFERENCE_THREADS", "0")) or None,
+    process_workers=int(os.getenv("INFERENCE_PROCESSES", "0")) or None,
+    max_queue=int(os.getenv("INFERENCE_MAX_QUEUE", "64")),
+    default_timeout=float(os.getenv("INFERENCE_TIMEOUT_SECONDS", "30")),
+)
+# LIME sampling is pure Python and holds the GIL, so it defaults to the process pool
+LIME_EXECUTOR = os.getenv("LIME_EXECUTOR", "process")
+# Perturbations per LIME neighborhood, reference rows its statistics come from,
+# and the smallest block of rows worth sending to a separate worker
+LIME_NUM_SAMPLES = int(os.getenv("LIME_NUM_SAMPLES", "5000"))
+LIME_TRAINING_SAMPLES = int(os.getenv("LIME_TRAINING_SAMPLES", "1000"))
+LIME_MIN_CHUNK_ROWS = int(os.getenv("LIME_MIN_CHUNK_ROWS", "32"))
+
+# Opt-in coalescing of concurrent single-row /predict calls, per model
+# MICRO_BATCH_MODELS is a comma-separated list of model ids, or "*" for all models
+MICRO_BATCH_MODELS = {m.strip() for m in os.getenv("MICRO_BATCH_MODELS", "").split(",") if m.strip()}
+MICRO_BATCH_WINDOW_MS = float(os.getenv("MICRO_BATCH_WINDOW_MS", "2"))
+MICRO_BATCH_MAX_ROWS = int(os.getenv("MICRO_BATCH_MAX_ROWS", "64"))
+micro_batchers = {}
+micro_batch_overrides = {}  # model_id -> {"enabled", "window_ms", "max_batch"}
+
+# Streaming batch prediction limits
+STREAM_CHUNK_ROWS = int(os.getenv("STREAM_CHUNK_ROWS", "10000"))
+STREAM_SPOOL_BYTES = int(os.getenv("STREAM_SPOOL_BYTES", str(32 * 1024 * 1024)))
+
+@app.exception_handler(PoolSaturatedError)
+async def pool_saturated_handler(request, exc: PoolSaturatedError):
+    return JSONResponse(status_code=429, content={"detail": str(exc)}, headers={"Retry-After": "1"})
+
+@app.exception_handler(SchemaError)
+async def schema_error_handler(request, exc: SchemaError):
+    return JSONResponse(status_code=400, content={"detail": str(exc)})
+
+@app.exception_handler(TaskTimeoutError)
+async def task_timeout_handler(request, exc: TaskTimeoutError):
+    return JSONResponse(status_code=504, content={"detail": str(exc)})
+
+@app.on_event("shutdown")
+async def shutdown_execution_pool():
+    execution_pool.shutdown(wait=False)
+
+# Scheduled KS/PSI/KL drift detection against reference profiles from info.json.
+# Windows need DRIFT_MIN_SAMPLES_PER_BIN rows per reference bin, and feature drift needs
+# DRIFT_MIN_FEATURE_FRACTION of a model's features to drift (KS p-values are BH-corrected)
+drift_engine = DriftEngine(
+    thresholds={
+        "psi": float(os.getenv("DRIFT_PSI_THRESHOLD", "0.2")),
+        "kl": float(os.getenv("DRIFT_KL_THRESHOLD", "0.1")),
+        "ks_pvalue": float(os.getenv("DRIFT_KS_PVALUE", "0.01")),
+    },
+    min_samples_per_bin=int(os.getenv("DRIFT_MIN_SAMPLES_PER_BIN", "25")),
+    min_drifted_fraction=float(os.getenv("DRIFT_MIN_FEATURE_FRACTION", "0.1")),
+)
+DRIFT_CHECK_INTERVAL_SECONDS = float(os.getenv("DRIFT_CHECK_INTERVAL_SECONDS", "60"))
+reference_profiles = {}  # model_id -> ReferenceProfile
+drift_reports = {}  # model_id -> latest report
+
+# Retraining jobs are persisted in SQLite and trained in separate processes.
+# After failed jobs, drift-triggered retraining waits RETRAINING_BACKOFF_SECONDS,
+# doubling per consecutive failure up to RETRAINING_MAX_BACKOFF_SECONDS
+retraining_service = RetrainingService(
+    RetrainingJobStore(os.getenv("RETRAINING_DB", "retraining.db")),
+    models_dir=model_registry.models_dir,
+    max_concurrent=int(os.getenv("RETRAINING_MAX_CONCURRENT", "1")),
+    failure_backoff_seconds=float(os.getenv("RETRAINING_BACKOFF_SECONDS", "300")),
+    max_backoff_seconds=float(os.getenv("RETRAINING_MAX_BACKOFF_SECONDS", "86400")),
+)
 
 # Pydantic models for request validation
 class PredictionRequest(BaseModel):
@@ -43,11 +189,18 @@ class PredictionRequest(BaseModel):
     features: Dict[str, Any]
     explanation_method: Optional[str] = "shap"
     num_features: Optional[int] = 10
+    latency_budget_ms: Optional[float] = None
 
 class BatchPredictionRequest(BaseModel):
     model_id: str
     data: List[Dict[str, Any]]
     explanation_method: Optional[str] = None
+    num_features: Optional[int] = 10
+
+class MicroBatchConfig(BaseModel):
+    enabled: Optional[bool] = None
+    window_ms: Optional[float] = None
+    max_batch: Optional[int] = None
 
 class ModelDriftReport(BaseModel):
     model_id: str
@@ -57,86 +210,415 @@ class ModelDriftReport(BaseModel):
     timestamp: datetime
 
 # Helper functions
-def load_model(model_id: str):
-    """Load model if not already in memory"""
-    if model_id not in models:
-        try:
-            # Load model and metadata
-            models[model_id] = joblib.load(f"models/{model_id}/model.joblib")
-            with open(f"models/{model_id}/info.json", "r") as f:
-                model_info[model_id] = json.load(f)
-        except Exception as e:
-            raise HTTPException(status_code=404, detail=f"Model {model_id} not found: {str(e)}")
-    return models[model_id]
+def load_model(model_id: str) -> ModelSlot:
+    """Load model if not already in memory (blocking; concurrent loads of one id are coalesced)"""
+    slot = model_registry.get_resident_slot(model_id)
+    if slot is not None:
+        return slot
+    try:
+        slot = model_registry.get_slot(model_id)
+    except ModelNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e.args[0]))
+    except Exception as e:
+        raise HTTPException(status_code=404, detail=f"Model {model_id} not found: {str(e)}")
+    if PREBUILD_EXPLAINERS:
+        explainer_registry.get(model_id, slot.model, slot.info, slot.version, slot.bundle)
+    return slot
 
-async def generate_shap_explanation(model, features, num_features=10):
-    """Generate SHAP-based explanation"""
-    # Convert dictionary to DataFrame for SHAP
-    df = pd.DataFrame([features])
-    
-    # Create explainer based on model type
-    explainer = shap.Explainer(model)
-    shap_values = explainer(df)
-    
-    # Get feature importance values
-    feature_importance = {}
-    for i, col in enumerate(df.columns):
-        feature_importance[col] = abs(shap_values.values[0][i])
-    
-    # Sort and get top features
-    sorted_features = dict(sorted(feature_importance.items(), 
-                                  key=lambda item: abs(item[1]), 
-                                  reverse=True)[:num_features])
-    
-    return {
-        "feature_importance": sorted_features,
-        "shap_values": shap_values.values[0].tolist(),
-        "base_value": shap_values.base_values[0].tolist() if hasattr(shap_values, 'base_values') else 0,
-    }
+async def acquire_model(model_id: str) -> ModelSlot:
+    """Take a reference on the serving version of a model, loading it off the event loop if needed"""
+    while True:
+        slot = model_registry.try_acquire(model_id)
+        if slot is not None:
+            return slot
+        # Not loaded (or evicted again right after loading): load in the worker pool and retry
+        await execution_pool.run(load_model, model_id)
 
-async def generate_lime_explanation(model, features, num_features=10):
-    """Generate LIME-based explanation"""
-    # Convert dictionary to DataFrame
-    df = pd.DataFrame([features])
-    
-    # Create a training dataset for the explainer (in production, use a sample of your training data)
-    # Here we're just using the input as both training and testing which is not ideal
-    training_data = df.copy()
+@asynccontextmanager
+async def model_lease(model_id: str):
+    """Pin the serving version for the duration of a request, so a hot swap cannot change it midway"""
+    slot = await acquire_model(model_id)
+    try:
+        yield slot
+    finally:
+        model_registry.release(slot)
+
+def on_model_evicted(model_id: str):
+    """Release per-model state that pins an evicted model in memory"""
+    explainer_registry.invalidate(model_id)
+    for state in (budgeted_explainers, neighbor_indexes, compiled_predictors, feature_schemas, background_samples):
+        for key in [key for key in state if key[0] == model_id]:
+            state.pop(key, None)
+
+def on_model_released(slot: ModelSlot):
+    """Drop state tied to a model version once no request uses it any more"""
+    explainer_registry.invalidate(slot.model_id, slot.version)
+    explanation_tasks.forget_model(slot.model)
+    budgeted_explainers.pop((slot.model_id, slot.version), None)
+    compiled_predictors.pop((slot.model_id, slot.version), None)
+    feature_schemas.pop((slot.model_id, slot.version), None)
+    for state in (neighbor_indexes, background_samples):
+        for key in [key for key in state if key[:2] == (slot.model_id, slot.version)]:
+            state.pop(key, None)
+
+model_registry.on_evict = on_model_evicted
+model_registry.on_release = on_model_released
+
+def validate_model_slot(slot: ModelSlot):
+    """Reject a new model version that cannot score its own background sample"""
+    sample = load_background_data(slot.model_id, slot.info, 16, model_registry.models_dir, bundle=slot.bundle)
+    if sample is None:
+        return
+    predictions = np.asarray(slot.model.predict(sample))
+    if len(predictions) != len(sample):
+        raise ValueError(f"Model returned {len(predictions)} predictions for {len(sample)} rows")
+    if predictions.dtype.kind == "f" and not np.isfinite(predictions).all():
+        raise ValueError("Model returned non-finite predictions")
+
+def warm_model_slot(slot: ModelSlot):
+    """Build per-version state before the new version takes traffic"""
+    if PREBUILD_EXPLAINERS:
+        explainer_registry.get(slot.model_id, slot.model, slot.info, slot.version, slot.bundle)
+    get_compiled_predictor(slot)
+
+@app.on_event("startup")
+async def load_model_catalog():
+    loop = asyncio.get_running_loop()
+    found = await loop.run_in_executor(None, model_registry.scan)
+    preload = found if "*" in PRELOAD_MODELS else PRELOAD_MODELS
+    if preload:
+        errors = await loop.run_in_executor(None, model_registry.preload, preload, PRELOAD_WORKERS)
+        print(f"Preloaded {sum(e is None for e in errors.values())}/{len(preload)} models")
+
+def compute_shap_batch(slot, df, num_features=10, predictions=None, include_values=False):
+    """Explain every row of a DataFrame with one SHAP call per slice (blocking, runs in the worker pool)"""
+    # Reuse the explainer built for this model version
+    explainer = explainer_registry.get(slot.model_id, slot.model, slot.info, slot.version, slot.bundle)
     
-    # Initialize LIME explainer
-    explainer = lime.lime_tabular.LimeTabularExplainer(
-        training_data=training_data.values,
-        feature_names=training_data.columns.tolist(),
-        mode="regression" if model_info.get("task") == "regression" else "classification"
-    )
+    # Classifiers with one output per class are explained for the class each row was predicted as
+    outputs = batch_explanations.output_indices(slot.model, predictions)
+    explanations = []
+    for start in range(0, len(df), SHAP_BATCH_ROWS):
+        stop = start + SHAP_BATCH_ROWS
+        explanations.extend(batch_explanations.explain_batch(
+            explainer, df.iloc[start:stop], num_features,
+            None if outputs is None else outputs[start:stop],
+            include_values=include_values,
+        ))
+    return explanations
+
+def compute_shap_explanation(slot, df, num_features=10, prediction=None):
+    """Compute a SHAP-based explanation of a one-row DataFrame, for its predicted class (blocking, runs in the worker pool)"""
+    predictions = None if prediction is None else [prediction]
+    return compute_shap_batch(slot, df, num_features, predictions, include_values=True)[0]
+
+def get_budgeted_explainer(slot):
+    """Deadline-aware explainer for a model version, or None without reference rows to build it from"""
+    key = (slot.model_id, slot.version)
+    explainer = budgeted_explainers.get(key)
+    if explainer is None:
+        background, _ = load_importance_sample(slot, explainer_registry.max_background_samples)
+        if background is None:
+            return None
+        explainer = BudgetedExplainer(
+            slot.model,
+            background,
+            mode="regression" if slot.info.get("task") == "regression" else "classification",
+            tree_explainer=lambda: explainer_registry.get(slot.model_id, slot.model, slot.info, slot.version,
+                                                          slot.bundle),
+            memory_size=EXPLANATION_MEMORY_SIZE,
+            max_neighbor_distance=EXPLANATION_MEMORY_MAX_DISTANCE,
+        )
+        explainer = budgeted_explainers.setdefault(key, explainer)
+    return explainer
+
+def compute_budgeted_shap_explanation(slot, df, num_features, deadline, prediction=None):
+    """SHAP explanation that returns by the deadline, flagged when approximate (blocking, runs in the worker pool)"""
+    explainer = get_budgeted_explainer(slot)
+    if explainer is None:
+        # Nothing to fall back on; explain exactly
+        return dict(compute_shap_explanation(slot, df, num_features, prediction), approximate=False)
+    return explainer.explain(df.reindex(columns=explainer.feature_names), deadline, num_features, prediction)
+
+def explained_output(slot, prediction):
+    """Predicted class an explanation is for (None for regression models)"""
+    if slot.info.get("task") == "regression":
+        return None
+    if isinstance(prediction, (list, np.ndarray)):
+        return tuple(np.ravel(prediction).tolist())
+    return prediction.item() if isinstance(prediction, np.generic) else prediction
+
+def get_neighbor_index(slot, method, num_features, output=None):
+    """Similarity index of explained rows for one model version, explanation setting and predicted class, or None if disabled"""
+    if NEIGHBOR_REUSE_RADIUS <= 0:
+        return None
+    key = (slot.model_id, slot.version, method.lower(), num_features, output)
+    entry = neighbor_indexes.get(key)
+    if entry is None:
+        background, _ = load_importance_sample(slot, explainer_registry.max_background_samples)
+        if background is None:
+            return None
+        # Features are normalized by the background sample's mean and spread
+        values = background.apply(pd.to_numeric, errors="coerce").to_numpy(dtype=np.float64)
+        index = NeighborIndex(np.nanmean(values, axis=0), np.nanstd(values, axis=0),
+                              radius=NEIGHBOR_REUSE_RADIUS, max_size=NEIGHBOR_INDEX_SIZE)
+        entry = neighbor_indexes.setdefault(key, (list(background.columns), index))
+    return entry
+
+def feature_row(feature_names, features):
+    """Vectorize a feature dict in a fixed column order; missing or non-numeric values become NaN"""
+    return np.array([value if isinstance(value, (int, float, np.number)) and not isinstance(value, bool) else np.nan
+                     for value in (features.get(name) for name in feature_names)], dtype=np.float64)
+
+def find_neighbor_explanation(slot, method, num_features, features, prediction=None):
+    """Reuse the explanation of an already explained row, predicted alike, within the reuse radius (blocking)"""
+    entry = get_neighbor_index(slot, method, num_features, explained_output(slot, prediction))
+    if entry is None:
+        return None
+    feature_names, index = entry
+    explanation, distance = index.nearest(feature_row(feature_names, features))
+    if explanation is None:
+        return None
+    return dict(explanation, approximate=True, neighbor_distance=distance)
+
+def remember_explanation(slot, method, num_features, features, explanation, prediction=None):
+    """Make an exact explanation available for reuse by nearby rows predicted alike (blocking)"""
+    entry = get_neighbor_index(slot, method, num_features, explained_output(slot, prediction))
+    if entry is not None:
+        feature_names, index = entry
+        index.add(feature_row(feature_names, features), explanation)
+
+def compute_global_importance(slot, sample):
+    """Mean |SHAP| per feature over a sample (blocking, runs in the worker pool)"""
+    explainer = explainer_registry.get(slot.model_id, slot.model, slot.info, slot.version, slot.bundle)
+    return batch_explanations.mean_abs_importance(explainer, sample)
+
+def get_background_sample(slot, sample_size):
+    """Background sample of a model version, read from disk once per sample size (blocking; None without one)"""
+    key = (slot.model_id, slot.version, sample_size)
+    if key not in background_samples:
+        sample = load_background_data(slot.model_id, slot.info, sample_size, model_registry.models_dir,
+                                      bundle=slot.bundle)
+        background_samples.setdefault(key, sample)
+    return background_samples[key]
+
+def load_importance_sample(slot, sample_size):
+    """Rows to summarize for global importance: the background sample, else recent request features"""
+    sample = get_background_sample(slot, sample_size)
+    if sample is not None:
+        return sample, "background"
+    history = feature_histories.get(slot.model_id)
+    if history is not None and history.count:
+        values = history.values()[-sample_size:]
+        return pd.DataFrame(values, columns=history.feature_names), "recent_requests"
+    return None, None
+
+def get_feature_schema(slot):
+    """Feature schema of a model version, or None if neither info.json nor the model names its features"""
+    key = (slot.model_id, slot.version)
+    if key not in feature_schemas:
+        feature_schemas.setdefault(key, FeatureSchema.from_info(slot.info, slot.model))
+    return feature_schemas[key]
+
+def request_frame(schema, row, features):
+    """One request as a DataFrame: a view of the decoded row, or built from the dict when it was not decoded"""
+    if row is not None:
+        return schema.frame(row)
+    return pd.DataFrame([features], columns=schema.feature_names if schema is not None else None)
+
+def get_compiled_predictor(slot):
+    """Compiled predictor for a model version, compiled (and checked against the model) on first use (blocking)"""
+    if not COMPILED_INFERENCE:
+        return None
+    key = (slot.model_id, slot.version)
+    if key not in compiled_predictors:
+        sample = get_background_sample(slot, explainer_registry.max_background_samples)
+        # Same feature order as decoded request rows
+        schema = get_feature_schema(slot)
+        feature_names = schema.feature_names if schema is not None else slot.info.get("feature_names")
+        compiled_predictors.setdefault(key, compile_model(slot.model, feature_names, sample))
+    return compiled_predictors[key]
+
+async def load_compiled_predictor(slot):
+    """Compiled predictor for a model version; the first call compiles it in the worker pool"""
+    if not COMPILED_INFERENCE:
+        return None
+    key = (slot.model_id, slot.version)
+    if key in compiled_predictors:
+        return compiled_predictors[key]
+    return await execution_pool.run(get_compiled_predictor, slot)
+
+def predict_frame(slot, df):
+    """Predict a DataFrame, through the compiled predictor when it can take the rows (blocking)"""
+    predictor = get_compiled_predictor(slot) if len(df) <= COMPILED_INFERENCE_MAX_ROWS else None
+    predictions = predictor.predict_frame(df) if predictor is not None else None
+    return predictions if predictions is not None else slot.model.predict(df)
+
+def collate_rows(items):
+    """Stack the decoded rows of a micro-batch; requests to models without a schema stay dicts"""
+    if all(isinstance(item, np.ndarray) for item in items):
+        return np.concatenate(items)
+    return pd.DataFrame(items)
+
+async def predict_batch(model_id, batch):
+    """Vectorized prediction used by the micro-batcher; returns (prediction, version) pairs"""
+    async with model_lease(model_id) as slot:
+        if isinstance(batch, np.ndarray):
+            schema = get_feature_schema(slot)
+            if schema is None or batch.shape[1] != schema.n_features:
+                # Rows decoded for a version swapped out since; their callers predict them again
+                return [(None, None)] * len(batch)
+            batch = schema.frame(batch)
+        predictions = await execution_pool.run(predict_frame, slot, batch)
+    return [(prediction, slot.version) for prediction in predictions]
+
+def get_micro_batcher(model_id: str):
+    """Return the micro-batcher for a model, or None if batching is off for it"""
+    settings = micro_batch_overrides.get(model_id, {})
+    enabled = settings.get("enabled")
+    if enabled is None:
+        enabled = "*" in MICRO_BATCH_MODELS or model_id in MICRO_BATCH_MODELS
+    if not enabled:
+        return None
     
-    # Generate explanation
-    exp = explainer.explain_instance(
-        df.values[0], 
-        model.predict, 
-        num_features=num_features
-    )
+    batcher = micro_batchers.get(model_id)
+    if batcher is None:
+        batcher = MicroBatcher(
+            lambda batch: predict_batch(model_id, batch),
+            collate=collate_rows,
+            window_ms=settings.get("window_ms") or MICRO_BATCH_WINDOW_MS,
+            max_batch=settings.get("max_batch") or MICRO_BATCH_MAX_ROWS,
+        )
+        micro_batchers[model_id] = batcher
+    return batcher
+
+async def generate_shap_explanation(slot, df, num_features=10, prediction=None):
+    """Generate SHAP-based explanation"""
+    return await execution_pool.run(compute_shap_explanation, slot, df, num_features, prediction)
+
+async def generate_budgeted_shap_explanation(slot, df, num_features, deadline, prediction=None):
+    """Generate a SHAP explanation within a latency budget (None if nothing was ready in time)"""
+    return await execution_pool.run(compute_budgeted_shap_explanation, slot, df, num_features,
+                                    deadline, prediction)
+
+async def generate_batch_explanations(slot, df, method, num_features=10, predictions=None):
+    """Explain every row of a batch; SHAP runs vectorized over the whole frame"""
+    if method.lower() == "shap":
+        return await execution_pool.run(compute_shap_batch, slot, df, num_features, predictions)
+    return await generate_lime_explanations(slot, df, num_features)
+
+async def generate_lime_explanation(slot, df, num_features=10):
+    """Generate LIME-based explanation of a one-row DataFrame"""
+    return (await generate_lime_explanations(slot, df, num_features))[0]
+
+async def generate_lime_explanations(slot, df, num_features=10):
+    """Explain rows with LIME, spreading blocks of rows across the worker pool"""
+    # LIME statistics come from the model's reference sample (or recent traffic), never the rows themselves
+    training_data, _ = await execution_pool.run(load_importance_sample, slot, LIME_TRAINING_SAMPLES)
+    if training_data is None:
+        raise HTTPException(status_code=400,
+                            detail=f"Model {slot.model_id} has no background data or recent requests to build LIME from")
+    df = df.reindex(columns=training_data.columns)
+    mode = "regression" if slot.info.get("task") == "regression" else "classification"
     
-    # Extract feature importance
-    feature_importance = {}
-    for feature, importance in exp.as_list():
-        feature_importance[feature] = importance
+    # Worker processes load the model from disk once instead of receiving it with every task.
+    # They are sent the artifact the slot was loaded from and refuse any other version, so a
+    # request whose version is no longer the one on disk is explained in-process with the model it holds.
+    async def explain(kind):
+        model_ref = slot.artifact if kind == "process" else slot.model
+        chunk_rows = max(LIME_MIN_CHUNK_ROWS, -(-len(df) // execution_pool.workers[kind]))
+        chunks = await asyncio.gather(*(
+            execution_pool.run(
+                explanation_tasks.lime_explanations,
+                model_ref,
+                training_data,
+                mode,
+                df.iloc[start:start + chunk_rows],
+                num_features,
+                LIME_NUM_SAMPLES,
+                kind=kind,
+            )
+            for start in range(0, len(df), chunk_rows)
+        ))
+        return [explanation for chunk in chunks for explanation in chunk]
     
-    return {
-        "feature_importance": feature_importance,
-        "intercept": exp.intercept[0],
-        "prediction": exp.predicted_value
-    }
+    if LIME_EXECUTOR == "process" and not slot.retired and model_registry.is_current_artifact(slot):
+        try:
+            return await explain("process")
+        except explanation_tasks.StaleArtifactError:
+            # Replaced on disk after the check
+            pass
+    return await explain("thread")
+
+def get_prediction_history(model_id: str) -> PredictionHistory:
+    """Ring buffer of recent predictions for a model, created on first use"""
+    history = prediction_histories.get(model_id)
+    if history is None:
+        info = model_info.get(model_id, {})
+        bin_edges = None
+        if "historical_mean" in info and info.get("historical_std"):
+            # Bins spanning +/- 4 sigma of the training distribution
+            bin_edges = np.linspace(info["historical_mean"] - 4 * info["historical_std"],
+                                    info["historical_mean"] + 4 * info["historical_std"], 21)
+        history = PredictionHistory(capacity=PREDICTION_HISTORY_SIZE, bin_edges=bin_edges)
+        prediction_histories[model_id] = history
+    return history
+
+def get_reference_profile(model_id: str):
+    """Parsed reference profile from info.json, or None if the model has none"""
+    profile = reference_profiles.get(model_id)
+    if profile is None:
+        data = model_info.get(model_id, {}).get("reference_profile")
+        if data is None:
+            return None
+        profile = ReferenceProfile.from_dict(data)
+        reference_profiles[model_id] = profile
+    return profile
+
+def track_features(model_id: str, features, feature_names=None):
+    """Record request features (a dict, a DataFrame, or decoded rows in feature_names order) for drift detection"""
+    profile = get_reference_profile(model_id)
+    if profile is None or not profile.feature_names:
+        return
+    history = feature_histories.get(model_id)
+    if history is None:
+        history = FeatureHistory(profile.feature_names, capacity=FEATURE_HISTORY_SIZE)
+        feature_histories[model_id] = history
+    if isinstance(features, np.ndarray):
+        if list(feature_names) == history.feature_names:
+            history.extend(features)
+        else:
+            history.extend_frame(pd.DataFrame(features, columns=feature_names, copy=False))
+    elif isinstance(features, pd.DataFrame):
+        history.extend_frame(features)
+    else:
+        history.extend(history.row_from_dict(features))
+
+def track_predictions(model_id: str, predictions):
+    """Record predictions for drift detection; non-numeric outputs are skipped"""
+    try:
+        values = np.asarray(predictions, dtype=np.float64)
+    except (TypeError, ValueError):
+        return
+    get_prediction_history(model_id).extend(values)
 
-async def check_for_drift(model_id, new_data):
+def response_array(predictions) -> np.ndarray:
+    """Predictions as an array for the serializer; float32 is widened so values print as they did through tolist()"""
+    predictions = np.asarray(predictions)
+    if predictions.dtype == np.float32:
+        return predictions.astype(np.float64)
+    return predictions
+
+async def check_for_drift(model_id):
     """Check if model is experiencing drift based on recent predictions"""
     # Simple implementation - in production use more sophisticated methods
-    if len(new_data) < 100:  # Need enough data to detect drift
+    history = get_prediction_history(model_id)
+    if history.count < 100:  # Need enough data to detect drift
         return False
         
-    # Compare recent prediction distribution with historical
-    current_mean = np.mean(new_data)
-    current_std = np.std(new_data)
+    # Compare recent prediction distribution with historical (O(1) running stats)
+    current_mean = history.mean
+    current_std = history.std
     
     # Load historical stats (in production, retrieve from database)
     historical_mean = model_info[model_id].get("historical_mean", current_mean)
@@ -152,37 +634,114 @@ async def check_for_drift(model_id, new_data):
     
     return False
 
-async def retrain_model_if_needed(background_tasks, model_id):
-    """Trigger model retraining if drift is detected"""
-    if drift_detected.get(model_id, False) and not retraining_status.get(model_id, False):
+def evaluate_drift(model_id):
+    """Run the drift engine over the current feature and prediction windows (blocking)"""
+    profile = get_reference_profile(model_id)
+    if profile is None:
+        return None
+    feature_history = feature_histories.get(model_id)
+    prediction_history = prediction_histories.get(model_id)
+    report = drift_engine.evaluate(
+        profile,
+        feature_history.values() if feature_history is not None else None,
+        prediction_history.values() if prediction_history is not None else None,
+    )
+    report["timestamp"] = datetime.now().isoformat()
+    return report
+
+async def run_drift_checks(model_id=None):
+    """Check one or all tracked models for drift and queue retraining where needed"""
+    model_ids = [model_id] if model_id else list(prediction_histories)
+    for mid in model_ids:
+        report = await execution_pool.run(evaluate_drift, mid)
+        if report is not None:
+            drift_reports[mid] = report
+            drifted = report["drift_detected"]
+            if drifted:
+                drift_detected[mid] = True
+        else:
+            # No reference profile: fall back to the prediction mean z-test
+            drifted = await check_for_drift(mid)
+        if drifted:
+            retrain_model_if_needed(mid, reason="scheduled drift check")
+
+async def drift_monitor():
+    """Periodically run drift checks instead of checking on every request"""
+    while True:
+        await asyncio.sleep(DRIFT_CHECK_INTERVAL_SECONDS)
+        try:
+            await run_drift_checks()
+        except Exception as e:
+            print(f"Error running drift checks: {str(e)}")
+
+@app.on_event("startup")
+async def start_drift_monitor():
+    if DRIFT_CHECK_INTERVAL_SECONDS > 0:
+        app.state.drift_monitor = asyncio.create_task(drift_monitor())
+
+@app.on_event("shutdown")
+async def stop_drift_monitor():
+    task = getattr(app.state, "drift_monitor", None)
+    if task is not None:
+        task.cancel()
+
+def retrain_model_if_needed(model_id, reason="drift detected"):
+    """Queue a retraining job if drift is detected; returns the job (None if no drift or backing off after failures)"""
+    if not drift_detected.get(model_id, False):
+        return None
+    if retraining_service.backoff_remaining(model_id) > 0:
+        return None
+    job = retraining_service.submit(model_id, reason)
+    retraining_status[model_id] = True
+    return job
+
+async def swap_model_version(model_id, candidate=False):
+    """Load, validate and warm the artifact on disk (or the staged candidate) in the background, then switch traffic to it"""
+    slot = await execution_pool.run(
+        model_registry.hot_swap, model_id, validate_model_slot, warm_model_slot, candidate=candidate,
+        timeout=MODEL_SWAP_TIMEOUT_SECONDS,
+    )
+    
+    # No awaits from here on, so requests see either the old per-model state or the new one
+    explanation_cache.invalidate_model(model_id)
+    feature_histories.pop(model_id, None)
+    reference_profiles.pop(model_id, None)
+    drift_detected[model_id] = False
+    performance_metrics.setdefault(model_id, {}).setdefault("events", []).append({
+        "event": "model_swapped",
+        "version": slot.version,
+        "timestamp": datetime.now().isoformat()
+    })
+    return slot
+
+async def on_retraining_complete(model_id, version):
+    """Promote and swap in a newly trained version; in-flight requests finish on the old one"""
+    slot = await swap_model_version(model_id, candidate=True)
+    retraining_status[model_id] = False
+    
+    # Log retraining event
+    performance_metrics.setdefault(model_id, {}).setdefault("events", []).append({
+        "event": "retraining_completed",
+        "version": slot.version,
+        "timestamp": datetime.now().isoformat()
+    })
+
+async def on_retraining_failed(model_id, error):
+    print(f"Error retraining model {model_id}: {error}")
+    retraining_status[model_id] = False
+
+retraining_service.on_complete = on_retraining_complete
+retraining_service.on_failure = on_retraining_failed
+
+@app.on_event("startup")
+async def start_retraining_service():
+    await retraining_service.start()
+    for model_id in retraining_service.store.active_models():
         retraining_status[model_id] = True
-        background_tasks.add_task(retrain_model, model_id)
 
-async def retrain_model(model_id):
-    """Background task to retrain model"""
-    try:
-        # In a real system, this would call your ML training pipeline
-        print(f"Retraining model {model_id} due to detected drift")
-        
-        # Simulate retraining delay
-        await asyncio.sleep(10)
-        
-        # Update the model (in production, this would load the newly trained model)
-        models[model_id] = joblib.load(f"models/{model_id}/model.joblib")
-        
-        # Reset drift flags
-        drift_detected[model_id] = False
-        retraining_status[model_id] = False
-        
-        # Log retraining event
-        performance_metrics.setdefault(model_id, []).append({
-            "event": "retraining_completed",
-            "timestamp": datetime.now().isoformat()
-        })
-        
-    except Exception as e:
-        print(f"Error retraining model {model_id}: {str(e)}")
-        retraining_status[model_id] = False
+@app.on_event("shutdown")
+async def stop_retraining_service():
+    await retraining_service.stop()
 
 # API Endpoints
 @app.get("/")
@@ -197,13 +756,10 @@ async def list_models():
 @app.get("/models/{model_id}")
 async def get_model_info(model_id: str):
     """Get detailed information about a specific model"""
-    if model_id not in model_info:
-        try:
-            load_model(model_id)
-        except HTTPException:
-            raise HTTPException(status_code=404, detail=f"Model {model_id} not found")
-    
-    return model_info[model_id]
+    try:
+        return await execution_pool.run(model_registry.info, model_id)
+    except ModelNotFoundError:
+        raise HTTPException(status_code=404, detail=f"Model {model_id} not found")
 
 @app.post("/predict")
 async def predict(
@@ -211,105 +767,370 @@ async def predict(
     background_tasks: BackgroundTasks
 ):
     """Make prediction with a single data point and optionally return explanation"""
+    started = time.monotonic()
     model_id = request.model_id
     features = request.features
     
-    # Load model
-    model = load_model(model_id)
-    
-    # Make prediction
-    df = pd.DataFrame([features])
-    prediction = model.predict(df)[0]
-    
-    # Track predictions for drift detection
-    performance_metrics.setdefault(model_id, {}).setdefault("recent_predictions", []).append(prediction)
-    
-    # Check if we need explanation
-    explanation = None
-    cache_key = f"{model_id}_{json.dumps(features)}_{request.explanation_method}_{request.num_features}"
-    
-    if request.explanation_method:
-        # Check cache first
-        if cache_key in explanation_cache:
-            explanation = explanation_cache[cache_key]
+    # Pin the serving model version for the whole request
+    async with model_lease(model_id) as slot:
+        # Decode the features once; the row is shared by prediction, explanation and drift tracking
+        schema = get_feature_schema(slot)
+        row = schema.decode(features) if schema is not None else None
+        
+        # Make prediction, coalesced with concurrent requests when micro-batching is on.
+        # Models with a schema batch decoded rows only; rows it could not decode are predicted alone
+        batcher = get_micro_batcher(model_id)
+        submitted = row if row is not None else features
+        if batcher is not None and (row is not None or schema is None):
+            prediction, version = await batcher.submit(submitted)
         else:
-            # Generate explanation based on method
-            if request.explanation_method.lower() == "shap":
-                explanation = await generate_shap_explanation(model, features, request.num_features)
-            elif request.explanation_method.lower() == "lime":
-                explanation = await generate_lime_explanation(model, features, request.num_features)
-            else:
-                raise HTTPException(status_code=400, detail=f"Unsupported explanation method: {request.explanation_method}")
+            prediction, version = None, None
+        if version != slot.version:
+            # Not batched, or the batch ran on a version swapped in after this request started.
+            # A compiled predictor scores the row inline; anything else goes through the model
+            predictor = await load_compiled_predictor(slot)
+            predictions = predictor.predict_rows(row) if predictor is not None and row is not None else None
+            if predictions is None:
+                df = request_frame(schema, row, features)
+                predictions = await execution_pool.run(slot.model.predict, df)
+            prediction = predictions[0]
+        
+        # Track predictions for drift detection
+        track_predictions(model_id, [prediction])
+        if row is not None:
+            track_features(model_id, row, schema.feature_names)
+        else:
+            track_features(model_id, features)
+        
+        # Check if we need explanation
+        explanation = None
+        
+        if request.explanation_method:
+            # Budgeted SHAP results (other algorithms, timing fields) are cached and reused apart from unbudgeted ones
+            budgeted = request.explanation_method.lower() == "shap" and request.latency_budget_ms is not None
+            cache_method = "shap:budgeted" if budgeted else request.explanation_method
             
-            # Cache the explanation
-            explanation_cache[cache_key] = explanation
+            # Check cache first
+            cache_key = make_cache_key(model_id, slot.version, features, cache_method, request.num_features)
+            explanation = explanation_cache.get(cache_key)
+            if explanation is None and NEIGHBOR_REUSE_RADIUS > 0:
+                # Then an explanation of a nearly identical row
+                explanation = await execution_pool.run(find_neighbor_explanation, slot, cache_method,
+                                                       request.num_features, features, prediction)
+            if explanation is None:
+                # Generate explanation based on method
+                df = request_frame(schema, row, features)
+                if budgeted:
+                    # The budget covers the whole request, including the prediction above
+                    deadline = started + request.latency_budget_ms / 1000.0
+                    explanation = await generate_budgeted_shap_explanation(
+                        slot, df, request.num_features, deadline, prediction)
+                elif request.explanation_method.lower() == "shap":
+                    explanation = await generate_shap_explanation(slot, df, request.num_features, prediction)
+                elif request.explanation_method.lower() == "lime":
+                    explanation = await generate_lime_explanation(slot, df, request.num_features)
+                else:
+                    raise HTTPException(status_code=400, detail=f"Unsupported explanation method: {request.explanation_method}")
+                
+                # Cache the explanation; approximate ones are not, so a later request with more time gets the exact one
+                if explanation is not None and not explanation.get("approximate"):
+                    explanation_cache.set(cache_key, model_id, explanation)
+                    if NEIGHBOR_REUSE_RADIUS > 0:
+                        await execution_pool.run(remember_explanation, slot, cache_method,
+                                                 request.num_features, features, explanation, prediction)
     
-    # Check for drift in background
-    recent_predictions = performance_metrics.get(model_id, {}).get("recent_predictions", [])
-    if len(recent_predictions) >= 100:
-        background_tasks.add_task(check_for_drift, model_id, recent_predictions)
-        # If drift is detected, retrain in background
-        if drift_detected.get(model_id, False):
-            background_tasks.add_task(retrain_model_if_needed, background_tasks, model_id)
+    # Drift itself is evaluated on a schedule by drift_monitor
     
     # Return prediction and explanation
-    return {
+    return FastJSONResponse({
         "model_id": model_id,
+        "model_version": slot.version,
         "prediction": float(prediction) if isinstance(prediction, (float, int, np.number)) else prediction,
         "explanation": explanation,
         "drift_detected": drift_detected.get(model_id, False),
         "timestamp": datetime.now().isoformat()
-    }
+    })
 
 @app.post("/batch-predict")
-async def batch_predict(request: BatchPredictionRequest):
-    """Make predictions with batch data"""
+async def batch_predict(request: BatchPredictionRequest, http_request: Request):
+    """Make predictions with batch data, as JSON, MessagePack or Arrow IPC depending on the Accept header"""
     model_id = request.model_id
     data = request.data
+    if request.explanation_method and request.explanation_method.lower() not in EXPLANATION_METHODS:
+        raise HTTPException(status_code=400, detail=f"Unsupported explanation method: {request.explanation_method}")
     
-    # Load model
-    model = load_model(model_id)
-    
-    # Convert to DataFrame
-    df = pd.DataFrame(data)
-    
-    # Make predictions
-    predictions = model.predict(df).tolist()
+    # Make predictions, and explain them with the same model version
+    explanations = None
+    async with model_lease(model_id) as slot:
+        # Decode the rows into one matrix (a DataFrame without a schema or for non-numeric values),
+        # shared with explanations and drift
+        schema = get_feature_schema(slot)
+        X = schema.decode_batch(data) if schema is not None else None
+        if X is not None:
+            df = schema.frame(X)
+        else:
+            df = pd.DataFrame(data, columns=schema.feature_names if schema is not None else None)
+        predictions = await execution_pool.run(predict_frame, slot, df)
+        if request.explanation_method:
+            explanations = await generate_batch_explanations(slot, df, request.explanation_method,
+                                                             request.num_features, predictions)
+    predictions = response_array(predictions)
     
     # Add predictions to performance tracking
-    performance_metrics.setdefault(model_id, {}).setdefault("recent_predictions", []).extend(predictions)
+    track_predictions(model_id, predictions)
+    if X is not None:
+        track_features(model_id, X, schema.feature_names)
+    else:
+        track_features(model_id, df)
     
-    return {
+    content = {
         "model_id": model_id,
+        "model_version": slot.version,
         "predictions": predictions,
+        "explanations": explanations,
         "count": len(predictions),
         "timestamp": datetime.now().isoformat()
     }
+    def arrow_columns():
+        # Arrow responses carry one row per prediction; explanations are JSON-encoded per row
+        columns = {"prediction": predictions}
+        if explanations is not None:
+            columns["explanation"] = [fast_json.dumps(explanation).decode() for explanation in explanations]
+        return columns
+    return fast_json.negotiated_response(content, http_request.headers.get("accept"), arrow_columns)
+
+async def iter_request_frames(request: Request, chunk_size: int):
+    """Decode a streaming request body into DataFrame chunks based on its content type"""
+    content_type = request.headers.get("content-type", "application/x-ndjson").split(";")[0].strip().lower()
+    
+    if content_type in streaming_io.NDJSON_TYPES:
+        async for chunk in streaming_io.iter_ndjson_chunks(request.stream(), chunk_size):
+            yield chunk
+        return
+    
+    if content_type in streaming_io.JSON_TYPES:
+        # Columnar layout: parsed once, then sliced without copying per row
+        try:
+            payload = json.loads(await request.body())
+        except ValueError as e:
+            raise streaming_io.PayloadError(f"Invalid JSON payload: {e}")
+        df = streaming_io.columnar_frame(payload)
+        for chunk in streaming_io.iter_frame_chunks(df, chunk_size):
+            yield chunk
+        return
+    
+    if content_type in streaming_io.CSV_TYPES:
+        reader_factory = streaming_io.iter_csv_chunks
+    elif content_type in streaming_io.ARROW_TYPES:
+        reader_factory = streaming_io.iter_arrow_chunks
+    else:
+        raise streaming_io.PayloadError(f"Unsupported content type: {content_type}")
+    
+    spool = await streaming_io.spool_stream(request.stream(), STREAM_SPOOL_BYTES)
+    try:
+        reader = reader_factory(spool, chunk_size)
+        while True:
+            # Parsing is CPU-bound, so each chunk is decoded in the worker pool
+            chunk = await execution_pool.run(next, reader, None)
+            if chunk is None:
+                break
+            yield chunk
+    finally:
+        spool.close()
+
+@app.post("/batch-predict/stream")
+async def batch_predict_stream(request: Request, model_id: str, chunk_size: int = STREAM_CHUNK_ROWS,
+                               explanation_method: Optional[str] = None, num_features: int = 10):
+    """Score NDJSON, CSV, Arrow IPC or columnar JSON bodies chunk by chunk, streaming NDJSON results back"""
+    if chunk_size < 1:
+        raise HTTPException(status_code=400, detail="chunk_size must be at least 1")
+    if explanation_method and explanation_method.lower() not in EXPLANATION_METHODS:
+        raise HTTPException(status_code=400, detail=f"Unsupported explanation method: {explanation_method}")
+    # The whole stream is scored by one model version; the lease is released when it ends
+    slot = await acquire_model(model_id)
+    frames = iter_request_frames(request, chunk_size)
+    
+    # Decode the first chunk before streaming so bad payloads still get a proper status code
+    try:
+        first_chunk = await frames.__anext__()
+    except StopAsyncIteration:
+        first_chunk = None
+    except streaming_io.PayloadError as e:
+        model_registry.release(slot)
+        raise HTTPException(status_code=400, detail=str(e))
+    except BaseException:
+        model_registry.release(slot)
+        raise
+    
+    async def generate():
+        count = 0
+        chunk = first_chunk
+        try:
+            while chunk is not None:
+                predictions = await execution_pool.run(predict_frame, slot, chunk)
+                track_predictions(model_id, predictions)
+                track_features(model_id, chunk)
+                result = {"offset": count, "predictions": response_array(predictions)}
+                if explanation_method:
+                    result["explanations"] = await generate_batch_explanations(
+                        slot, chunk, explanation_method, num_features, predictions)
+                yield fast_json.dumps(result) + b"\n"
+                count += len(predictions)
+                try:
+                    chunk = await frames.__anext__()
+                except StopAsyncIteration:
+                    chunk = None
+        except Exception as e:
+            # Headers are already sent, so report the failure in-band
+            yield fast_json.dumps({"error": str(e), "offset": count}) + b"\n"
+            return
+        finally:
+            model_registry.release(slot)
+        yield fast_json.dumps({
+            "model_id": model_id,
+            "model_version": slot.version,
+            "count": count,
+            "timestamp": datetime.now().isoformat()
+        }) + b"\n"
+    
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
+
+@app.get("/models/{model_id}/feature-importance")
+async def get_global_feature_importance(model_id: str, sample_size: int = GLOBAL_IMPORTANCE_SAMPLE_SIZE):
+    """Global feature importance: mean |SHAP| over a sample, computed in one vectorized pass"""
+    if sample_size < 1:
+        raise HTTPException(status_code=400, detail="sample_size must be at least 1")
+    async with model_lease(model_id) as slot:
+        cache_key = make_cache_key(model_id, slot.version, {"sample_size": sample_size}, "global_shap", None)
+        result = explanation_cache.get(cache_key)
+        if result is None:
+            sample, source = await execution_pool.run(load_importance_sample, slot, sample_size)
+            if sample is None:
+                raise HTTPException(status_code=404, detail=f"No background data or recent requests for model {model_id}")
+            importance = await execution_pool.run(compute_global_importance, slot, sample)
+            result = {"feature_importance": importance, "sample_size": len(sample), "sample_source": source}
+            explanation_cache.set(cache_key, model_id, result)
+    
+    return {
+        "model_id": model_id,
+        "model_version": slot.version,
+        **result,
+        "timestamp": datetime.now().isoformat()
+    }
 
 @app.get("/performance/{model_id}")
 async def get_model_performance(model_id: str):
     """Get performance metrics for a model"""
-    if model_id not in performance_metrics:
+    if model_id not in performance_metrics and model_id not in prediction_histories:
         raise HTTPException(status_code=404, detail=f"No performance data for model {model_id}")
     
-    return {
+    metrics = dict(performance_metrics.get(model_id, {}))
+    if model_id in prediction_histories:
+        metrics["prediction_history"] = prediction_histories[model_id].summary()
+    
+    return FastJSONResponse({
         "model_id": model_id,
-        "metrics": performance_metrics[model_id],
+        "metrics": metrics,
         "drift_detected": drift_detected.get(model_id, False),
         "retraining_status": retraining_status.get(model_id, False)
+    })
+
+@app.get("/drift/{model_id}")
+async def get_drift_report(model_id: str):
+    """Get the latest scheduled drift report (KS, PSI and KL per feature and for predictions)"""
+    if model_id not in drift_reports:
+        raise HTTPException(status_code=404, detail=f"No drift report for model {model_id}")
+    return drift_reports[model_id]
+
+@app.post("/drift/{model_id}/check")
+async def check_drift_now(model_id: str):
+    """Run a drift check for a model immediately"""
+    await execution_pool.run(load_model, model_id)
+    await run_drift_checks(model_id)
+    return {
+        "model_id": model_id,
+        "drift_detected": drift_detected.get(model_id, False),
+        "report": drift_reports.get(model_id),
+    }
+
+@app.get("/cache/stats")
+async def get_cache_stats():
+    """Get hit/miss/eviction counters for the explanation cache"""
+    return {
+        "explanations": explanation_cache.stats(),
+        "explainers": explainer_registry.stats(),
+        "neighbor_reuse": {f"{model_id}@{version}:{method}:{num_features}": index.stats()
+                           for (model_id, version, method, num_features), (_, index) in neighbor_indexes.items()},
     }
 
+@app.get("/models/{model_id}/versions")
+async def get_model_versions(model_id: str):
+    """Get the serving version and any retired versions still finishing requests"""
+    return {"model_id": model_id, **model_registry.versions(model_id)}
+
+@app.post("/models/{model_id}/reload")
+async def reload_model(model_id: str):
+    """Hot-swap to the artifact currently on disk without interrupting traffic"""
+    try:
+        slot = await swap_model_version(model_id)
+    except ModelNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e.args[0]))
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=f"New version failed validation: {str(e)}")
+    return {"model_id": model_id, "version": slot.version}
+
+@app.get("/registry/stats")
+async def get_registry_stats():
+    """Get catalog size, resident models, load counts/timings and evictions"""
+    return model_registry.stats()
+
+@app.get("/pool/stats")
+async def get_pool_stats():
+    """Get in-flight, rejected and timed out task counts for the worker pools"""
+    return execution_pool.stats()
+
+@app.get("/micro-batching")
+async def get_micro_batching():
+    """Get micro-batching settings plus batch-size and queueing-delay histograms per model"""
+    return {
+        "default_models": sorted(MICRO_BATCH_MODELS),
+        "default_window_ms": MICRO_BATCH_WINDOW_MS,
+        "default_max_batch": MICRO_BATCH_MAX_ROWS,
+        "overrides": micro_batch_overrides,
+        "models": {model_id: batcher.stats() for model_id, batcher in micro_batchers.items()},
+    }
+
+@app.put("/micro-batching/{model_id}")
+async def configure_micro_batching(model_id: str, config: MicroBatchConfig):
+    """Enable/disable micro-batching for a model and tune its window and batch size"""
+    if config.window_ms is not None and config.window_ms < 0:
+        raise HTTPException(status_code=400, detail="window_ms must be non-negative")
+    if config.max_batch is not None and config.max_batch < 1:
+        raise HTTPException(status_code=400, detail="max_batch must be at least 1")
+    
+    settings = micro_batch_overrides.setdefault(model_id, {})
+    settings.update({k: v for k, v in config.dict().items() if v is not None})
+    if model_id in micro_batchers:
+        micro_batchers[model_id].configure(config.window_ms, config.max_batch)
+    return {"model_id": model_id, "settings": settings}
+
+@app.delete("/cache/{model_id}")
+async def invalidate_cache(model_id: str):
+    """Drop cached explanations for a model"""
+    return {"model_id": model_id, "invalidated": explanation_cache.invalidate_model(model_id)}
+
 @app.post("/report-drift")
-async def report_drift(report: ModelDriftReport, background_tasks: BackgroundTasks):
+async def report_drift(report: ModelDriftReport):
     """Report drift from external monitoring systems"""
     model_id = report.model_id
+    job = None
     
     # Update drift status
     if report.current_value > report.threshold:
         drift_detected[model_id] = True
         
         # Queue retraining if needed
-        background_tasks.add_task(retrain_model_if_needed, background_tasks, model_id)
+        job = retrain_model_if_needed(model_id, reason=f"reported {report.metric} drift")
     
     # Log the report
     performance_metrics.setdefault(model_id, {}).setdefault("drift_reports", []).append({
@@ -321,9 +1142,35 @@ async def report_drift(report: ModelDriftReport, background_tasks: BackgroundTas
     
     return {
         "status": "received",
-        "action": "retraining" if drift_detected.get(model_id, False) else "monitoring"
+        "action": "retraining" if drift_detected.get(model_id, False) else "monitoring",
+        "job_id": job["id"] if job else None
     }
 
+@app.post("/models/{model_id}/retrain")
+async def queue_retraining(model_id: str):
+    """Queue a retraining job for a model regardless of drift"""
+    if model_id not in await execution_pool.run(model_registry.scan):
+        raise HTTPException(status_code=404, detail=f"Model {model_id} not found")
+    job = retraining_service.submit(model_id, reason="manual")
+    retraining_status[model_id] = True
+    return job
+
+@app.get("/retraining/jobs")
+async def list_retraining_jobs(model_id: Optional[str] = None, status: Optional[str] = None, limit: int = 50):
+    """List retraining jobs, newest first"""
+    return {
+        "jobs": retraining_service.store.list(model_id, status, limit),
+        "service": retraining_service.stats(),
+    }
+
+@app.get("/retraining/jobs/{job_id}")
+async def get_retraining_job(job_id: int):
+    """Get the state of a retraining job"""
+    job = retraining_service.store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Retraining job {job_id} not found")
+    return job
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,201 @@
+"""Per-model feature schemas: request JSON straight to NumPy rows.
+
+A FeatureSchema fixes a model's feature order (from info.json
+``feature_names``, ``ModelFactory.feature_names`` or the model's own
+``feature_names_in_``) and decodes request dicts into a freshly allocated
+row, or a list of dicts into a matrix, without building a DataFrame from
+the records. Requests must carry exactly the model's features: missing and
+unknown fields are rejected with a SchemaError naming them. A JSON null is a
+missing value and decodes to NaN (as it did through pandas), for models that
+handle NaN themselves; true and false are read as 1 and 0. Categorical
+features (``feature_categories`` in info.json, feature -> list of
+categories) are mapped to their category's position through lookup tables
+built once per schema.
+
+Other values are only rejected for features known to be numeric: all
+non-categorical features of a schema with ``feature_categories`` or
+``numeric_features`` in info.json, or of a model that only accepts numbers
+(a bare scikit-learn estimator or XGBoost model). Elsewhere, for example in
+a pipeline that encodes strings itself, ``decode`` returns None and the
+caller builds a DataFrame from the request dicts as before.
+
+The decoded buffer is meant to be shared by everything a request does:
+``frame`` wraps it in a DataFrame without copying for models and
+explainers that need one, and the same array feeds drift tracking.
+
+Rows are float32 for models that cast their input to float32 anyway
+(scikit-learn trees and XGBoost), so nothing changes for them; other models
+get float64 rows and see exactly the values they saw before.
+"""
+from operator import itemgetter
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+# JSON numbers
+_NUMBER_TYPES = (int, float)
+# Other values accepted for numeric features: null is a missing value, booleans are read as 1/0 as pandas did
+_SPECIAL_VALUES = {None: np.nan, False: 0.0, True: 1.0}
+
+
+def _is_special(value) -> bool:
+    return value is None or type(value) is bool
+
+
+class SchemaError(ValueError):
+    """Raised when request fields do not match a model's features"""
+
+
+def numeric_only(model) -> bool:
+    """Whether a model only accepts numbers, so other values can be rejected before it sees them"""
+    module = type(model).__module__
+    if module.startswith("xgboost"):
+        return not getattr(model, "enable_categorical", False)
+    # Pipelines and column transformers may encode strings themselves
+    return module.startswith("sklearn.") and not hasattr(model, "steps") and not hasattr(model, "transformers")
+
+
+def input_dtype(model) -> type:
+    """float32 for models that cast inputs to float32 themselves, float64 otherwise"""
+    module = type(model).__module__
+    if module.startswith("xgboost"):
+        return np.float32
+    if module.startswith("sklearn."):
+        estimators = getattr(model, "estimators_", None)
+        trees = estimators if estimators is not None else [model]
+        if len(trees) and all(hasattr(tree, "tree_") for tree in np.ravel(trees)):
+            return np.float32
+    return np.float64
+
+
+class FeatureSchema:
+    """Fixed feature order plus categorical lookup tables for one model version.
+
+    Args:
+        feature_names: Features in the order the model expects them
+        categories: Categorical feature -> categories; a value is encoded as its category's position
+        dtype: dtype of decoded rows
+        numeric_features: Features whose values must be numbers (defaults to every non-categorical feature);
+            other values of the remaining features make ``decode`` return None
+    """
+
+    def __init__(self, feature_names: Sequence[str], categories: Optional[Dict[str, Sequence[Any]]] = None,
+                 dtype=np.float32, numeric_features: Optional[Sequence[str]] = None):
+        self.feature_names = list(feature_names)
+        self.n_features = len(self.feature_names)
+        self.dtype = np.dtype(dtype)
+        self._names = frozenset(self.feature_names)
+        if len(self._names) != self.n_features:
+            raise ValueError("Feature names must be unique")
+        categories = {name: list(values) for name, values in (categories or {}).items() if name in self._names}
+        self.categories = categories
+        # Lookup tables built once: category -> code
+        self._lookups = [(i, name, {value: float(code) for code, value in enumerate(categories[name])})
+                         for i, name in enumerate(self.feature_names) if name in categories]
+        self._numeric = [(i, name) for i, name in enumerate(self.feature_names) if name not in categories]
+        self.numeric_features = frozenset(name for _, name in self._numeric
+                                          if numeric_features is None or name in numeric_features)
+        self._getter = itemgetter(*self.feature_names) if self.n_features > 1 else None
+
+    @classmethod
+    def from_info(cls, info: Dict[str, Any], model=None) -> Optional["FeatureSchema"]:
+        """Schema from model metadata, falling back to the model's own feature names; None if neither has them"""
+        feature_names = info.get("feature_names")
+        if not feature_names and model is not None:
+            names = getattr(model, "feature_names_in_", None)
+            feature_names = [str(name) for name in names] if names is not None else None
+        if not feature_names:
+            return None
+        dtype = input_dtype(model) if model is not None else np.float64
+        numeric_features = info.get("numeric_features")
+        if numeric_features is None and not info.get("feature_categories"):
+            # Without declared types, only a model that rejects anything else marks its features numeric
+            numeric_features = None if model is not None and numeric_only(model) else ()
+        return cls(feature_names, info.get("feature_categories"), dtype=dtype, numeric_features=numeric_features)
+
+    def _check_fields(self, fields) -> None:
+        missing = [name for name in self.feature_names if name not in fields]
+        unknown = [name for name in fields if name not in self._names]
+        problems = []
+        if missing:
+            problems.append(f"missing features: {', '.join(map(str, missing))}")
+        if unknown:
+            problems.append(f"unknown features: {', '.join(map(str, unknown))}")
+        raise SchemaError("; ".join(problems))
+
+    def _not_a_number(self, name, value, row: Optional[int] = None) -> None:
+        """Reject a non-numeric value of a numeric feature; returns for features that may hold others"""
+        if name in self.numeric_features:
+            prefix = f"Row {row}: feature" if row is not None else "Feature"
+            raise SchemaError(f"{prefix} {name} must be a number or null, got {value!r}")
+
+    def _encode(self, values: List[Any]) -> Optional[List[Any]]:
+        """Replace categorical values by their codes and other values by numbers, in place (None if a value is neither)"""
+        for i, name, table in self._lookups:
+            code = table.get(values[i], np.nan if values[i] is None else None)
+            if code is None:
+                raise SchemaError(f"Unknown category {values[i]!r} for feature {name}")
+            values[i] = code
+        for i, name in self._numeric:
+            if type(values[i]) not in _NUMBER_TYPES:
+                if not _is_special(values[i]):
+                    self._not_a_number(name, values[i])
+                    return None
+                values[i] = _SPECIAL_VALUES[values[i]]
+        return values
+
+    def decode(self, features: Dict[str, Any]) -> Optional[np.ndarray]:
+        """One request dict as a (1, n_features) array in feature order (None if it needs the DataFrame path)"""
+        if not isinstance(features, dict):
+            raise SchemaError("Features must be a JSON object")
+        if features.keys() != self._names:
+            self._check_fields(features)
+        values = self._encode([features[name] for name in self.feature_names])
+        if values is None:
+            return None
+        row = np.empty((1, self.n_features), dtype=self.dtype)
+        row[0] = values
+        return row
+
+    def decode_batch(self, records: Sequence[Dict[str, Any]]) -> Optional[np.ndarray]:
+        """A list of request dicts as an (n_rows, n_features) array, filled column by column; None if they need the DataFrame path"""
+        X = np.empty((len(records), self.n_features), dtype=self.dtype)
+        for number, record in enumerate(records):
+            if not isinstance(record, dict):
+                raise SchemaError(f"Row {number}: features must be a JSON object")
+            if record.keys() != self._names:
+                try:
+                    self._check_fields(record)
+                except SchemaError as e:
+                    raise SchemaError(f"Row {number}: {e}")
+        if not self._lookups and self._getter is not None:
+            # All-numeric rows: one C-level pass, checked through the dtype numpy infers
+            try:
+                values = np.array(list(map(self._getter, records)))
+            except ValueError:  # Nested values; the column pass below reports them
+                values = None
+            if values is not None and values.dtype.kind in "iufb" and values.shape == X.shape:
+                X[:] = values
+                return X
+        for i, name, table in self._lookups:
+            codes = [table.get(value, np.nan if value is None else None) for value in (record[name] for record in records)]
+            if None in codes:
+                number = codes.index(None)
+                raise SchemaError(f"Row {number}: unknown category {records[number][name]!r} for feature {name}")
+            X[:, i] = codes
+        for i, name in self._numeric:
+            column = [record[name] for record in records]
+            if not all(type(value) in _NUMBER_TYPES for value in column):
+                for number, value in enumerate(column):
+                    if type(value) not in _NUMBER_TYPES:
+                        if not _is_special(value):
+                            self._not_a_number(name, value, number)
+                            return None
+                        column[number] = _SPECIAL_VALUES[value]
+            X[:, i] = column
+        return X
+
+    def frame(self, X: np.ndarray) -> pd.DataFrame:
+        """DataFrame view of decoded rows (no copy), for models and explainers that need column names"""
+        return pd.DataFrame(X, columns=self.feature_names, copy=False)
@@ -0,0 +1,306 @@
+"""Arbitrary forecast windows from fitted Prophet, ARIMA and LSTM state.
+
+Forecasts are addressed by step: step 1 is the first period after the
+training history, step 0 its last observation and negative steps earlier
+history (Prophet only). Dates map onto steps through the history's last date
+and frequency. Each model keeps one contiguous cached frame of steps, seeded
+from the forecast made at training time, which grows incrementally when a
+query reaches past it:
+
+- Prophet predicts only the new dates (every column of its decomposition is
+  cached: trend, seasonalities, additive/multiplicative terms and intervals)
+- ARIMA continues the state-space recursion from the last predicted state
+  and covariance, which is exactly what ``get_forecast`` computes
+- LSTM continues its recursive forecast from the last scaled window
+
+Frames are evicted least recently used once their total size exceeds
+``max_bytes``, and a refit or update (new model object or ``last_trained``)
+invalidates a model's frame.
+"""
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from pandas.tseries.frequencies import to_offset
+from scipy.stats import norm
+
+def infer_frequency(dates) -> str:
+    """Pandas frequency of a date sequence; irregular series use the last observed spacing"""
+    dates = pd.DatetimeIndex(pd.to_datetime(dates)).sort_values()
+    freq = pd.infer_freq(dates) if len(dates) >= 3 else None
+    if freq is not None:
+        return freq
+    step = dates[-1] - dates[-2] if len(dates) > 1 else pd.Timedelta(days=1)
+    return to_offset(step).freqstr
+
+
+class _CachedForecast:
+    """Contiguous forecast frame of one model (indexed by step) plus the state needed to extend it"""
+
+    def __init__(self, version: Tuple, frame: pd.DataFrame, state: Any = None):
+        self.version = version
+        self.frame = frame
+        self.state = state
+        self.lock = threading.Lock()
+        self.nbytes = int(frame.memory_usage(index=True).sum())
+
+    def set_frame(self, frame: pd.DataFrame):
+        self.frame = frame
+        self.nbytes = int(frame.memory_usage(index=True).sum())
+
+
+class ForecastService:
+    """Serves (start, horizon) forecast windows of time series models with a bounded frame cache.
+
+    Args:
+        lstm_forecaster: ``fn(model, windows, steps)`` returning scaled recursive LSTM forecasts
+            (ModelFactory._forecast_lstm_batch)
+        max_bytes: Total size of cached frames before the least recently used are evicted
+        max_horizon: Largest step a query may reach
+        interval_width: Coverage of ARIMA prediction intervals
+    """
+
+    def __init__(self, lstm_forecaster: Callable[[Any, np.ndarray, int], np.ndarray],
+                 max_bytes: int = 64 * 2**20, max_horizon: int = 10000, interval_width: float = 0.95):
+        self.lstm_forecaster = lstm_forecaster
+        self.max_bytes = max_bytes
+        self.max_horizon = max_horizon
+        self.z = float(norm.ppf(0.5 + interval_width / 2))
+        self._entries = OrderedDict()  # model_id -> _CachedForecast, least recently used first
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.extensions = 0
+        self.computed_steps = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _grid(model_info: Dict) -> Tuple[Optional[pd.Timestamp], Optional[str]]:
+        """(last history date, frequency) of a model, or (None, None) when it has no dates"""
+        if model_info['type'] == 'prophet':
+            model = model_info['model']
+            return model.history_dates.max(), model_info.get('freq') or infer_frequency(model.history_dates)
+        last_date = model_info.get('last_date')
+        return (None, None) if last_date is None else (pd.Timestamp(last_date), model_info['freq'])
+
+    def step_dates(self, model_info: Dict, first: int, last: int) -> Optional[pd.DatetimeIndex]:
+        """Dates of steps ``first..last``, or None for models without dates"""
+        last_date, freq = self._grid(model_info)
+        if last_date is None:
+            return None
+        dates = []
+        if first <= 0:
+            history = pd.DatetimeIndex(model_info['model'].history_dates)
+            dates.append(history[len(history) - 1 + first:len(history) + min(last, 0)])
+        if last >= 1:
+            start = max(first, 1)
+            dates.append(pd.date_range(last_date, periods=last + 1, freq=freq)[start:])
+        return dates[0].append(dates[1:]) if len(dates) > 1 else dates[0]
+
+    def steps_for_dates(self, model_info: Dict, dates) -> np.ndarray:
+        """Steps of the given dates (integers pass through); future dates off the grid round up to the next period"""
+        values = pd.Series(np.asarray(dates).ravel())
+        if pd.api.types.is_integer_dtype(values):
+            return values.to_numpy(dtype=np.int64)
+        last_date, freq = self._grid(model_info)
+        if last_date is None:
+            raise ValueError(f"Model type {model_info['type']} is forecast by step; pass integer steps instead of dates")
+        dates = pd.DatetimeIndex(pd.to_datetime(values))
+        steps = np.empty(len(dates), dtype=np.int64)
+        past = dates <= last_date
+        if past.any():
+            if model_info['type'] != 'prophet':
+                raise ValueError(f"Model type {model_info['type']} only forecasts dates after {last_date}")
+            history = pd.DatetimeIndex(model_info['model'].history_dates)
+            if dates[past].min() < history[0]:
+                raise ValueError(f"Dates before the first history date {history[0]} cannot be forecast")
+            steps[past] = history.searchsorted(dates[past], side='left') - len(history) + 1
+        if (~past).any():
+            furthest = dates[~past].max()
+            grid = pd.date_range(last_date, furthest, freq=freq)
+            if grid[-1] < furthest:
+                grid = pd.date_range(last_date, periods=len(grid) + 1, freq=freq)
+            steps[~past] = grid.searchsorted(dates[~past], side='left')
+        return steps
+
+    def _resolve(self, model_info: Dict, start, horizon: Optional[int]) -> Tuple[int, int]:
+        if start is None:
+            first = 1
+        elif isinstance(start, (int, np.integer)):
+            first = int(start)
+        else:
+            first = int(self.steps_for_dates(model_info, [start])[0])
+        if horizon is None:
+            horizon = model_info.get('forecast_periods') or np.shape(model_info['forecast'])[-1]
+        if horizon < 1:
+            raise ValueError(f"Forecast horizon must be positive, got {horizon}")
+        last = first + int(horizon) - 1
+        if model_info['type'] == 'prophet':
+            earliest = 1 - len(model_info['model'].history_dates)
+            if first < earliest:
+                raise ValueError(f"Forecast starts at step {first}, before the first history date (step {earliest})")
+        elif first < 1:
+            raise ValueError(f"Model type {model_info['type']} only forecasts steps after its history (start >= 1)")
+        if last > self.max_horizon:
+            raise ValueError(f"Forecast reaches step {last}, beyond the maximum of {self.max_horizon}")
+        return first, last
+
+    def _prophet_rows(self, model_info: Dict, first: int, last: int) -> pd.DataFrame:
+        future = pd.DataFrame({'ds': self.step_dates(model_info, first, last)})
+        rows = model_info['model'].predict(future)
+        rows.index = pd.RangeIndex(first, last + 1, name='step')
+        return rows
+
+    def _arima_state(self, model_info: Dict):
+        """Transition matrices and the predicted state/covariance for step 1"""
+        results = model_info['model'].filter_results
+        matrices = {}
+        for name in ('transition', 'design', 'obs_intercept', 'state_intercept', 'selection', 'state_cov', 'obs_cov'):
+            matrix = np.asarray(getattr(results, name))
+            # Out-of-sample recursion needs time-invariant system matrices
+            if matrix.shape[-1] > 1 and np.ptp(matrix, axis=-1).max() > 0:
+                return None
+            matrices[name] = matrix[..., 0]
+        selection = matrices.pop('selection')
+        matrices['state_noise'] = selection @ matrices.pop('state_cov') @ selection.T
+        return matrices, results.predicted_state[:, -1].copy(), results.predicted_state_cov[:, :, -1].copy()
+
+    def _arima_rows(self, model_info: Dict, entry: _CachedForecast, first: int, last: int) -> pd.DataFrame:
+        if entry.state is None:
+            # Time-varying systems: fall back to statsmodels from the start
+            forecast = model_info['model'].get_forecast(steps=last)
+            mean = np.asarray(forecast.predicted_mean)[first - 1:]
+            std = np.sqrt(np.asarray(forecast.var_pred_mean))[first - 1:]
+        else:
+            matrices, state, cov = entry.state
+            T, Z = matrices['transition'], matrices['design']
+            mean, var = np.empty(last - first + 1), np.empty(last - first + 1)
+            for i in range(last - first + 1):
+                mean[i] = (Z @ state + matrices['obs_intercept'])[0]
+                var[i] = (Z @ cov @ Z.T + matrices['obs_cov'])[0, 0]
+                state = T @ state + matrices['state_intercept']
+                cov = T @ cov @ T.T + matrices['state_noise']
+            entry.state = (matrices, state, cov)
+            std = np.sqrt(var)
+        rows = pd.DataFrame({'yhat': mean, 'yhat_lower': mean - self.z * std, 'yhat_upper': mean + self.z * std},
+                            index=pd.RangeIndex(first, last + 1, name='step'))
+        dates = self.step_dates(model_info, first, last)
+        if dates is not None:
+            rows.insert(0, 'ds', dates)
+        return rows
+
+    def _lstm_rows(self, model_info: Dict, entry: _CachedForecast, first: int, last: int) -> pd.DataFrame:
+        windows = entry.state
+        scaled = self.lstm_forecaster(model_info['model'], windows, last - first + 1)
+        entry.state = np.concatenate([windows, scaled], axis=1)[:, -windows.shape[1]:]
+        return self._lstm_frame(model_info, scaled, first)
+
+    def _lstm_frame(self, model_info: Dict, scaled: np.ndarray, first: int) -> pd.DataFrame:
+        values = scaled * model_info['series_scale'][:, None] + model_info['series_min'][:, None]
+        index = pd.RangeIndex(first, first + values.shape[1], name='step')
+        if model_info['series_ids'] is not None:
+            return pd.DataFrame(values.T, index=index, columns=pd.Index(model_info['series_ids']))
+        rows = pd.DataFrame({'yhat': values[0]}, index=index)
+        dates = self.step_dates(model_info, first, first + values.shape[1] - 1)
+        if dates is not None:
+            rows.insert(0, 'ds', dates)
+        return rows
+
+    def _seed(self, model_info: Dict, version: Tuple) -> _CachedForecast:
+        """Cache entry started from the forecast made at training time, where it can be reused"""
+        model_type = model_info['type']
+        if model_type == 'prophet':
+            frame = model_info['forecast'].copy()
+            n_history = len(model_info['model'].history_dates)
+            frame.index = pd.RangeIndex(1 - n_history, len(frame) - n_history + 1, name='step')
+            return _CachedForecast(version, frame)
+        if model_type == 'arima':
+            entry = _CachedForecast(version, pd.DataFrame(index=pd.RangeIndex(1, 1, name='step')))
+            entry.state = self._arima_state(model_info)
+            return entry
+        forecast = np.asarray(model_info['forecast'], dtype=np.float64).reshape(len(model_info['series_min']), -1)
+        scaled = (forecast - model_info['series_min'][:, None]) / model_info['series_scale'][:, None]
+        entry = _CachedForecast(version, self._lstm_frame(model_info, scaled, 1))
+        entry.state = np.concatenate([model_info['last_windows'], scaled], axis=1)[:, -model_info['sequence_length']:]
+        return entry
+
+    def _extend(self, model_info: Dict, entry: _CachedForecast, last: int):
+        """Append steps up to ``last``; the seeded frame already covers every earlier step"""
+        hi = int(entry.frame.index[-1]) if len(entry.frame) else 0
+        if model_info['type'] == 'prophet':
+            rows = self._prophet_rows(model_info, hi + 1, last)
+        elif model_info['type'] == 'arima':
+            rows = self._arima_rows(model_info, entry, hi + 1, last)
+        else:
+            rows = self._lstm_rows(model_info, entry, hi + 1, last)
+        self.extensions += 1
+        self.computed_steps += len(rows)
+        entry.set_frame(pd.concat([entry.frame, rows]) if len(entry.frame) else rows)
+
+    def forecast(self, model_id: str, model_info: Dict, start=None, horizon: Optional[int] = None) -> pd.DataFrame:
+        """Forecast steps ``start .. start + horizon - 1`` of a time series model.
+
+        Args:
+            model_id: Model identifier (the cache key)
+            model_info: ModelFactory entry of a Prophet, ARIMA or LSTM model
+            start: First step (int) or date; defaults to step 1
+            horizon: Number of steps; defaults to the training forecast horizon
+
+        Returns:
+            Frame indexed by step: ``ds`` (for dated models), yhat and, for Prophet/ARIMA,
+            yhat_lower/yhat_upper; Prophet adds its components, LSTM panels have one column per series
+        """
+        if model_info.get('panel'):
+            raise ValueError(f"Panel model {model_id} only keeps its training forecast")
+        if model_info['type'] not in ('prophet', 'arima', 'lstm'):
+            raise ValueError(f"Unsupported time series model type: {model_info['type']}")
+        first, last = self._resolve(model_info, start, horizon)
+        version = (id(model_info['model']), model_info.get('last_trained'))
+
+        with self._lock:
+            entry = self._entries.get(model_id)
+            if entry is None or entry.version != version:
+                entry = self._entries[model_id] = self._seed(model_info, version)
+            self._entries.move_to_end(model_id)
+
+        with entry.lock:
+            if len(entry.frame) and last <= entry.frame.index[-1]:
+                self.hits += 1
+            else:
+                self._extend(model_info, entry, last)
+            window = entry.frame.loc[first:last].copy()
+
+        with self._lock:
+            self._evict()
+        return window
+
+    def _evict(self):
+        """Drop least recently used frames until the cache fits (lock held)"""
+        total = sum(entry.nbytes for entry in self._entries.values())
+        while self._entries and total > self.max_bytes:
+            _, entry = self._entries.popitem(last=False)
+            total -= entry.nbytes
+            self.evictions += 1
+
+    def invalidate(self, model_id: Optional[str] = None):
+        """Forget the cached frame of one model, or of every model"""
+        with self._lock:
+            if model_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(model_id, None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "models": len(self._entries),
+                "bytes": sum(entry.nbytes for entry in self._entries.values()),
+                "max_bytes": self.max_bytes,
+                "cached_steps": {model_id: len(entry.frame) for model_id, entry in self._entries.items()},
+                "hits": self.hits,
+                "extensions": self.extensions,
+                "computed_steps": self.computed_steps,
+                "evictions": self.evictions,
+            }
@@ -0,0 +1,136 @@
+import asyncio
+import bisect
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import pandas as pd
+
+# Upper bounds (ms) of the queueing delay histogram buckets; the last bucket is open-ended
+DELAY_BUCKETS_MS = [0.5, 1, 2, 5, 10, 20, 50, 100, 250]
+
+
+class Histogram:
+    """Fixed-bucket histogram with count/sum/max, cheap enough to update per request"""
+
+    def __init__(self, bounds: List[float]):
+        self.bounds = list(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float, n: int = 1):
+        self.counts[bisect.bisect_left(self.bounds, value)] += n
+        self.count += n
+        self.total += value * n
+        self.max = max(self.max, value)
+
+    def to_dict(self) -> Dict[str, Any]:
+        labels = [f"<={bound:g}" for bound in self.bounds] + [f">{self.bounds[-1]:g}"]
+        return {
+            "buckets": dict(zip(labels, self.counts)),
+            "count": self.count,
+            "mean": self.total / self.count if self.count else 0.0,
+            "max": self.max,
+        }
+
+
+class MicroBatcher:
+    """Coalesces concurrent single-row predictions into one vectorized call.
+
+    Rows are collected until ``max_batch`` rows are waiting or ``window_ms``
+    has passed since the first one arrived, then ``predict_fn`` is awaited
+    once with all of them combined by ``collate`` (a DataFrame of the
+    submitted dicts by default) and each caller gets its own row of the
+    result back.
+    """
+
+    def __init__(self, predict_fn: Callable[[Any], Awaitable[Any]],
+                 window_ms: float = 2.0, max_batch: int = 64,
+                 collate: Callable[[List[Any]], Any] = pd.DataFrame):
+        self.predict_fn = predict_fn
+        self.collate = collate
+        self.window_ms = window_ms
+        self.max_batch = max_batch
+        self._pending = []  # (features, future, enqueued_at)
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks = set()
+        self.batches = 0
+        self.rows = 0
+        self.failures = 0
+        self._reset_histograms()
+
+    def _reset_histograms(self):
+        size_bounds = []
+        size = 1
+        while size < self.max_batch:
+            size_bounds.append(size)
+            size *= 2
+        size_bounds.append(self.max_batch)
+        self.batch_sizes = Histogram(size_bounds)
+        self.queue_delay_ms = Histogram(DELAY_BUCKETS_MS)
+
+    def configure(self, window_ms: Optional[float] = None, max_batch: Optional[int] = None):
+        if window_ms is not None:
+            self.window_ms = window_ms
+        if max_batch is not None and max_batch != self.max_batch:
+            self.max_batch = max_batch
+            self._reset_histograms()
+
+    async def submit(self, features: Any):
+        """Queue one row and wait for its prediction"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((features, future, time.perf_counter()))
+
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window_ms / 1000.0, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending[:self.max_batch], self._pending[self.max_batch:]
+        if self._pending:
+            self._timer = asyncio.get_running_loop().call_later(self.window_ms / 1000.0, self._flush)
+        if batch:
+            task = asyncio.ensure_future(self._run_batch(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run_batch(self, batch):
+        now = time.perf_counter()
+        for _, _, enqueued_at in batch:
+            self.queue_delay_ms.observe((now - enqueued_at) * 1000.0)
+        self.batch_sizes.observe(len(batch))
+        self.batches += 1
+        self.rows += len(batch)
+
+        try:
+            predictions = await self.predict_fn(self.collate([features for features, _, _ in batch]))
+        except Exception as e:
+            self.failures += 1
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future, _), prediction in zip(batch, predictions):
+            if not future.done():
+                future.set_result(prediction)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "window_ms": self.window_ms,
+            "max_batch": self.max_batch,
+            "pending": len(self._pending),
+            "batches": self.batches,
+            "rows": self.rows,
+            "mean_batch_size": self.rows / self.batches if self.batches else 0.0,
+            "failures": self.failures,
+            "batch_size_histogram": self.batch_sizes.to_dict(),
+            "queue_delay_ms_histogram": self.queue_delay_ms.to_dict(),
+        }
@@ -0,0 +1,429 @@
+import glob
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+import joblib
+
+from artifact_bundle import ArtifactBundle, MANIFEST, artifact_fingerprint, is_bundle, promote_bundle, remove_released
+
+logger = logging.getLogger(__name__)
+
+# Per-model staging directory for a new version that has not been validated yet
+CANDIDATE_DIR = "candidate"
+
+
+class ModelNotFoundError(KeyError):
+    """Raised when a model id has no artifacts on disk"""
+
+
+class ModelSlot:
+    """One loaded version of a model.
+
+    Requests take a reference with ``ModelRegistry.acquire`` and give it back
+    with ``release``. When a newer version is swapped in, the old slot is
+    retired and its model is dropped once the last in-flight request on it
+    finishes.
+    """
+
+    def __init__(self, model_id: str, version: str, model, info: Dict[str, Any],
+                 bundle: Optional[ArtifactBundle] = None, artifact: Optional[Tuple[str, Tuple[int, int, int]]] = None):
+        self.model_id = model_id
+        self.version = version
+        self.model = model
+        self.info = info
+        self.bundle = bundle  # other components of a bundled artifact, loaded on first use
+        self.artifact = artifact  # (path, artifact_fingerprint) the model was loaded from
+        self.refcount = 0
+        self.retired = False
+        self.loaded_at = time.time()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "version": self.version,
+            "refcount": self.refcount,
+            "retired": self.retired,
+            "loaded_at": self.loaded_at,
+        }
+
+
+class ModelRegistry:
+    """Catalog of models on disk plus an LRU-bounded set of loaded model versions.
+
+    ``scan`` reads every ``<models_dir>/*/info.json`` so metadata is known
+    without loading artifacts. ``get``/``acquire`` load a model on first use;
+    concurrent callers asking for the same id wait for a single load instead
+    of each unpickling it. Artifacts are loaded with ``mmap_mode='r'`` by
+    default, so the numpy arrays inside uncompressed joblib dumps (e.g. tree
+    node arrays) are memory-mapped and shared between forked workers.
+
+    A ``bundle/`` directory written by ``artifact_bundle`` takes precedence
+    over ``model.joblib``: only its model component is read at load time, and
+    the rest (e.g. the explainer background) stays on ``slot.bundle`` until
+    asked for. A bundle version's files therefore stay on disk until its last
+    slot is dropped.
+
+    ``hot_swap`` loads, validates and warms a new version off to the side and
+    then replaces the active slot in one step; requests already holding the
+    old slot finish on it. With ``candidate=True`` the new version is read
+    from the model's ``candidate/`` staging directory and only moved over the
+    live artifact and info.json once it passed validation, so a rejected
+    version never becomes the artifact on disk.
+    """
+
+    def __init__(self, models_dir: str = "models", max_resident: int = 0, mmap: bool = True,
+                 on_evict: Optional[Callable[[str], None]] = None,
+                 on_release: Optional[Callable[[ModelSlot], None]] = None):
+        self.models_dir = models_dir
+        self.max_resident = max_resident
+        self.mmap = mmap
+        self.on_evict = on_evict
+        self.on_release = on_release
+        self.catalog: Dict[str, Dict[str, Any]] = {}
+        self._resident = OrderedDict()  # model_id -> active ModelSlot
+        self._retired = {}  # (model_id, version) -> ModelSlot still in use
+        self._load_locks = {}
+        self._lock = threading.Lock()
+        self._versions = {}  # model_id -> versions handed out to slots so far
+        self.loads = 0
+        self.swaps = 0
+        self.evictions = 0
+        self.load_seconds = {}
+
+    def model_dir(self, model_id: str) -> str:
+        return os.path.join(self.models_dir, model_id)
+
+    def model_path(self, model_id: str) -> str:
+        return os.path.join(self.model_dir(model_id), "model.joblib")
+
+    def bundle_path(self, model_id: str) -> str:
+        return os.path.join(self.model_dir(model_id), "bundle")
+
+    def candidate_dir(self, model_id: str) -> str:
+        return os.path.join(self.model_dir(model_id), CANDIDATE_DIR)
+
+    def artifact_path(self, model_id: str, model_dir: Optional[str] = None) -> str:
+        """The bundle directory when the model has one, else model.joblib (in ``model_dir`` if given)"""
+        model_dir = model_dir or self.model_dir(model_id)
+        bundle_path = os.path.join(model_dir, "bundle")
+        return bundle_path if is_bundle(bundle_path) else os.path.join(model_dir, "model.joblib")
+
+    def scan(self) -> List[str]:
+        """Read metadata for every model directory; returns the ids found"""
+        found = []
+        for info_path in sorted(glob.glob(os.path.join(self.models_dir, "*", "info.json"))):
+            model_id = os.path.basename(os.path.dirname(info_path))
+            try:
+                info = self._read_info(info_path)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Skipping model {model_id}: unreadable info.json ({e})")
+                continue
+            # Loaded models keep describing the version that is actually serving
+            if model_id not in self._resident:
+                self.catalog[model_id] = info
+            found.append(model_id)
+        return found
+
+    @staticmethod
+    def _read_info(path: str) -> Dict[str, Any]:
+        with open(path, "r") as f:
+            return json.load(f)
+
+    def _read_model_info(self, model_id: str, model_dir: Optional[str] = None) -> Dict[str, Any]:
+        try:
+            return self._read_info(os.path.join(model_dir or self.model_dir(model_id), "info.json"))
+        except OSError as e:
+            raise ModelNotFoundError(f"Model {model_id} not found: {e}")
+
+    def info(self, model_id: str) -> Dict[str, Any]:
+        """Metadata for a model, reading info.json if it was not scanned yet"""
+        if model_id not in self.catalog:
+            self.catalog[model_id] = self._read_model_info(model_id)
+        return self.catalog[model_id]
+
+    def is_resident(self, model_id: str) -> bool:
+        return model_id in self._resident
+
+    def get_resident_slot(self, model_id: str) -> Optional[ModelSlot]:
+        """Return the active slot without loading, or None"""
+        with self._lock:
+            slot = self._resident.get(model_id)
+            if slot is not None:
+                self._resident.move_to_end(model_id)
+            return slot
+
+    def get_resident(self, model_id: str):
+        """Return the active model without loading it, or None"""
+        slot = self.get_resident_slot(model_id)
+        return slot.model if slot is not None else None
+
+    def _lock_for(self, model_id: str) -> threading.Lock:
+        with self._lock:
+            return self._load_locks.setdefault(model_id, threading.Lock())
+
+    def load_slot(self, model_id: str, model_dir: Optional[str] = None) -> ModelSlot:
+        """Load the current artifact (from ``model_dir`` if given) into a new, not yet active slot"""
+        path = self.artifact_path(model_id, model_dir)
+        if not os.path.exists(path):
+            raise ModelNotFoundError(f"Model {model_id} not found: {path} does not exist")
+        info = self._read_model_info(model_id, model_dir)
+        # Taken before loading: if the file is replaced meanwhile, the slot looks stale rather than current
+        artifact = (path, artifact_fingerprint(path))
+        start = time.perf_counter()
+        bundle = None
+        if os.path.isdir(path):
+            bundle = ArtifactBundle(path, mmap=self.mmap)
+            model = bundle["model"]
+            path = os.path.join(path, MANIFEST)
+        else:
+            model = joblib.load(path, mmap_mode="r" if self.mmap else None)
+        self.load_seconds[model_id] = time.perf_counter() - start
+        version = self._unique_version(model_id, str(info.get("version") or int(os.path.getmtime(path))))
+        return ModelSlot(model_id, version, model, info, bundle, artifact)
+
+    def _unique_version(self, model_id: str, version: str) -> str:
+        """Count a load and name its version; reloading a version already handed out gets a load suffix.
+
+        Per-version state (explainers, compiled predictors, caches) is keyed by
+        (model_id, version), so two loads must never share one, even when
+        info.json keeps its version or the artifact's mtime has not changed.
+        """
+        with self._lock:
+            self.loads += 1
+            seen = self._versions.setdefault(model_id, set())
+            if version in seen:
+                version = f"{version}.{self.loads}"
+            seen.add(version)
+            return version
+
+    def is_current_artifact(self, slot: ModelSlot) -> bool:
+        """Whether the artifact on disk is still the one the slot was loaded from (so workers may load it by path)"""
+        if slot.artifact is None:
+            return False
+        path, fingerprint = slot.artifact
+        try:
+            return artifact_fingerprint(path) == fingerprint
+        except OSError:
+            return False
+
+    def get_slot(self, model_id: str) -> ModelSlot:
+        """Return the active slot, loading it at most once even under concurrent calls"""
+        slot = self.get_resident_slot(model_id)
+        if slot is not None:
+            return slot
+
+        with self._lock_for(model_id):
+            # Whoever held the lock before us may have loaded it already
+            slot = self.get_resident_slot(model_id)
+            if slot is not None:
+                return slot
+            slot = self.load_slot(model_id)
+            self._install(slot)
+            return slot
+
+    def get(self, model_id: str):
+        """Return the active model, loading it if needed"""
+        return self.get_slot(model_id).model
+
+    def try_acquire(self, model_id: str) -> Optional[ModelSlot]:
+        """Take a reference on the active version if it is loaded, without loading it (None otherwise)"""
+        with self._lock:
+            slot = self._resident.get(model_id)
+            if slot is None or slot.retired:
+                return None
+            self._resident.move_to_end(model_id)
+            slot.refcount += 1
+            return slot
+
+    def acquire(self, model_id: str) -> ModelSlot:
+        """Take a reference on the active version; pair with release()"""
+        while True:
+            slot = self.get_slot(model_id)
+            with self._lock:
+                # The slot may have been swapped out or evicted since we looked it up
+                if not slot.retired:
+                    slot.refcount += 1
+                    return slot
+
+    def release(self, slot: ModelSlot):
+        with self._lock:
+            slot.refcount -= 1
+            drop = slot.retired and slot.refcount <= 0
+            if drop:
+                self._retired.pop((slot.model_id, slot.version), None)
+        if drop:
+            self._drop(slot)
+
+    @contextmanager
+    def lease(self, model_id: str):
+        slot = self.acquire(model_id)
+        try:
+            yield slot
+        finally:
+            self.release(slot)
+
+    def _drop(self, slot: ModelSlot):
+        logger.info(f"Released model {slot.model_id} version {slot.version}")
+        if self.on_release is not None:
+            self.on_release(slot)
+        slot.model = None
+        if slot.bundle is not None and slot.bundle.directory == self.bundle_path(slot.model_id):
+            # Components this version never loaded are no longer needed by anyone
+            remove_released(slot.bundle.directory, slot.bundle.files(), keep=self._bundle_files_in_use(slot.model_id))
+
+    def _bundle_files_in_use(self, model_id: str) -> Set[str]:
+        """Bundle files of the model's active and retired slots, which may still load components from them"""
+        with self._lock:
+            slots = [self._resident.get(model_id)] + [s for key, s in self._retired.items() if key[0] == model_id]
+        directory = self.bundle_path(model_id)
+        return set().union(*(slot.bundle.files() for slot in slots
+                             if slot is not None and slot.bundle is not None and slot.bundle.directory == directory))
+
+    def _retire(self, slot: ModelSlot) -> bool:
+        """Mark a slot as replaced; returns True if it can be dropped right away (lock held)"""
+        slot.retired = True
+        if slot.refcount > 0:
+            self._retired[(slot.model_id, slot.version)] = slot
+            return False
+        return True
+
+    def _install(self, slot: ModelSlot):
+        """Make a slot the active version, retiring the previous one and enforcing the LRU cap"""
+        to_drop, evicted = [], []
+        with self._lock:
+            previous = self._resident.get(slot.model_id)
+            self._resident[slot.model_id] = slot
+            self._resident.move_to_end(slot.model_id)
+            self.catalog[slot.model_id] = slot.info
+            if previous is not None and previous is not slot:
+                self.swaps += 1
+                if self._retire(previous):
+                    to_drop.append(previous)
+            while self.max_resident and len(self._resident) > self.max_resident:
+                oldest_id, oldest = self._resident.popitem(last=False)
+                evicted.append(oldest_id)
+                self.evictions += 1
+                if self._retire(oldest):
+                    to_drop.append(oldest)
+        for old in to_drop:
+            self._drop(old)
+        for model_id in evicted:
+            logger.info(f"Evicted model {model_id} from memory")
+            if self.on_evict is not None:
+                self.on_evict(model_id)
+
+    def hot_swap(self, model_id: str, validate: Optional[Callable[[ModelSlot], None]] = None,
+                 warm: Optional[Callable[[ModelSlot], None]] = None, candidate: bool = False) -> ModelSlot:
+        """Load the artifact on disk as a new version and switch to it atomically.
+
+        ``validate`` should raise if the new version must not serve traffic;
+        ``warm`` runs before the switch (e.g. a first prediction or building
+        explainers). Until the switch the current version keeps serving.
+        With ``candidate`` the staged version is loaded and promoted after
+        validation; it is discarded if loading, validation or warming fails.
+        A version that fails is released like a replaced one (``on_release``),
+        so state ``warm`` built for it is dropped.
+        """
+        with self._lock_for(model_id):
+            slot = None
+            try:
+                slot = self.load_slot(model_id, self.candidate_dir(model_id) if candidate else None)
+                if validate is not None:
+                    validate(slot)
+                if warm is not None:
+                    warm(slot)
+                if candidate:
+                    self._promote(slot)
+            except BaseException:
+                if slot is not None:
+                    self._drop(slot)
+                if candidate:
+                    self.discard_candidate(model_id)
+                raise
+            self._install(slot)
+            logger.info(f"Model {model_id} now serving version {slot.version}")
+            return slot
+
+    def _promote(self, slot: ModelSlot):
+        """Move a validated candidate over the live artifact, then its info.json (each step an atomic rename)"""
+        model_id = slot.model_id
+        source = self.candidate_dir(model_id)
+        if slot.bundle is not None:
+            promote_bundle(slot.bundle.directory, self.bundle_path(model_id), keep=self._bundle_files_in_use(model_id))
+            # Components not loaded yet are read from their new location
+            slot.bundle.directory = self.bundle_path(model_id)
+        else:
+            os.replace(os.path.join(source, "model.joblib"), self.model_path(model_id))
+        os.replace(os.path.join(source, "info.json"), os.path.join(self.model_dir(model_id), "info.json"))
+        # Renames keep the fingerprint; only the path changes
+        slot.artifact = (self.artifact_path(model_id), slot.artifact[1])
+        self.discard_candidate(model_id)
+        logger.info(f"Promoted model {model_id} version {slot.version}")
+
+    def discard_candidate(self, model_id: str):
+        """Remove a staged version that will not be promoted"""
+        shutil.rmtree(self.candidate_dir(model_id), ignore_errors=True)
+
+    def reload(self, model_id: str):
+        """Hot-swap to the artifact on disk without validation"""
+        return self.hot_swap(model_id).model
+
+    def evict(self, model_id: str) -> bool:
+        with self._lock:
+            slot = self._resident.pop(model_id, None)
+            drop = slot is not None and self._retire(slot)
+        if drop:
+            self._drop(slot)
+        if slot is not None and self.on_evict is not None:
+            self.on_evict(model_id)
+        return slot is not None
+
+    def preload(self, model_ids: Iterable[str], max_workers: int = 4) -> Dict[str, Optional[str]]:
+        """Load several models in parallel; returns model_id -> error message (None on success)"""
+        model_ids = list(model_ids)
+        results = {}
+
+        def load(model_id):
+            try:
+                self.get_slot(model_id)
+                return None
+            except Exception as e:
+                logger.error(f"Failed to preload model {model_id}: {e}")
+                return str(e)
+
+        if model_ids:
+            with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(model_ids)))) as executor:
+                for model_id, error in zip(model_ids, executor.map(load, model_ids)):
+                    results[model_id] = error
+        return results
+
+    def versions(self, model_id: str) -> Dict[str, Any]:
+        """Active version plus retired versions still finishing requests"""
+        with self._lock:
+            active = self._resident.get(model_id)
+            return {
+                "active": active.to_dict() if active is not None else None,
+                "draining": [slot.to_dict() for (mid, _), slot in self._retired.items() if mid == model_id],
+            }
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            resident = {model_id: slot.version for model_id, slot in self._resident.items()}
+            draining = [f"{mid}@{version}" for mid, version in self._retired]
+        return {
+            "catalog_size": len(self.catalog),
+            "resident": resident,
+            "draining": draining,
+            "max_resident": self.max_resident,
+            "loads": self.loads,
+            "swaps": self.swaps,
+            "evictions": self.evictions,
+            "load_seconds": dict(self.load_seconds),
+        }
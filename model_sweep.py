@@ -0,0 +1,235 @@
+"""Parallel hyperparameter and model-type sweeps with successive halving.
+
+Candidates are (model_type, config) pairs expanded from a search space by
+grid or seeded random search. Each candidate is scored fold by fold in a
+process pool; after every rung only the best 1/eta of the survivors go on
+to be scored on more folds, so losing candidates stop early instead of
+costing a full cross-validation.
+"""
+import itertools
+import math
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
+from sklearn.linear_model import LinearRegression, LogisticRegression
+from sklearn.metrics import get_scorer
+from sklearn.model_selection import KFold, StratifiedKFold
+from xgboost import XGBClassifier, XGBRegressor
+
+ESTIMATORS = {
+    "classification": {
+        "xgboost": XGBClassifier,
+        "random_forest": RandomForestClassifier,
+        "logistic": LogisticRegression,
+    },
+    "regression": {
+        "xgboost": XGBRegressor,
+        "random_forest": RandomForestRegressor,
+        "linear": LinearRegression,
+    },
+}
+
+DEFAULT_SCORING = {"classification": "accuracy", "regression": "r2"}
+
+# Set in each worker by _init_worker so the data is sent once per process, not once per task
+_X = None
+_y = None
+
+
+def _init_worker(X, y):
+    global _X, _y
+    _X, _y = X, y
+
+
+def seeded_config(task: str, model_type: str, config: Dict[str, Any], seed: Optional[int] = None,
+                  n_jobs: Optional[int] = None) -> Dict[str, Any]:
+    """Fill in random_state/n_jobs when the estimator accepts them and config does not set them"""
+    try:
+        cls = ESTIMATORS[task][model_type]
+    except KeyError:
+        raise ValueError(f"Unsupported {task} model type: {model_type}")
+    params = dict(config)
+    accepted = cls().get_params()
+    if seed is not None and "random_state" in accepted:
+        params.setdefault("random_state", seed)
+    if n_jobs is not None and "n_jobs" in accepted:
+        params.setdefault("n_jobs", n_jobs)
+    return params
+
+
+def build_estimator(task: str, model_type: str, config: Dict[str, Any], seed: Optional[int] = None,
+                    n_jobs: Optional[int] = None):
+    return ESTIMATORS[task][model_type](**seeded_config(task, model_type, config, seed, n_jobs))
+
+
+def _sample(values, rng):
+    if hasattr(values, "rvs"):  # scipy.stats distribution
+        value = values.rvs(random_state=rng)
+        return value.item() if hasattr(value, "item") else value
+    return values[rng.integers(len(values))]
+
+
+def expand_search_space(search_space: Dict[str, Dict[str, Any]], search: str = "grid",
+                        n_iter: int = 20, seed: int = 0) -> List[Dict[str, Any]]:
+    """Turn {model_type: {param: values}} into a list of candidates.
+
+    Grid search takes the full cartesian product per model type. Random search
+    draws ``n_iter`` distinct candidates, picking the model type uniformly and
+    each parameter from its list (or scipy distribution) with a seeded RNG.
+    """
+    if search == "grid":
+        candidates = []
+        for model_type, grid in search_space.items():
+            grid = grid or {}
+            names = sorted(grid)
+            for values in itertools.product(*(grid[name] for name in names)):
+                candidates.append({"model_type": model_type, "config": dict(zip(names, values))})
+        return candidates
+
+    if search != "random":
+        raise ValueError(f"Unsupported search strategy: {search}")
+    rng = np.random.default_rng(seed)
+    model_types = sorted(search_space)
+    candidates, seen = [], set()
+    # Bounded number of draws so small spaces cannot loop forever on duplicates
+    for _ in range(n_iter * 20):
+        if len(candidates) >= n_iter:
+            break
+        model_type = model_types[rng.integers(len(model_types))]
+        grid = search_space[model_type] or {}
+        config = {name: _sample(grid[name], rng) for name in sorted(grid)}
+        key = (model_type, repr(sorted(config.items())))
+        if key not in seen:
+            seen.add(key)
+            candidates.append({"model_type": model_type, "config": config})
+    return candidates
+
+
+def _score_fold(task, model_type, config, seed, scoring, train_idx, test_idx):
+    """Fit one candidate on one fold (runs in a worker process)"""
+    estimator = build_estimator(task, model_type, config, seed=seed, n_jobs=1)
+    start = time.perf_counter()
+    estimator.fit(_X[train_idx], _y[train_idx])
+    fit_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    score = get_scorer(scoring)(estimator, _X[test_idx], _y[test_idx])
+    return float(score), fit_seconds, time.perf_counter() - start
+
+
+def run_sweep(task: str, X: pd.DataFrame, y: pd.Series, candidates: List[Dict[str, Any]],
+              cv: int = 5, scoring: Optional[str] = None, eta: int = 3, min_folds: int = 1,
+              max_workers: Optional[int] = None, seed: int = 0,
+              start_method: str = "spawn") -> Dict[str, Any]:
+    """Score candidates with cross-validation and successive halving.
+
+    Args:
+        task: 'classification' or 'regression'
+        X: Feature DataFrame
+        y: Target variable Series
+        candidates: Output of ``expand_search_space``
+        cv: Number of folds
+        scoring: sklearn scorer name (higher is better); defaults per task
+        eta: Keep the best 1/eta of the survivors after each rung
+        min_folds: Folds scored by every candidate in the first rung
+        max_workers: Process pool size (defaults to the number of CPUs)
+        seed: Seed for fold shuffling and estimator random_state
+
+    Returns:
+        Report with the best candidate, every candidate's fold scores and timings, and the rungs
+    """
+    if not candidates:
+        raise ValueError("Sweep needs at least one candidate")
+    scoring = scoring or DEFAULT_SCORING[task]
+    X_values = X.to_numpy()
+    y_values = np.asarray(y)
+    splitter = (StratifiedKFold if task == "classification" else KFold)(n_splits=cv, shuffle=True, random_state=seed)
+    folds = list(splitter.split(X_values, y_values))
+
+    results = []
+    for i, candidate in enumerate(candidates):
+        results.append({
+            "candidate": i,
+            "model_type": candidate["model_type"],
+            "config": candidate["config"],
+            "fold_scores": [],
+            "fit_seconds": 0.0,
+            "score_seconds": 0.0,
+            "status": "running",
+            "error": None,
+        })
+
+    survivors = list(range(len(candidates)))
+    rungs = []
+    folds_done = 0
+    budget = max(1, min(min_folds, cv))
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=max_workers,
+                             mp_context=multiprocessing.get_context(start_method),
+                             initializer=_init_worker, initargs=(X_values, y_values)) as executor:
+        while survivors:
+            futures = {}
+            for i in survivors:
+                for fold in range(folds_done, budget):
+                    train_idx, test_idx = folds[fold]
+                    futures[(i, fold)] = executor.submit(
+                        _score_fold, task, candidates[i]["model_type"], candidates[i]["config"],
+                        seed, scoring, train_idx, test_idx,
+                    )
+            for (i, fold), future in futures.items():
+                result = results[i]
+                if result["status"] == "failed":
+                    continue
+                try:
+                    score, fit_seconds, score_seconds = future.result()
+                except Exception as e:
+                    result["status"], result["error"] = "failed", str(e)
+                    continue
+                result["fold_scores"].append(score)
+                result["fit_seconds"] += fit_seconds
+                result["score_seconds"] += score_seconds
+            folds_done = budget
+
+            # Rank by mean score so far; ties go to the earlier candidate for determinism
+            survivors = [i for i in survivors if results[i]["status"] != "failed"]
+            survivors.sort(key=lambda i: (-np.mean(results[i]["fold_scores"]), i))
+            if folds_done >= cv or len(survivors) <= 1:
+                rungs.append({"folds": folds_done, "candidates": len(survivors), "kept": len(survivors)})
+                break
+            keep = max(1, math.ceil(len(survivors) / eta))
+            rungs.append({"folds": folds_done, "candidates": len(survivors), "kept": keep})
+            for i in survivors[keep:]:
+                results[i]["status"] = "stopped"
+                results[i]["stopped_after_folds"] = folds_done
+            survivors = survivors[:keep]
+            budget = min(cv, budget * eta)
+
+    for i in survivors:
+        results[i]["status"] = "completed"
+    for result in results:
+        scores = result["fold_scores"]
+        result["mean_score"] = float(np.mean(scores)) if scores else None
+        result["std_score"] = float(np.std(scores)) if scores else None
+        result["folds_evaluated"] = len(scores)
+
+    if not survivors:
+        raise ValueError("Every sweep candidate failed: " + "; ".join(
+            f"{r['model_type']} {r['config']}: {r['error']}" for r in results))
+    best = results[survivors[0]]
+    best["status"] = "winner"
+    return {
+        "task": task,
+        "scoring": scoring,
+        "cv": cv,
+        "eta": eta,
+        "seed": seed,
+        "best": {k: best[k] for k in ("candidate", "model_type", "config", "mean_score", "std_score")},
+        "candidates": results,
+        "rungs": rungs,
+        "total_fit_seconds": float(sum(r["fit_seconds"] for r in results)),
+        "wall_seconds": time.perf_counter() - start,
+    }
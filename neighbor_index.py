@@ -0,0 +1,136 @@
+"""Nearest-neighbour reuse of explanations over normalized feature vectors.
+
+NeighborIndex keeps up to ``max_size`` explained points in a ring buffer
+(the oldest is evicted first) and answers "is there an explained point
+within ``radius`` of this row?" with a scipy cKDTree. The tree is static, so
+points added since the last build are kept in a small pending list that is
+searched by brute force, and the tree is rebuilt once that list reaches
+``rebuild_threshold``. Slots overwritten since the build are filtered out
+of tree results by an insertion stamp.
+
+Distances are root-mean-square differences of standardized features, so a
+radius of 0.1 means rows differ by about a tenth of a standard deviation
+per feature.
+"""
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+
+class NeighborIndex:
+    """Bounded KD-tree index from feature rows to cached payloads (e.g. explanations)
+
+    Args:
+        center: Per-feature values subtracted before scaling (e.g. the background mean)
+        scale: Per-feature scale (e.g. the background standard deviation)
+        radius: Default maximum distance for a reuse hit
+        max_size: Points kept before the oldest are evicted
+        rebuild_threshold: Pending points that trigger a tree rebuild
+        k: Tree candidates examined per query, so evicted slots can be skipped
+    """
+
+    def __init__(self, center: np.ndarray, scale: np.ndarray, radius: float = 0.1, max_size: int = 10000,
+                 rebuild_threshold: int = 256, k: int = 8):
+        self.center = np.asarray(center, dtype=np.float64)
+        scale = np.asarray(scale, dtype=np.float64)
+        self.scale = np.where(scale > 0, scale, 1.0) * np.sqrt(len(self.center))
+        self.radius = radius
+        self.max_size = max_size
+        self.rebuild_threshold = rebuild_threshold
+        self.k = k
+
+        self._points = np.zeros((max_size, len(self.center)), dtype=np.float64)
+        self._payloads = [None] * max_size
+        self._stamps = np.full(max_size, -1, dtype=np.int64)  # insertion number per slot, -1 = empty
+        self._next = 0  # total insertions; slot = insertion % max_size
+        self._tree = None
+        self._tree_slots = np.empty(0, dtype=np.intp)
+        self._tree_stamps = np.empty(0, dtype=np.int64)
+        self._pending = []  # slots added since the tree was built
+        self._lock = threading.Lock()
+
+        self.queries = 0
+        self.hits = 0
+        self.rebuilds = 0
+
+    def __len__(self) -> int:
+        return min(self._next, self.max_size)
+
+    def normalize(self, row) -> np.ndarray:
+        """Standardized copy of a row; missing or non-numeric values map to the center"""
+        values = (np.asarray(row, dtype=np.float64) - self.center) / self.scale
+        return np.nan_to_num(values, nan=0.0, posinf=0.0, neginf=0.0)
+
+    def add(self, row, payload: Any):
+        with self._lock:
+            slot = self._next % self.max_size
+            self._points[slot] = self.normalize(row)
+            self._payloads[slot] = payload
+            self._stamps[slot] = self._next
+            self._next += 1
+            self._pending.append(slot)
+            if len(self._pending) >= self.rebuild_threshold:
+                self._rebuild()
+
+    def _rebuild(self):
+        """Rebuild the tree over every live slot (lock held)"""
+        slots = np.flatnonzero(self._stamps >= 0)
+        self._tree = cKDTree(self._points[slots]) if len(slots) else None
+        self._tree_slots = slots
+        self._tree_stamps = self._stamps[slots].copy()
+        self._pending = []
+        self.rebuilds += 1
+
+    def nearest(self, row, radius: Optional[float] = None) -> Tuple[Any, Optional[float]]:
+        """(payload, distance) of the closest point within ``radius``, or (None, None).
+
+        ``radius`` defaults to the index's; pass ``float('inf')`` for the closest point at any distance.
+        """
+        radius = self.radius if radius is None else radius
+        point = self.normalize(row)
+        best_slot, best_distance = None, np.inf
+        with self._lock:
+            self.queries += 1
+            if self._tree is not None:
+                k = min(self.k, len(self._tree_slots))
+                distances, positions = self._tree.query(point, k=k, distance_upper_bound=radius)
+                for distance, position in zip(np.atleast_1d(distances), np.atleast_1d(positions)):
+                    if not np.isfinite(distance):
+                        break
+                    slot = self._tree_slots[position]
+                    # Skip slots overwritten by newer points since the tree was built
+                    if self._stamps[slot] == self._tree_stamps[position]:
+                        best_slot, best_distance = slot, distance
+                        break
+            if self._pending:
+                pending = np.asarray(self._pending)
+                distances = np.linalg.norm(self._points[pending] - point, axis=1)
+                i = int(distances.argmin())
+                if distances[i] < best_distance and distances[i] <= radius:
+                    best_slot, best_distance = pending[i], distances[i]
+            if best_slot is None:
+                return None, None
+            self.hits += 1
+            return self._payloads[best_slot], float(best_distance)
+
+    def clear(self):
+        with self._lock:
+            self._stamps[:] = -1
+            self._payloads = [None] * self.max_size
+            self._next = 0
+            self._tree = None
+            self._pending = []
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "size": len(self),
+            "max_size": self.max_size,
+            "radius": self.radius,
+            "queries": self.queries,
+            "hits": self.hits,
+            "reuse_rate": self.hits / self.queries if self.queries else 0.0,
+            "evictions": max(0, self._next - self.max_size),
+            "rebuilds": self.rebuilds,
+        }
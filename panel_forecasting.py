@@ -0,0 +1,172 @@
+"""Fit Prophet or ARIMA per series for large panels across a process pool.
+
+The long-format input is split by series id once, series are grouped into
+chunks (one task per chunk keeps scheduling and pickling overhead low with
+tens of thousands of series), and every worker returns plain arrays. The
+result is a single float32 frame indexed by (series_id, ds), plus a dict of
+series that failed to fit; a failing series never aborts the run.
+"""
+import logging
+import multiprocessing
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+PANEL_MODEL_TYPES = ("prophet", "arima")
+FORECAST_COLUMNS = ["yhat", "yhat_lower", "yhat_upper"]
+
+
+def _future_dates(dates: pd.DatetimeIndex, periods: int, freq: Optional[str]) -> pd.DatetimeIndex:
+    if freq is None:
+        freq = pd.infer_freq(dates) if len(dates) >= 3 else None
+    if freq is not None:
+        return pd.date_range(dates[-1], periods=periods + 1, freq=freq)[1:]
+    # Irregular series: continue with the last observed spacing
+    step = dates[-1] - dates[-2] if len(dates) > 1 else pd.Timedelta(days=1)
+    return pd.DatetimeIndex([dates[-1] + step * (i + 1) for i in range(periods)])
+
+
+def _fit_prophet(dates, values, periods, config, freq):
+    from cmdstanpy.utils import get_logger
+    from prophet import Prophet
+
+    # cmdstanpy logs every chain at INFO, which floods worker output with thousands of series
+    get_logger().setLevel(logging.WARNING)
+    model = Prophet(**config)
+    model.fit(pd.DataFrame({"ds": dates, "y": values}))
+    future = pd.DataFrame({"ds": _future_dates(dates, periods, freq)})
+    forecast = model.predict(future)
+    return future["ds"].values, forecast[FORECAST_COLUMNS].to_numpy()
+
+
+def _fit_arima(dates, values, periods, config, freq):
+    from statsmodels.tsa.arima.model import ARIMA
+
+    order = tuple(config.get("order", (5, 1, 0)))
+    seasonal_order = tuple(config.get("seasonal_order", (0, 0, 0, 0)))
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        fitted = ARIMA(np.asarray(values, dtype=np.float64), order=order, seasonal_order=seasonal_order).fit()
+        forecast = fitted.get_forecast(steps=periods)
+    interval = np.asarray(forecast.conf_int(alpha=config.get("alpha", 0.2)))
+    yhat = np.asarray(forecast.predicted_mean)
+    return _future_dates(dates, periods, freq).values, np.column_stack([yhat, interval[:, 0], interval[:, 1]])
+
+
+_FITTERS = {"prophet": _fit_prophet, "arima": _fit_arima}
+
+
+def fit_series_chunk(model_type: str, chunk: List[Tuple[Any, np.ndarray, np.ndarray]],
+                     periods: int, config: Dict[str, Any], freq: Optional[str] = None):
+    """Fit and forecast every series in a chunk (runs in a worker process).
+
+    Returns:
+        (series ids, future dates, forecast values, failures) where the arrays
+        hold ``periods`` rows per successful series, in chunk order
+    """
+    fit = _FITTERS[model_type]
+    ids, dates_out, values_out, failures = [], [], [], {}
+    for series_id, dates, values in chunk:
+        try:
+            future, forecast = fit(pd.DatetimeIndex(dates), values, periods, config, freq)
+        except Exception as e:
+            failures[series_id] = f"{type(e).__name__}: {e}"
+            continue
+        ids.extend([series_id] * periods)
+        dates_out.append(future)
+        values_out.append(np.asarray(forecast, dtype=np.float32))
+    if not values_out:
+        return ids, np.empty(0, dtype="datetime64[ns]"), np.empty((0, 3), dtype=np.float32), failures
+    return ids, np.concatenate(dates_out), np.vstack(values_out), failures
+
+
+def forecast_panel(data: pd.DataFrame, series_col: str, date_col: str, target_col: str,
+                   model_type: str = "prophet", forecast_periods: int = 12,
+                   config: Optional[Dict[str, Any]] = None, chunk_size: int = 50,
+                   max_workers: Optional[int] = None, min_observations: int = 3,
+                   freq: Optional[str] = None, start_method: str = "spawn") -> Dict[str, Any]:
+    """Fit one model per series and forecast them all.
+
+    Args:
+        data: Long-format DataFrame with one row per (series, date)
+        series_col: Column identifying the series
+        date_col: Column of dates
+        target_col: Column to forecast
+        model_type: 'prophet' or 'arima'
+        forecast_periods: Number of periods to forecast per series
+        config: Model parameters, shared by every series
+        chunk_size: Series per worker task
+        max_workers: Process pool size (defaults to the number of CPUs)
+        min_observations: Series with fewer rows are reported as failed without fitting
+        freq: Pandas frequency of the future dates (inferred per series if omitted)
+
+    Returns:
+        Dictionary with the forecast frame (indexed by series id and ds), failures and run stats
+    """
+    if model_type not in PANEL_MODEL_TYPES:
+        raise ValueError(f"Unsupported panel model type: {model_type}")
+    config = dict(config or {})
+    start = time.perf_counter()
+
+    frame = data[[series_col, date_col, target_col]].copy()
+    frame[date_col] = pd.to_datetime(frame[date_col])
+    frame = frame.sort_values([series_col, date_col], kind="stable")
+
+    # One pass to split the panel; each unit is (id, dates, values) arrays
+    failures = {}
+    units = []
+    n_series = 0
+    for series_id, group in frame.groupby(series_col, sort=False):
+        n_series += 1
+        values = group[target_col].to_numpy(dtype=np.float64)
+        mask = ~np.isnan(values)
+        if mask.sum() < min_observations:
+            failures[series_id] = f"Only {int(mask.sum())} observations; need {min_observations}"
+            continue
+        units.append((series_id, group[date_col].to_numpy()[mask], values[mask]))
+    chunks = [units[i:i + chunk_size] for i in range(0, len(units), chunk_size)]
+    logger.info(f"Fitting {len(units)} {model_type} series in {len(chunks)} chunks")
+
+    ids, dates, values = [], [], []
+    with ProcessPoolExecutor(max_workers=max_workers,
+                             mp_context=multiprocessing.get_context(start_method)) as executor:
+        futures = {executor.submit(fit_series_chunk, model_type, chunk, forecast_periods, config, freq): chunk
+                   for chunk in chunks}
+        for future in as_completed(futures):
+            try:
+                chunk_ids, chunk_dates, chunk_values, chunk_failures = future.result()
+            except Exception as e:
+                # A worker crashed; every series in its chunk is reported instead of aborting
+                for series_id, _, _ in futures[future]:
+                    failures[series_id] = f"Worker failed: {e}"
+                continue
+            ids.extend(chunk_ids)
+            dates.append(chunk_dates)
+            values.append(chunk_values)
+            failures.update(chunk_failures)
+
+    values = np.vstack(values) if values else np.empty((0, 3), dtype=np.float32)
+    index = pd.MultiIndex.from_arrays(
+        [pd.Categorical(ids), pd.DatetimeIndex(np.concatenate(dates) if dates else [])],
+        names=[series_col, "ds"],
+    )
+    forecast = pd.DataFrame(values, index=index, columns=FORECAST_COLUMNS).sort_index()
+
+    return {
+        "forecast": forecast,
+        "failures": failures,
+        "stats": {
+            "series": n_series,
+            "fitted": forecast.index.get_level_values(0).nunique() if len(forecast) else 0,
+            "failed": len(failures),
+            "chunks": len(chunks),
+            "seconds": time.perf_counter() - start,
+            "forecast_bytes": int(forecast.memory_usage(deep=True).sum()),
+        },
+    }
@@ -0,0 +1,231 @@
+from typing import Any, Dict, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+
+def _batch_stats(values: np.ndarray):
+    """Count, mean and sum of squared deviations of a batch"""
+    n = len(values)
+    if n == 0:
+        return 0, 0.0, 0.0
+    mean = float(values.mean())
+    return n, mean, float(((values - mean) ** 2).sum())
+
+
+def _merge(n_a, mean_a, m2_a, n_b, mean_b, m2_b):
+    """Chan et al. parallel combination of two Welford accumulators"""
+    n = n_a + n_b
+    if n == 0:
+        return 0, 0.0, 0.0
+    delta = mean_b - mean_a
+    mean = mean_a + delta * n_b / n
+    m2 = m2_a + m2_b + delta * delta * n_a * n_b / n
+    return n, mean, m2
+
+
+def _unmerge(n_total, mean_total, m2_total, n_b, mean_b, m2_b):
+    """Inverse of _merge: remove batch b from the accumulated totals"""
+    n_a = n_total - n_b
+    if n_a <= 0:
+        return 0, 0.0, 0.0
+    mean_a = (n_total * mean_total - n_b * mean_b) / n_a
+    delta = mean_b - mean_a
+    m2_a = m2_total - m2_b - delta * delta * n_a * n_b / n_total
+    return n_a, mean_a, max(m2_a, 0.0)
+
+
+class PredictionHistory:
+    """Fixed-capacity ring buffer of recent predictions with O(1) running statistics.
+
+    Window mean/variance are maintained Welford-style: each update merges the
+    new values in and subtracts the values they overwrite, so reading the
+    statistics never touches the buffer. A windowed histogram over fixed bin
+    edges is updated the same way. The accumulators are recomputed exactly
+    from the buffer once per ``capacity`` insertions to bound rounding drift.
+    """
+
+    def __init__(self, capacity: int = 10000, bin_edges: Optional[Sequence[float]] = None,
+                 n_bins: int = 20):
+        self.capacity = capacity
+        self.n_bins = n_bins
+        self._buffer = np.zeros(capacity, dtype=np.float64)
+        self._pos = 0  # next write position
+        self._size = 0
+        self._since_resync = 0
+
+        # Window statistics
+        self._n, self._mean, self._m2 = 0, 0.0, 0.0
+        # Lifetime statistics
+        self.total_count, self._total_mean, self._total_m2 = 0, 0.0, 0.0
+
+        self.bin_edges = None
+        self._hist = None
+        if bin_edges is not None:
+            self.set_bin_edges(bin_edges)
+
+    def set_bin_edges(self, bin_edges: Sequence[float]):
+        """Set histogram edges; values outside them land in under/overflow bins"""
+        self.bin_edges = np.asarray(bin_edges, dtype=np.float64)
+        self._hist = np.bincount(self._bin_index(self.values()), minlength=len(self.bin_edges) + 1)
+
+    def _bin_index(self, values: np.ndarray) -> np.ndarray:
+        return np.searchsorted(self.bin_edges, values, side="right")
+
+    def _hist_update(self, added: np.ndarray, removed: np.ndarray):
+        if self._hist is None:
+            return
+        size = len(self._hist)
+        if len(added):
+            self._hist += np.bincount(self._bin_index(added), minlength=size)
+        if len(removed):
+            self._hist -= np.bincount(self._bin_index(removed), minlength=size)
+
+    def extend(self, values) -> None:
+        """Append predictions, overwriting the oldest ones once the buffer is full"""
+        values = np.asarray(values, dtype=np.float64).ravel()
+        if not len(values):
+            return
+
+        new_stats = _batch_stats(values)
+        self.total_count, self._total_mean, self._total_m2 = _merge(
+            self.total_count, self._total_mean, self._total_m2, *new_stats)
+
+        # Only the last `capacity` values can survive in the window
+        if len(values) > self.capacity:
+            values = values[-self.capacity:]
+            new_stats = _batch_stats(values)
+        m = len(values)
+
+        n_evicted = max(0, self._size + m - self.capacity)
+        if n_evicted:
+            oldest = (self._pos - self._size) % self.capacity
+            idx = (oldest + np.arange(n_evicted)) % self.capacity
+            evicted = self._buffer[idx]
+            self._n, self._mean, self._m2 = _unmerge(self._n, self._mean, self._m2, *_batch_stats(evicted))
+        else:
+            evicted = values[:0]
+        self._hist_update(values, evicted)
+        self._n, self._mean, self._m2 = _merge(self._n, self._mean, self._m2, *new_stats)
+
+        # Write with wrap-around
+        first = min(m, self.capacity - self._pos)
+        self._buffer[self._pos:self._pos + first] = values[:first]
+        if first < m:
+            self._buffer[:m - first] = values[first:]
+        self._pos = (self._pos + m) % self.capacity
+        self._size = min(self.capacity, self._size + m)
+
+        self._since_resync += m
+        if self._since_resync >= self.capacity:
+            self._resync()
+
+    def append(self, value: float) -> None:
+        self.extend([value])
+
+    def _resync(self):
+        """Recompute the window accumulators exactly from the buffer"""
+        window = self.values()
+        self._n, self._mean, self._m2 = _batch_stats(window)
+        if self.bin_edges is None and len(window):
+            low, high = float(window.min()), float(window.max())
+            if high <= low:
+                high = low + 1.0
+            self.set_bin_edges(np.linspace(low, high, self.n_bins + 1))
+        elif self.bin_edges is not None:
+            self._hist = np.bincount(self._bin_index(window), minlength=len(self.bin_edges) + 1)
+        self._since_resync = 0
+
+    def values(self) -> np.ndarray:
+        """Window contents in insertion order (a copy)"""
+        if self._size < self.capacity:
+            return self._buffer[:self._size].copy()
+        return np.concatenate([self._buffer[self._pos:], self._buffer[:self._pos]])
+
+    @property
+    def count(self) -> int:
+        return self._size
+
+    @property
+    def mean(self) -> float:
+        return self._mean
+
+    @property
+    def variance(self) -> float:
+        return self._m2 / self._n if self._n else 0.0
+
+    @property
+    def std(self) -> float:
+        return float(np.sqrt(self.variance))
+
+    def histogram(self) -> Optional[Dict[str, Any]]:
+        if self._hist is None:
+            return None
+        return {
+            "bin_edges": self.bin_edges.tolist(),
+            "underflow": int(self._hist[0]),
+            "counts": self._hist[1:-1].tolist(),
+            "overflow": int(self._hist[-1]),
+        }
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "capacity": self.capacity,
+            "window_count": self.count,
+            "window_mean": self.mean,
+            "window_std": self.std,
+            "total_count": self.total_count,
+            "total_mean": self._total_mean,
+            "total_std": float(np.sqrt(self._total_m2 / self.total_count)) if self.total_count else 0.0,
+            "histogram": self.histogram(),
+        }
+
+
+class FeatureHistory:
+    """Fixed-capacity ring buffer of recent feature rows (float32), in a fixed column order"""
+
+    def __init__(self, feature_names: Sequence[str], capacity: int = 5000):
+        self.feature_names = list(feature_names)
+        self.capacity = capacity
+        self._buffer = np.full((capacity, len(self.feature_names)), np.nan, dtype=np.float32)
+        self._pos = 0
+        self._size = 0
+        self.total_count = 0
+
+    def row_from_dict(self, features: Dict[str, Any]) -> np.ndarray:
+        """Vectorize a feature dict; missing or non-numeric values become NaN"""
+        row = np.full(len(self.feature_names), np.nan, dtype=np.float32)
+        for i, name in enumerate(self.feature_names):
+            value = features.get(name)
+            if isinstance(value, (int, float, np.number)) and not isinstance(value, bool):
+                row[i] = value
+        return row
+
+    def extend(self, rows) -> None:
+        """Append a (n_rows, n_features) block, overwriting the oldest rows once full"""
+        rows = np.asarray(rows, dtype=np.float32).reshape(-1, len(self.feature_names))
+        self.total_count += len(rows)
+        if len(rows) > self.capacity:
+            rows = rows[-self.capacity:]
+        m = len(rows)
+        first = min(m, self.capacity - self._pos)
+        self._buffer[self._pos:self._pos + first] = rows[:first]
+        if first < m:
+            self._buffer[:m - first] = rows[first:]
+        self._pos = (self._pos + m) % self.capacity
+        self._size = min(self.capacity, self._size + m)
+
+    def extend_frame(self, df) -> None:
+        """Append the rows of a DataFrame, aligning its columns to feature_names"""
+        aligned = df.reindex(columns=self.feature_names).apply(pd.to_numeric, errors="coerce")
+        self.extend(aligned.to_numpy(dtype=np.float32, na_value=np.nan))
+
+    @property
+    def count(self) -> int:
+        return self._size
+
+    def values(self) -> np.ndarray:
+        """Window contents in insertion order (a copy)"""
+        if self._size < self.capacity:
+            return self._buffer[:self._size].copy()
+        return np.concatenate([self._buffer[self._pos:], self._buffer[:self._pos]])
@@ -0,0 +1,347 @@
+"""Compact per-model reference data for drift detection and explainers.
+
+Instead of keeping a full copy of every training set, each model keeps:
+
+- a fixed-size stratified reservoir sample (numeric columns as float32,
+  datetime columns as float32 seconds since their earliest value, everything
+  else as pandas categoricals), optionally spilled to a memory-mapped
+  ``.npy`` file plus a Parquet file for categoricals
+- per-feature quantile sketches over all rows seen
+- a drift ReferenceProfile (binned histograms) over all rows seen
+
+Updates fold new rows into all three without revisiting old data.
+"""
+import os
+from typing import Any, Callable, Dict, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from drift_engine import ReferenceProfile, bin_counts
+
+
+def _frame_bytes(df: Optional[pd.DataFrame]) -> int:
+    return int(df.memory_usage(deep=True, index=True).sum()) if df is not None else 0
+
+
+def _strata_labels(y: Optional[Sequence], edges: Optional[np.ndarray]) -> np.ndarray:
+    """Class labels for classification targets; quantile-bin ids for numeric targets"""
+    if y is None:
+        return None
+    y = np.asarray(y)
+    if edges is None:
+        return y
+    return np.searchsorted(edges, y.astype(np.float64), side="right")
+
+
+def _seconds_since(values: pd.Series, origin: pd.Timestamp) -> np.ndarray:
+    """Datetimes as float seconds since a UTC origin (naive values are taken as UTC); NaT becomes NaN"""
+    return ((pd.to_datetime(values, utc=True) - origin) / pd.Timedelta(seconds=1)).to_numpy(dtype=np.float64)
+
+
+def _merge_quantiles(q_a: np.ndarray, n_a: int, q_b: np.ndarray, n_b: int) -> np.ndarray:
+    """Approximately merge two quantile sketches by weighting their grid points by row count"""
+    levels = np.linspace(0.0, 1.0, q_a.shape[1])
+    merged = np.empty_like(q_a)
+    for j in range(q_a.shape[0]):
+        points = np.concatenate([q_a[j], q_b[j]])
+        weights = np.concatenate([np.full(q_a.shape[1], n_a), np.full(q_b.shape[1], n_b)]).astype(np.float64)
+        valid = ~np.isnan(points)
+        if not valid.any():
+            merged[j] = np.nan
+            continue
+        order = np.argsort(points[valid])
+        sorted_points, sorted_weights = points[valid][order], weights[valid][order]
+        cdf = (np.cumsum(sorted_weights) - 0.5 * sorted_weights) / sorted_weights.sum()
+        merged[j] = np.interp(levels, cdf, sorted_points)
+    return merged
+
+
+class ReferenceData:
+    """Reference sample, sketches and histograms for one model"""
+
+    def __init__(self, columns, numeric_columns, categories, datetimes=None):
+        self.columns = list(columns)
+        self.numeric_columns = list(numeric_columns)
+        self.categories = categories  # column -> pandas categories
+        # Datetime column -> (dtype, UTC origin); kept among the numeric columns as seconds since the origin
+        self.datetimes = datetimes or {}
+        self.numeric = None  # (n, n_numeric) float32, possibly a memmap
+        self.categorical = None  # DataFrame of categorical columns, or None
+        self.strata = None  # stratum label per sampled row
+        self.keys = None  # random priority per sampled row (bottom-k sampling)
+        self.allocation = {}  # stratum -> sample slots
+        self.stratum_edges = None
+        self.rows_seen = 0
+        self.quantiles = None  # (n_numeric, n_quantiles) float32
+        self.profile = None  # drift ReferenceProfile
+        self.full_copy_bytes = 0  # size of the last frame handed to add(), for the memory report
+        self.spill_paths = {}
+
+    @property
+    def sample_size(self) -> int:
+        return 0 if self.numeric is None else len(self.numeric)
+
+    def numeric_values(self, X: pd.DataFrame) -> np.ndarray:
+        """The numeric columns of X as float32, datetime columns converted to seconds since their origin"""
+        datetimes = getattr(self, "datetimes", {})
+        if not datetimes:
+            return X[self.numeric_columns].to_numpy(dtype=np.float32, na_value=np.nan)
+        values = np.empty((len(X), len(self.numeric_columns)), dtype=np.float32)
+        for j, column in enumerate(self.numeric_columns):
+            if column in datetimes:
+                values[:, j] = _seconds_since(X[column], datetimes[column][1])
+            else:
+                values[:, j] = X[column].to_numpy(dtype=np.float32, na_value=np.nan)
+        return values
+
+    def sample(self) -> pd.DataFrame:
+        """Reservoir sample as a DataFrame in the original column order"""
+        frame = pd.DataFrame(np.asarray(self.numeric), columns=self.numeric_columns)
+        for column, (dtype, origin) in getattr(self, "datetimes", {}).items():
+            restored = (origin + pd.to_timedelta(frame[column].astype(np.float64), unit="s")).dt.round("s")
+            tz = getattr(dtype, "tz", None)
+            frame[column] = restored.dt.tz_convert(tz) if tz is not None else restored.dt.tz_localize(None)
+        if self.categorical is None and "categorical" in self.spill_paths:
+            self.categorical = pd.read_parquet(self.spill_paths["categorical"])
+        if self.categorical is not None:
+            for column in self.categorical.columns:
+                frame[column] = self.categorical[column].values
+        return frame[self.columns]
+
+    def quantile_frame(self) -> pd.DataFrame:
+        levels = np.linspace(0.0, 1.0, self.quantiles.shape[1])
+        return pd.DataFrame(self.quantiles.T, index=pd.Index(levels, name="quantile"),
+                            columns=self.numeric_columns)
+
+    def memory_report(self) -> Dict[str, Any]:
+        numeric_in_memory = isinstance(self.numeric, np.ndarray) and not isinstance(self.numeric, np.memmap)
+        numeric_bytes = int(self.numeric.nbytes) if self.numeric is not None else 0
+        categorical_bytes = _frame_bytes(self.categorical)
+        sketch_bytes = int(self.quantiles.nbytes) if self.quantiles is not None else 0
+        profile_bytes = (self.profile.edges.nbytes + self.profile.probs.nbytes) if self.profile is not None else 0
+        bookkeeping_bytes = sum(int(a.nbytes) for a in (self.strata, self.keys) if a is not None)
+        resident = ((numeric_bytes if numeric_in_memory else 0) + categorical_bytes + sketch_bytes +
+                    profile_bytes + bookkeeping_bytes)
+        return {
+            "rows_seen": self.rows_seen,
+            "sample_rows": self.sample_size,
+            "columns": len(self.columns),
+            "strata": len(self.allocation),
+            "sample_numeric_bytes": numeric_bytes,
+            "sample_numeric_spilled": not numeric_in_memory,
+            "sample_categorical_bytes": categorical_bytes,
+            "quantile_sketch_bytes": sketch_bytes,
+            "histogram_bytes": int(profile_bytes),
+            "resident_bytes": int(resident),
+            "full_copy_bytes": self.full_copy_bytes,
+            "spill_paths": dict(self.spill_paths),
+        }
+
+
+class ReferenceStore:
+    """Bounded reference data for many models.
+
+    Args:
+        sample_size: Reservoir rows kept per model
+        n_quantiles: Points per feature quantile sketch
+        n_bins: Histogram bins per feature for drift profiles
+        n_strata: Quantile bins of a numeric target used as strata
+        min_per_stratum: Slots reserved for every stratum, so rare classes stay represented
+        spill_dir: When set, samples are written to ``<spill_dir>/<model_id>/`` and memory-mapped
+        random_state: Seed for the reservoir priorities
+    """
+
+    def __init__(self, sample_size: int = 2000, n_quantiles: int = 101, n_bins: int = 20,
+                 n_strata: int = 10, min_per_stratum: int = 10, spill_dir: Optional[str] = None,
+                 random_state: int = 0):
+        self.sample_size = sample_size
+        self.n_quantiles = n_quantiles
+        self.n_bins = n_bins
+        self.n_strata = n_strata
+        self.min_per_stratum = min_per_stratum
+        self.spill_dir = spill_dir
+        self._rng = np.random.default_rng(random_state)
+        self._data: Dict[str, ReferenceData] = {}
+        self._loaders: Dict[str, Callable[[], ReferenceData]] = {}  # model_id -> deferred load (e.g. from a bundle)
+
+    def __contains__(self, model_id: str) -> bool:
+        return model_id in self._data or model_id in self._loaders
+
+    def get(self, model_id: str) -> ReferenceData:
+        if model_id not in self._data:
+            loader = self._loaders.pop(model_id, None)
+            if loader is None:
+                raise KeyError(f"No reference data for model {model_id}")
+            self._data[model_id] = loader()
+        return self._data[model_id]
+
+    def put(self, model_id: str, data: ReferenceData):
+        """Register reference data restored from elsewhere (e.g. a saved model)"""
+        self._loaders.pop(model_id, None)
+        self._data[model_id] = data
+
+    def put_lazy(self, model_id: str, loader: Callable[[], ReferenceData]):
+        """Register reference data that is only loaded when first asked for"""
+        self._data.pop(model_id, None)
+        self._loaders[model_id] = loader
+
+    def remove(self, model_id: str):
+        self._data.pop(model_id, None)
+        self._loaders.pop(model_id, None)
+
+    def add(self, model_id: str, X: pd.DataFrame, y: Optional[Sequence] = None,
+            predictions: Optional[Sequence[float]] = None,
+            numeric_target: Optional[bool] = None) -> ReferenceData:
+        """Replace a model's reference data with a summary of X.
+
+        Args:
+            model_id: Model the data belongs to
+            X: Training features
+            y: Targets to stratify the sample on (classes, or quantile bins of a numeric target)
+            predictions: Model predictions on X, profiled alongside the features for drift
+            numeric_target: Whether y is continuous; inferred from its dtype when omitted
+        """
+        # Datetime columns (e.g. a time series' date) are sampled and sketched as numbers, not as
+        # categoricals with every distinct timestamp as a category
+        datetimes = {}
+        for column in X.columns:
+            if pd.api.types.is_datetime64_any_dtype(X[column]):
+                first = pd.to_datetime(X[column], utc=True).min()
+                datetimes[column] = (X[column].dtype, first if not pd.isna(first) else pd.Timestamp(0, tz="UTC"))
+        numeric = set(X.select_dtypes(include=[np.number, "bool"]).columns) | set(datetimes)
+        numeric_columns = [c for c in X.columns if c in numeric]
+        other_columns = [c for c in X.columns if c not in numeric]
+        categories = {c: pd.Categorical(X[c]).categories for c in other_columns}
+        data = ReferenceData(X.columns, numeric_columns, categories, datetimes)
+        data.full_copy_bytes = _frame_bytes(X)
+
+        if numeric_target is None:
+            numeric_target = y is not None and pd.api.types.is_float_dtype(np.asarray(y))
+        if y is not None and numeric_target:
+            with np.errstate(all="ignore"):
+                data.stratum_edges = np.unique(np.nanquantile(
+                    np.asarray(y, dtype=np.float64), np.linspace(0, 1, self.n_strata + 1)[1:-1]))
+        strata = _strata_labels(y, data.stratum_edges)
+        if strata is not None:
+            labels, counts = np.unique(strata, return_counts=True)
+            for label, count in zip(labels.tolist(), counts):
+                share = int(round(self.sample_size * count / len(strata)))
+                data.allocation[label] = min(int(count), max(self.min_per_stratum, share))
+        else:
+            data.allocation[None] = self.sample_size
+
+        numeric = data.numeric_values(X)
+        with np.errstate(all="ignore"):
+            data.quantiles = np.nanquantile(numeric, np.linspace(0, 1, self.n_quantiles), axis=0).T.astype(np.float32)
+        data.profile = ReferenceProfile.from_data(X, predictions, n_bins=self.n_bins)
+        data.rows_seen = len(X)
+
+        self._fold_into_sample(data, X, numeric, strata)
+        self._data[model_id] = data
+        self._spill(model_id, data)
+        return data
+
+    def update(self, model_id: str, X_new: pd.DataFrame, y_new: Optional[Sequence] = None,
+               predictions: Optional[Sequence[float]] = None) -> ReferenceData:
+        """Fold new rows into the reservoir, quantile sketches and histograms"""
+        data = self.get(model_id)
+        if not len(X_new):
+            return data
+        X_new = X_new.reindex(columns=data.columns)
+        numeric = data.numeric_values(X_new)
+
+        with np.errstate(all="ignore"):
+            new_quantiles = np.nanquantile(numeric, np.linspace(0, 1, self.n_quantiles), axis=0).T
+        data.quantiles = _merge_quantiles(data.quantiles.astype(np.float64), data.rows_seen,
+                                          new_quantiles, len(X_new)).astype(np.float32)
+
+        profile = data.profile
+        values = X_new.reindex(columns=profile.feature_names).to_numpy(dtype=np.float64)
+        if profile.has_predictions():
+            prediction_values = (np.asarray(predictions, dtype=np.float64).reshape(-1, 1)
+                                 if predictions is not None else np.full((len(values), 1), np.nan))
+            values = np.hstack([values, prediction_values])
+        new_counts = bin_counts(values, profile.edges)
+        old_counts = profile.probs * profile.count
+        total = old_counts + new_counts
+        profile.probs = total / np.maximum(total.sum(axis=1, keepdims=True), 1)
+        profile.count += len(values)
+
+        data.rows_seen += len(X_new)
+        if None in data.allocation:
+            self._fold_into_sample(data, X_new, numeric, None)
+        elif y_new is not None:
+            strata = _strata_labels(y_new, data.stratum_edges)
+            for label in np.unique(strata).tolist():
+                data.allocation.setdefault(label, self.min_per_stratum)
+            self._fold_into_sample(data, X_new, numeric, strata)
+        # A stratified sample cannot place rows without targets, so only the sketches see them
+        self._spill(model_id, data)
+        return data
+
+    def _fold_into_sample(self, data: ReferenceData, X: pd.DataFrame, numeric: np.ndarray,
+                          strata: Optional[np.ndarray]):
+        """Bottom-k reservoir per stratum: every row gets a random priority and each stratum
+        keeps its lowest-priority rows, which is a uniform sample of everything seen in it"""
+        keys = self._rng.random(len(X))
+        if strata is None:
+            strata = np.full(len(X), None, dtype=object)
+
+        categorical = None
+        if data.categories:
+            categorical = pd.DataFrame({
+                c: pd.Categorical(X[c], categories=data.categories[c]) for c in data.categories
+            })
+
+        if data.numeric is not None:
+            if data.categorical is None and "categorical" in data.spill_paths:
+                data.categorical = pd.read_parquet(data.spill_paths["categorical"])
+            numeric = np.concatenate([np.asarray(data.numeric), numeric])
+            keys = np.concatenate([data.keys, keys])
+            strata = np.concatenate([data.strata, strata])
+            if categorical is not None:
+                categorical = pd.concat([data.categorical, categorical], ignore_index=True)
+
+        keep = []
+        for label, slots in data.allocation.items():
+            idx = np.flatnonzero(strata == label) if label is not None else np.arange(len(keys))
+            if len(idx) > slots:
+                idx = idx[np.argpartition(keys[idx], slots - 1)[:slots]]
+            keep.append(idx)
+        keep = np.sort(np.concatenate(keep)) if keep else np.arange(0)
+
+        data.numeric = numeric[keep]
+        data.keys = keys[keep]
+        data.strata = strata[keep]
+        data.categorical = categorical.iloc[keep].reset_index(drop=True) if categorical is not None else None
+
+    def background(self, model_id: str, n: int = 100, random_state: int = 0) -> pd.DataFrame:
+        """Up to n rows of the reference sample, e.g. as a SHAP background"""
+        sample = self.get(model_id).sample()
+        return sample.sample(n, random_state=random_state) if len(sample) > n else sample
+
+    def _spill(self, model_id: str, data: ReferenceData):
+        """Write the sample to disk and keep only memory-mapped/lazily loaded views resident"""
+        if not self.spill_dir:
+            return
+        directory = os.path.join(self.spill_dir, model_id)
+        os.makedirs(directory, exist_ok=True)
+        numeric_path = os.path.join(directory, "reference_numeric.npy")
+        # np.save into a temp name then rename, so an existing memmap of the old file stays valid
+        tmp_path = numeric_path + ".tmp.npy"
+        np.save(tmp_path, np.ascontiguousarray(data.numeric))
+        os.replace(tmp_path, numeric_path)
+        data.numeric = np.load(numeric_path, mmap_mode="r")
+        data.spill_paths["numeric"] = numeric_path
+        if data.categorical is not None:
+            categorical_path = os.path.join(directory, "reference_categorical.parquet")
+            data.categorical.to_parquet(categorical_path)
+            data.spill_paths["categorical"] = categorical_path
+            data.categorical = None
+
+    def memory_report(self, model_id: Optional[str] = None) -> Dict[str, Any]:
+        """Per-model memory use of the reference data next to the size of the full copy it replaces"""
+        if model_id is not None:
+            return self.get(model_id).memory_report()
+        return {mid: data.memory_report() for mid, data in self._data.items()}
@@ -0,0 +1,375 @@
+"""Background retraining: a SQLite-backed job queue and process-isolated trainers.
+
+Jobs are persisted so queued work survives a restart, deduplicated per model
+(at most one queued or running job each) and executed in a process pool so
+training never competes with the serving event loop for the GIL. After a
+model's jobs fail, automatic resubmission backs off exponentially.
+"""
+import asyncio
+import importlib.util
+import json
+import logging
+import multiprocessing
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from artifact_bundle import is_bundle
+from model_registry import CANDIDATE_DIR
+
+logger = logging.getLogger(__name__)
+
+QUEUED, RUNNING, SUCCEEDED, FAILED = "queued", "running", "succeeded", "failed"
+
+_FACTORY_MODULE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "ai-prediction-backend.py")
+
+
+class RetrainingJobStore:
+    """Persistent job table in SQLite"""
+
+    def __init__(self, path: str = "retraining.db"):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    model_id TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    reason TEXT,
+                    created_at TEXT NOT NULL,
+                    started_at TEXT,
+                    finished_at TEXT,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    version TEXT,
+                    error TEXT
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_model_status ON jobs (model_id, status)")
+
+    @staticmethod
+    def _now() -> str:
+        return datetime.now().isoformat()
+
+    def enqueue(self, model_id: str, reason: str = "") -> Tuple[Dict[str, Any], bool]:
+        """Queue a job unless one is already queued or running for the model.
+
+        Returns the job and whether it was newly created.
+        """
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT * FROM jobs WHERE model_id = ? AND status IN (?, ?) ORDER BY id LIMIT 1",
+                (model_id, QUEUED, RUNNING),
+            ).fetchone()
+            if row is not None:
+                return dict(row), False
+            cursor = self._conn.execute(
+                "INSERT INTO jobs (model_id, status, reason, created_at) VALUES (?, ?, ?, ?)",
+                (model_id, QUEUED, reason, self._now()),
+            )
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (cursor.lastrowid,)).fetchone()
+            return dict(row), True
+
+    def failure_streak(self, model_id: str) -> Tuple[int, Optional[str]]:
+        """Failed jobs of a model since its last successful one, and when the latest of them finished"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT COUNT(*) AS failures, MAX(finished_at) AS last_failed FROM jobs "
+                "WHERE model_id = ? AND status = ? AND id > COALESCE("
+                "(SELECT MAX(id) FROM jobs WHERE model_id = ? AND status = ?), 0)",
+                (model_id, FAILED, model_id, SUCCEEDED),
+            ).fetchone()
+        return row["failures"], row["last_failed"]
+
+    def claim_next(self) -> Optional[Dict[str, Any]]:
+        """Mark the oldest queued job as running and return it"""
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT * FROM jobs WHERE status = ? ORDER BY id LIMIT 1", (QUEUED,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, started_at = ?, attempts = attempts + 1 WHERE id = ?",
+                (RUNNING, self._now(), row["id"]),
+            )
+            return dict(self._conn.execute("SELECT * FROM jobs WHERE id = ?", (row["id"],)).fetchone())
+
+    def finish(self, job_id: int, version: Optional[str] = None, error: Optional[str] = None):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, finished_at = ?, version = ?, error = ? WHERE id = ?",
+                (FAILED if error else SUCCEEDED, self._now(), version, error, job_id),
+            )
+
+    def recover(self) -> int:
+        """Requeue jobs left running by a previous process; returns how many"""
+        with self._lock, self._conn:
+            return self._conn.execute(
+                "UPDATE jobs SET status = ? WHERE status = ?", (QUEUED, RUNNING)
+            ).rowcount
+
+    def get(self, job_id: int) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return dict(row) if row is not None else None
+
+    def list(self, model_id: Optional[str] = None, status: Optional[str] = None,
+             limit: int = 50) -> List[Dict[str, Any]]:
+        query, params = "SELECT * FROM jobs WHERE 1 = 1", []
+        if model_id:
+            query += " AND model_id = ?"
+            params.append(model_id)
+        if status:
+            query += " AND status = ?"
+            params.append(status)
+        query += " ORDER BY id DESC LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            return [dict(row) for row in self._conn.execute(query, params).fetchall()]
+
+    def active_models(self) -> List[str]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT DISTINCT model_id FROM jobs WHERE status IN (?, ?)", (QUEUED, RUNNING)
+            ).fetchall()
+        return [row["model_id"] for row in rows]
+
+    def close(self):
+        self._conn.close()
+
+
+def _load_model_factory():
+    """Import ModelFactory from ai-prediction-backend.py (the filename is not importable by name)"""
+    module = sys.modules.get("ai_prediction_backend")
+    if module is None:
+        spec = importlib.util.spec_from_file_location("ai_prediction_backend", _FACTORY_MODULE)
+        module = importlib.util.module_from_spec(spec)
+        sys.modules["ai_prediction_backend"] = module
+        spec.loader.exec_module(module)
+    return module.ModelFactory
+
+
+def _atomic_write(path: str, write: Callable[[str], None]):
+    """Write to a temp file in the same directory, then rename over the target"""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+    os.close(fd)
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _next_version(current: Any) -> str:
+    try:
+        return str(int(current) + 1)
+    except (TypeError, ValueError):
+        return datetime.now().strftime("%Y%m%d%H%M%S")
+
+
+def train_model(model_id: str, models_dir: str = "models") -> str:
+    """Retrain a model from the ``training`` spec in its info.json and stage a new version.
+
+    Runs in a worker process. The model and its info.json are written to the
+    model's ``candidate/`` directory, not over the live artifact; the API
+    promotes them once the new version passed validation
+    (``ModelRegistry.hot_swap(..., candidate=True)``). The spec looks like::
+
+        "training": {
+            "task": "classification" | "regression" | "time_series",
+            "model_type": "xgboost",
+            "data_path": "train.csv",     # relative to the model directory
+            "target": "label",
+            "features": ["a", "b"],       # optional, defaults to all other columns
+            "date_col": "ds",             # time series only
+            "config": {}
+        }
+
+    Returns:
+        The new version string written to the staged info.json
+    """
+    model_dir = os.path.join(models_dir, model_id)
+    with open(os.path.join(model_dir, "info.json"), "r") as f:
+        info = json.load(f)
+    spec = info.get("training")
+    if not spec:
+        raise ValueError(f"Model {model_id} has no 'training' spec in info.json")
+
+    data_path = spec["data_path"]
+    if not os.path.isabs(data_path):
+        data_path = os.path.join(model_dir, data_path)
+    data = pd.read_parquet(data_path) if data_path.endswith(".parquet") else pd.read_csv(data_path)
+
+    factory = _load_model_factory()()
+    task = spec.get("task", info.get("task"))
+    target = spec["target"]
+    config = spec.get("config") or {}
+
+    if task == "time_series":
+        factory.create_time_series_model(model_id, spec["model_type"], data, target, spec["date_col"],
+                                         spec.get("forecast_periods", 12), config)
+    else:
+        features = spec.get("features") or [c for c in data.columns if c != target]
+        X, y = data[features], data[target]
+        if task == "classification":
+            factory.create_classification_model(model_id, spec["model_type"], X, y, config)
+        elif task == "regression":
+            factory.create_regression_model(model_id, spec["model_type"], X, y, config)
+        else:
+            raise ValueError(f"Unsupported training task: {task}")
+
+        predictions = np.asarray(factory.predict(model_id, X), dtype=float)
+        info["feature_names"] = features
+        info["historical_mean"] = float(predictions.mean())
+        info["historical_std"] = float(predictions.std())
+        info["reference_profile"] = factory.get_reference_profile(model_id).to_dict()
+        if "background_data" in info:
+            sample = factory.reference_store.background(model_id, len(info["background_data"]) or 100)
+            info["background_data"] = sample.to_dict(orient="records")
+
+    model = factory.models[model_id]["model"]
+    info["version"] = _next_version(info.get("version"))
+    info["last_trained"] = factory.models[model_id]["last_trained"]
+
+    # Staged next to the live files (same filesystem, so promotion is a rename); a leftover
+    # candidate from an interrupted job is replaced. info.json goes last, it marks the candidate complete.
+    # Models served from a bundle get a new bundle
+    candidate_dir = os.path.join(model_dir, CANDIDATE_DIR)
+    shutil.rmtree(candidate_dir, ignore_errors=True)
+    os.makedirs(candidate_dir)
+    if is_bundle(os.path.join(model_dir, "bundle")):
+        factory.save_bundle(model_id, os.path.join(candidate_dir, "bundle"))
+    else:
+        _atomic_write(os.path.join(candidate_dir, "model.joblib"), lambda path: joblib.dump(model, path))
+
+    def write_info(path):
+        with open(path, "w") as f:
+            json.dump(info, f)
+    _atomic_write(os.path.join(candidate_dir, "info.json"), write_info)
+    return info["version"]
+
+
+class RetrainingService:
+    """Pulls queued jobs and runs them in a process pool, at most ``max_concurrent`` at a time.
+
+    ``failure_backoff_seconds`` is the wait after a model's first failed job before
+    ``backoff_remaining`` allows automatic resubmission; it doubles with every further
+    consecutive failure, up to ``max_backoff_seconds`` (0 disables the backoff).
+    """
+
+    def __init__(self, store: RetrainingJobStore, models_dir: str = "models", max_concurrent: int = 1,
+                 trainer: Callable[[str, str], str] = train_model,
+                 on_complete: Optional[Callable[[str, str], Awaitable[None]]] = None,
+                 on_failure: Optional[Callable[[str, str], Awaitable[None]]] = None,
+                 start_method: str = "spawn", failure_backoff_seconds: float = 300.0,
+                 max_backoff_seconds: float = 24 * 3600.0):
+        self.store = store
+        self.models_dir = models_dir
+        self.max_concurrent = max_concurrent
+        self.failure_backoff_seconds = failure_backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self.trainer = trainer
+        self.on_complete = on_complete
+        self.on_failure = on_failure
+        self.start_method = start_method
+        self._executor = None
+        self._wakeup = None
+        self._dispatcher = None
+        self._running = {}  # job id -> task
+
+    async def start(self):
+        recovered = self.store.recover()
+        if recovered:
+            logger.info(f"Requeued {recovered} retraining jobs interrupted by a restart")
+        self._wakeup = asyncio.Event()
+        self._dispatcher = asyncio.create_task(self._dispatch())
+        self._wakeup.set()
+
+    async def stop(self):
+        if self._dispatcher is not None:
+            self._dispatcher.cancel()
+        for task in list(self._running.values()):
+            task.cancel()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def submit(self, model_id: str, reason: str = "") -> Dict[str, Any]:
+        """Queue retraining for a model; returns the new or already pending job"""
+        job, created = self.store.enqueue(model_id, reason)
+        if created and self._wakeup is not None:
+            self._wakeup.set()
+        return dict(job, deduplicated=not created)
+
+    def is_pending(self, model_id: str) -> bool:
+        return model_id in self.store.active_models()
+
+    def backoff_remaining(self, model_id: str) -> float:
+        """Seconds until a model whose recent jobs failed may be retrained automatically again"""
+        failures, last_failed = self.store.failure_streak(model_id)
+        if not failures or not last_failed or self.failure_backoff_seconds <= 0:
+            return 0.0
+        delay = min(self.failure_backoff_seconds * 2 ** (failures - 1), self.max_backoff_seconds)
+        elapsed = (datetime.now() - datetime.fromisoformat(last_failed)).total_seconds()
+        return max(0.0, delay - elapsed)
+
+    def _pool(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_concurrent,
+                mp_context=multiprocessing.get_context(self.start_method),
+            )
+        return self._executor
+
+    async def _dispatch(self):
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            while len(self._running) < self.max_concurrent:
+                job = self.store.claim_next()
+                if job is None:
+                    break
+                self._running[job["id"]] = asyncio.create_task(self._run(job))
+
+    async def _run(self, job: Dict[str, Any]):
+        model_id = job["model_id"]
+        logger.info(f"Retraining job {job['id']} started for model {model_id} ({job['reason']})")
+        try:
+            loop = asyncio.get_running_loop()
+            version = await loop.run_in_executor(self._pool(), self.trainer, model_id, self.models_dir)
+            if self.on_complete is not None:
+                await self.on_complete(model_id, version)
+            self.store.finish(job["id"], version=version)
+            logger.info(f"Retraining job {job['id']} produced model {model_id} version {version}")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Retraining job {job['id']} for model {model_id} failed: {e}")
+            self.store.finish(job["id"], error=str(e))
+            if self.on_failure is not None:
+                await self.on_failure(model_id, str(e))
+        finally:
+            self._running.pop(job["id"], None)
+            self._wakeup.set()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_concurrent": self.max_concurrent,
+            "running_jobs": list(self._running),
+            "queued": len(self.store.list(status=QUEUED, limit=1000)),
+        }
@@ -0,0 +1,121 @@
+"""Chunked decoding of large batch-prediction payloads.
+
+Each reader yields DataFrames of at most ``chunk_size`` rows so callers can
+score and stream results back without holding the whole input in memory.
+NDJSON is parsed incrementally straight off the request stream; CSV and
+Arrow IPC are spooled (in memory up to a limit, then to disk) and read back
+in chunks.
+"""
+import json
+import tempfile
+from typing import Any, AsyncIterator, Dict, Iterator, List
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+except ImportError:  # Arrow input is optional
+    pa = None
+
+NDJSON_TYPES = {"application/x-ndjson", "application/jsonl", "application/ndjson"}
+CSV_TYPES = {"text/csv", "application/csv"}
+ARROW_TYPES = {"application/vnd.apache.arrow.stream", "application/vnd.apache.arrow.file"}
+JSON_TYPES = {"application/json"}
+
+
+class PayloadError(ValueError):
+    """Raised for malformed or unsupported streaming payloads"""
+
+
+async def iter_ndjson_chunks(byte_stream: AsyncIterator[bytes], chunk_size: int) -> AsyncIterator[pd.DataFrame]:
+    """Parse newline-delimited JSON rows incrementally, yielding DataFrames of chunk_size rows"""
+    # Pieces of the unfinished last line; joined once its newline arrives, so long lines are not re-copied per read
+    pending: List[bytes] = []
+    rows: List[Dict[str, Any]] = []
+    line_number = 0
+
+    async for data in byte_stream:
+        if b"\n" not in data:
+            pending.append(data)
+            continue
+        lines = data.split(b"\n")
+        pending.append(lines[0])
+        lines[0] = b"".join(pending)
+        pending = [lines.pop()]
+        for line in lines:
+            line_number += 1
+            if not line.strip():
+                continue
+            try:
+                rows.append(json.loads(line))
+            except ValueError as e:
+                raise PayloadError(f"Invalid JSON on line {line_number}: {e}")
+            if len(rows) >= chunk_size:
+                yield pd.DataFrame(rows)
+                rows = []
+
+    buffer = b"".join(pending)
+    if buffer.strip():
+        try:
+            rows.append(json.loads(buffer))
+        except ValueError as e:
+            raise PayloadError(f"Invalid JSON on line {line_number + 1}: {e}")
+    if rows:
+        yield pd.DataFrame(rows)
+
+
+async def spool_stream(byte_stream: AsyncIterator[bytes], max_memory_bytes: int = 32 * 1024 * 1024):
+    """Copy a request body into a temp file that only spills to disk past max_memory_bytes"""
+    spool = tempfile.SpooledTemporaryFile(max_size=max_memory_bytes)
+    async for data in byte_stream:
+        spool.write(data)
+    spool.seek(0)
+    return spool
+
+
+def iter_csv_chunks(file, chunk_size: int) -> Iterator[pd.DataFrame]:
+    """Read a CSV file-like object in chunks of chunk_size rows"""
+    try:
+        yield from pd.read_csv(file, chunksize=chunk_size)
+    except pd.errors.EmptyDataError:
+        return
+    except pd.errors.ParserError as e:
+        raise PayloadError(f"Invalid CSV payload: {e}")
+
+
+def iter_arrow_chunks(file, chunk_size: int) -> Iterator[pd.DataFrame]:
+    """Read an Arrow IPC stream or file, re-slicing record batches to chunk_size rows"""
+    if pa is None:
+        raise PayloadError("Arrow payloads require pyarrow to be installed")
+    try:
+        try:
+            reader = pa.ipc.open_stream(file)
+            batches = iter(reader)
+        except pa.ArrowInvalid:
+            file.seek(0)
+            reader = pa.ipc.open_file(file)
+            batches = (reader.get_batch(i) for i in range(reader.num_record_batches))
+        for batch in batches:
+            for offset in range(0, batch.num_rows, chunk_size):
+                yield batch.slice(offset, chunk_size).to_pandas()
+    except pa.ArrowInvalid as e:
+        raise PayloadError(f"Invalid Arrow payload: {e}")
+
+
+def columnar_frame(payload: Any) -> pd.DataFrame:
+    """Build a DataFrame from a columnar JSON layout ({"col": [...], ...}) without per-row dicts"""
+    if isinstance(payload, dict) and isinstance(payload.get("columns"), dict):
+        payload = payload["columns"]
+    if not isinstance(payload, dict) or not all(isinstance(v, list) for v in payload.values()):
+        raise PayloadError('Columnar JSON must be an object mapping column names to lists')
+    lengths = {len(v) for v in payload.values()}
+    if len(lengths) > 1:
+        raise PayloadError("All columns must have the same length")
+    return pd.DataFrame(payload)
+
+
+def iter_frame_chunks(df: pd.DataFrame, chunk_size: int) -> Iterator[pd.DataFrame]:
+    """Yield row slices of an in-memory DataFrame"""
+    for offset in range(0, len(df), chunk_size):
+        yield df.iloc[offset:offset + chunk_size]
@@ -0,0 +1,131 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+import xgboost as xgb
+from sklearn.linear_model import LinearRegression
+
+from artifact_bundle import (MANIFEST, ArtifactBundle, artifact_fingerprint, is_bundle, promote_bundle,
+                             remove_released, write_bundle)
+from model_registry import ModelRegistry
+
+
+@pytest.fixture
+def data():
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame(rng.normal(size=(200, 3)), columns=["a", "b", "c"])
+    y = X["a"] * 2 + X["b"]
+    return X, y
+
+
+def test_round_trip_and_lazy_loading(tmp_path, data):
+    X, y = data
+    booster = xgb.XGBRegressor(n_estimators=5).fit(X, y)
+    mixed = pd.DataFrame({"x": [1.0, 2.0], "city": ["a", "b"]})
+    components = {"model": booster, "background": X, "mixed": mixed, "weights": np.arange(6.0).reshape(2, 3),
+                  "scaler": LinearRegression().fit(X, y), "missing": None}
+    manifest = write_bundle(str(tmp_path), components, metadata={"model_type": "xgboost"}, version="7")
+
+    assert is_bundle(str(tmp_path))
+    assert set(manifest["components"]) == {"model", "background", "mixed", "weights", "scaler"}
+    bundle = ArtifactBundle(str(tmp_path))
+    assert bundle.version == "7" and bundle.metadata == {"model_type": "xgboost"}
+    assert not any(bundle.is_loaded(name) for name in bundle.components())
+    assert "missing" not in bundle and bundle.get("missing") is None
+
+    np.testing.assert_allclose(bundle["model"].predict(X), booster.predict(X), rtol=1e-6)
+    assert bundle.is_loaded("model") and not bundle.is_loaded("background")
+    assert bundle["model"] is bundle["model"]
+    pd.testing.assert_frame_equal(bundle["background"], X)
+    pd.testing.assert_frame_equal(bundle["mixed"], mixed, check_dtype=False)
+    np.testing.assert_array_equal(bundle["weights"], components["weights"])
+    np.testing.assert_allclose(bundle["scaler"].predict(X), components["scaler"].predict(X))
+    with pytest.raises(KeyError):
+        bundle.load("absent")
+
+
+def test_compressed_round_trip(tmp_path, data):
+    X, _ = data
+    write_bundle(str(tmp_path), {"background": X, "weights": np.ones(4)}, compress=True)
+    bundle = ArtifactBundle(str(tmp_path))
+    pd.testing.assert_frame_equal(bundle["background"], X)
+    np.testing.assert_array_equal(bundle["weights"], np.ones(4))
+
+
+def test_rewrite_keeps_previous_version_for_open_readers(tmp_path):
+    write_bundle(str(tmp_path), {"weights": np.zeros(3)}, version="1")
+    reader = ArtifactBundle(str(tmp_path))
+    write_bundle(str(tmp_path), {"weights": np.ones(3)}, version="2")
+    # A reader holding version 1's manifest can still load its component
+    np.testing.assert_array_equal(reader["weights"], np.zeros(3))
+    write_bundle(str(tmp_path), {"weights": np.full(3, 2.0)}, version="3")
+    # Files older than the previous version are removed
+    assert not reader.files() & set(os.listdir(tmp_path))
+    assert ArtifactBundle(str(tmp_path)).version == "3"
+
+
+def test_newer_format_is_rejected(tmp_path):
+    write_bundle(str(tmp_path), {"weights": np.zeros(1)})
+    manifest_path = os.path.join(tmp_path, MANIFEST)
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    manifest["format_version"] += 1
+    with open(manifest_path, "w") as f:
+        json.dump(manifest, f)
+    with pytest.raises(ValueError):
+        ArtifactBundle(str(tmp_path))
+
+
+def test_promote_moves_staged_bundle_and_keeps_files_in_use(tmp_path):
+    live, staged = str(tmp_path / "bundle"), str(tmp_path / "candidate")
+    write_bundle(live, {"weights": np.zeros(2)}, version="1")
+    oldest = ArtifactBundle(live)
+    write_bundle(live, {"weights": np.ones(2)}, version="2")
+    previous = ArtifactBundle(live)
+    write_bundle(staged, {"weights": np.full(2, 3.0)}, version="3")
+    fingerprint = artifact_fingerprint(staged)
+
+    promote_bundle(staged, live, keep=oldest.files())
+    assert not os.path.exists(os.path.join(staged, MANIFEST))
+    assert artifact_fingerprint(live) == fingerprint
+    current = ArtifactBundle(live)
+    assert current.version == "3"
+    np.testing.assert_array_equal(current["weights"], np.full(2, 3.0))
+    np.testing.assert_array_equal(oldest["weights"], np.zeros(2))
+    np.testing.assert_array_equal(previous["weights"], np.ones(2))
+
+    # Once nobody reads the old versions their files go, but never the current ones
+    remove_released(live, oldest.files() | previous.files() | current.files())
+    assert set(os.listdir(live)) == {MANIFEST} | current.files()
+
+
+def test_promote_rejects_non_bundle(tmp_path):
+    with pytest.raises(ValueError):
+        promote_bundle(str(tmp_path / "empty"), str(tmp_path / "bundle"))
+
+
+def write_bundled_model(directory, value, version):
+    model = LinearRegression().fit(np.zeros((2, 1)), [value, value])
+    write_bundle(os.path.join(directory, "bundle"), {"model": model, "background": np.full(3, value)},
+                 version=version)
+    with open(os.path.join(directory, "info.json"), "w") as f:
+        json.dump({"version": version}, f)
+
+
+def test_registry_keeps_bundle_files_until_last_slot_is_released(tmp_path):
+    registry = ModelRegistry(str(tmp_path))
+    write_bundled_model(registry.model_dir("m"), 1.0, "1")
+    oldest = registry.acquire("m")
+    for version in ("2", "3"):
+        write_bundled_model(registry.candidate_dir("m"), float(version), version)
+        registry.hot_swap("m", candidate=True)
+
+    # Two versions later, the draining slot still loads the components it has not touched yet
+    assert not oldest.bundle.is_loaded("background")
+    np.testing.assert_array_equal(oldest.bundle["background"], np.full(3, 1.0))
+    files = oldest.bundle.files()
+    registry.release(oldest)
+    assert not files & set(os.listdir(registry.bundle_path("m")))
+    np.testing.assert_array_equal(registry.get_slot("m").bundle["background"], np.full(3, 3.0))
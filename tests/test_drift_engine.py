@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from drift_engine import DriftEngine, ReferenceProfile, benjamini_hochberg
+
+
+def make_profile(n_features=30, n_rows=5000, seed=0):
+    rng = np.random.default_rng(seed)
+    X = pd.DataFrame(rng.normal(size=(n_rows, n_features)), columns=[f"f{i}" for i in range(n_features)])
+    predictions = rng.normal(size=n_rows)
+    return ReferenceProfile.from_data(X, predictions, n_bins=10)
+
+
+def test_benjamini_hochberg_matches_step_up_procedure():
+    pvalues = np.array([0.01, 0.04, 0.03, 0.5])
+    adjusted = benjamini_hochberg(pvalues)
+    np.testing.assert_allclose(adjusted, [0.04, 0.16 / 3, 0.16 / 3, 0.5])
+    assert benjamini_hochberg(np.array([])).size == 0
+    assert benjamini_hochberg(np.array([0.9, 0.95])).max() <= 1.0
+
+
+def test_no_drift_on_same_distribution():
+    profile = make_profile()
+    engine = DriftEngine()
+    rng = np.random.default_rng(1)
+    false_alarms = 0
+    for _ in range(20):
+        report = engine.evaluate(profile, rng.normal(size=(500, 30)), rng.normal(size=500))
+        false_alarms += report["drift_detected"]
+    assert false_alarms == 0
+
+
+def test_window_below_min_samples_is_not_tested():
+    profile = make_profile()
+    engine = DriftEngine(min_samples=100, min_samples_per_bin=25)
+    assert engine.required_samples(10) == 250
+    shifted = np.random.default_rng(2).normal(loc=5.0, size=(249, 30))
+    report = engine.evaluate(profile, shifted)
+    assert report["min_samples"] == 250
+    assert not report["drift_detected"]
+    assert report["n_drifted_features"] == 0
+    assert all(metrics["ks_pvalue_adjusted"] == 1.0 for metrics in report["features"].values())
+
+
+def test_single_drifted_feature_below_fraction_is_not_reported():
+    profile = make_profile()
+    engine = DriftEngine(min_drifted_fraction=0.1)
+    assert engine.required_drifted_features(30) == 3
+    window = np.random.default_rng(3).normal(size=(500, 30))
+    window[:, 0] += 3.0
+    report = engine.evaluate(profile, window)
+    assert report["features"]["f0"]["drifted"]
+    assert report["n_drifted_features"] == 1
+    assert not report["drift_detected"]
+
+
+@pytest.mark.parametrize("n_shifted", [3, 5])
+def test_drift_reported_once_fraction_is_reached(n_shifted):
+    profile = make_profile()
+    window = np.random.default_rng(4).normal(size=(500, 30))
+    window[:, :n_shifted] += 3.0
+    report = DriftEngine().evaluate(profile, window)
+    assert report["n_drifted_features"] == n_shifted
+    assert report["drift_detected"]
+    assert set(report["top_features"][:n_shifted]) == {f"f{i}" for i in range(n_shifted)}
+
+
+def test_prediction_drift_alone_is_reported():
+    profile = make_profile()
+    rng = np.random.default_rng(5)
+    report = DriftEngine().evaluate(profile, rng.normal(size=(500, 30)), rng.normal(loc=2.0, size=500))
+    assert report["n_drifted_features"] == 0
+    assert report["prediction"]["drifted"]
+    assert report["drift_detected"]
+
+
+def test_profile_round_trips_through_dict():
+    profile = make_profile(n_features=3, n_rows=200)
+    restored = ReferenceProfile.from_dict(profile.to_dict())
+    assert restored.columns == profile.columns
+    assert restored.has_predictions()
+    np.testing.assert_array_equal(restored.edges, profile.edges)
+    np.testing.assert_array_equal(restored.probs, profile.probs)
@@ -0,0 +1,120 @@
+import numpy as np
+import pandas as pd
+import pytest
+import xgboost as xgb
+from sklearn.compose import ColumnTransformer
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.linear_model import LinearRegression
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder
+
+from feature_schema import FeatureSchema, SchemaError
+
+
+@pytest.fixture
+def schema():
+    return FeatureSchema(["age", "city", "member"], categories={"city": ["paris", "rome"]})
+
+
+def test_decode_orders_features_and_encodes_categories(schema):
+    row = schema.decode({"member": 1, "city": "rome", "age": 30.5})
+    assert row.shape == (1, 3) and row.dtype == np.float32
+    np.testing.assert_array_equal(row, [[30.5, 1.0, 1.0]])
+
+
+def test_null_decodes_to_nan_and_booleans_to_numbers(schema):
+    row = schema.decode({"age": None, "city": None, "member": True})
+    assert np.isnan(row[0, 0]) and np.isnan(row[0, 1])
+    assert row[0, 2] == 1.0
+    assert schema.decode({"age": 1, "city": "paris", "member": False})[0, 2] == 0.0
+
+
+def test_batch_matches_single_rows(schema):
+    records = [{"age": 1, "city": "paris", "member": True},
+               {"age": None, "city": None, "member": 0},
+               {"age": 2.5, "city": "rome", "member": False}]
+    X = schema.decode_batch(records)
+    expected = np.vstack([schema.decode(dict(record)) for record in records])
+    np.testing.assert_array_equal(X, expected)
+
+
+def test_all_numeric_batch_fast_path():
+    schema = FeatureSchema(["a", "b"], dtype=np.float64)
+    X = schema.decode_batch([{"a": 1, "b": 2.5}, {"b": True, "a": None}])
+    np.testing.assert_array_equal(X[0], [1.0, 2.5])
+    assert np.isnan(X[1, 0]) and X[1, 1] == 1.0
+
+
+def test_unknown_category_is_rejected(schema):
+    with pytest.raises(SchemaError, match="berlin"):
+        schema.decode({"age": 1, "city": "berlin", "member": 0})
+    with pytest.raises(SchemaError, match="Row 1"):
+        schema.decode_batch([{"age": 1, "city": "rome", "member": 0}, {"age": 1, "city": "berlin", "member": 0}])
+
+
+def test_missing_and_unknown_fields_are_named(schema):
+    with pytest.raises(SchemaError, match="missing features: member.*unknown features: extra"):
+        schema.decode({"age": 1, "city": "rome", "extra": 2})
+    with pytest.raises(SchemaError, match="Row 0"):
+        schema.decode_batch([{"age": 1}])
+    with pytest.raises(SchemaError):
+        schema.decode([1, "rome", 0])
+
+
+def test_string_for_numeric_feature_is_rejected(schema):
+    with pytest.raises(SchemaError, match="age must be a number"):
+        schema.decode({"age": "thirty", "city": "rome", "member": 0})
+    with pytest.raises(SchemaError, match="Row 1: feature age"):
+        schema.decode_batch([{"age": 1, "city": "rome", "member": 0}, {"age": "x", "city": "rome", "member": 0}])
+
+
+def test_undeclared_features_fall_back_to_dataframe_path():
+    schema = FeatureSchema(["age", "city"], numeric_features=())
+    assert schema.decode({"age": 3, "city": "rome"}) is None
+    assert schema.decode_batch([{"age": 3, "city": 1}, {"age": 4, "city": "rome"}]) is None
+    np.testing.assert_array_equal(schema.decode({"age": 3, "city": 1}), [[3.0, 1.0]])
+
+
+def test_frame_wraps_decoded_rows_without_copy(schema):
+    X = schema.decode_batch([{"age": 1, "city": "rome", "member": 0}])
+    frame = schema.frame(X)
+    assert list(frame.columns) == ["age", "city", "member"]
+    assert np.shares_memory(frame.to_numpy(), X)
+
+
+@pytest.fixture
+def training():
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame({"a": rng.normal(size=50), "b": rng.normal(size=50)})
+    return X, X["a"] + X["b"]
+
+
+def test_from_info_marks_features_numeric_only_for_numeric_models(training):
+    X, y = training
+    for model in (LinearRegression(), RandomForestRegressor(n_estimators=2), xgb.XGBRegressor(n_estimators=2)):
+        schema = FeatureSchema.from_info({}, model.fit(X, y))
+        assert schema.feature_names == ["a", "b"]
+        with pytest.raises(SchemaError):
+            schema.decode({"a": "x", "b": 1})
+
+    pipeline = Pipeline([("encode", ColumnTransformer([("city", OneHotEncoder(), ["a"])], remainder="passthrough")),
+                         ("model", LinearRegression())])
+    schema = FeatureSchema.from_info({}, pipeline.fit(X.assign(a=np.where(X["a"] > 0, "x", "y")), y))
+    assert schema.decode({"a": "x", "b": 1.0}) is None
+    assert schema.dtype == np.float64
+
+
+def test_from_info_dtypes_and_declared_types(training):
+    X, y = training
+    assert FeatureSchema.from_info({}, RandomForestRegressor(n_estimators=2).fit(X, y)).dtype == np.float32
+    assert FeatureSchema.from_info({}, LinearRegression().fit(X, y)).dtype == np.float64
+    assert FeatureSchema.from_info({}) is None
+    schema = FeatureSchema.from_info({"feature_names": ["a", "b"], "numeric_features": ["a"]})
+    with pytest.raises(SchemaError):
+        schema.decode({"a": "x", "b": 1})
+    assert schema.decode({"a": 1, "b": "y"}) is None
+
+
+def test_duplicate_feature_names_rejected():
+    with pytest.raises(ValueError):
+        FeatureSchema(["a", "a"])
@@ -0,0 +1,142 @@
+import json
+import os
+
+import joblib
+import numpy as np
+import pytest
+from sklearn.dummy import DummyRegressor
+
+from model_registry import ModelNotFoundError, ModelRegistry
+
+
+def constant_model(value):
+    return DummyRegressor(strategy="constant", constant=value).fit(np.zeros((1, 1)), [value])
+
+
+def write_model(model_dir, value, version):
+    """Write a version the way the trainer does: by rename, so memory-mapped readers of the old file are unaffected"""
+    os.makedirs(model_dir, exist_ok=True)
+    path = os.path.join(model_dir, "model.joblib")
+    joblib.dump(constant_model(value), path + ".tmp")
+    os.replace(path + ".tmp", path)
+    with open(os.path.join(model_dir, "info.json"), "w") as f:
+        json.dump({"version": version}, f)
+
+
+def served(slot):
+    return float(slot.model.predict(np.zeros((1, 1)))[0])
+
+
+@pytest.fixture
+def registry(tmp_path):
+    released = []
+    registry = ModelRegistry(str(tmp_path), on_release=released.append)
+    registry.released = released
+    write_model(registry.model_dir("m"), 1.0, "1")
+    return registry
+
+
+def test_missing_model_raises(registry):
+    with pytest.raises(ModelNotFoundError):
+        registry.acquire("absent")
+
+
+def test_hot_swap_serves_new_version_and_drains_old(registry):
+    old = registry.acquire("m")
+    write_model(registry.model_dir("m"), 2.0, "2")
+    new = registry.hot_swap("m")
+
+    assert registry.get_slot("m") is new
+    assert served(new) == 2.0
+    # The request holding the old version finishes on it
+    assert old.retired and old.model is not None and served(old) == 1.0
+    assert registry.versions("m")["draining"][0]["version"] == "1"
+
+    registry.release(old)
+    assert old.model is None
+    assert registry.released == [old]
+    assert registry.versions("m")["draining"] == []
+
+
+def test_reloading_same_version_gets_its_own_version(registry):
+    first = registry.get_slot("m")
+    second = registry.hot_swap("m")
+    assert first.version == "1"
+    assert second.version != first.version
+
+
+def test_failed_validation_keeps_current_version(registry):
+    current = registry.get_slot("m")
+    write_model(registry.model_dir("m"), 2.0, "2")
+
+    def reject(slot):
+        raise ValueError("bad version")
+
+    with pytest.raises(ValueError):
+        registry.hot_swap("m", validate=reject)
+    assert registry.get_slot("m") is current
+    assert served(current) == 1.0
+    # The rejected version is released so state built for it can be dropped
+    assert [slot.version for slot in registry.released] == ["2"]
+    assert registry.released[0].model is None
+
+
+def test_failed_warm_releases_the_new_version(registry):
+    registry.get_slot("m")
+    warmed = []
+
+    def warm(slot):
+        warmed.append(slot)
+        raise RuntimeError("warm-up failed")
+
+    with pytest.raises(RuntimeError):
+        registry.hot_swap("m", warm=warm)
+    assert registry.released == warmed
+    assert registry.get_slot("m") is not warmed[0]
+
+
+def test_candidate_promoted_after_validation(registry):
+    registry.get_slot("m")
+    write_model(registry.candidate_dir("m"), 2.0, "2")
+
+    slot = registry.hot_swap("m", validate=lambda slot: None, candidate=True)
+    assert served(slot) == 2.0
+    assert not os.path.exists(registry.candidate_dir("m"))
+    assert registry.info("m")["version"] == "2"
+    assert slot.artifact[0] == registry.model_path("m")
+    assert registry.is_current_artifact(slot)
+    # The promoted artifact is what a fresh load serves
+    assert served(ModelRegistry(registry.models_dir).get_slot("m")) == 2.0
+
+
+def test_rejected_candidate_is_discarded(registry):
+    current = registry.get_slot("m")
+    write_model(registry.candidate_dir("m"), 2.0, "2")
+
+    def reject(slot):
+        raise ValueError("bad candidate")
+
+    with pytest.raises(ValueError):
+        registry.hot_swap("m", validate=reject, candidate=True)
+    assert registry.get_slot("m") is current
+    assert not os.path.exists(registry.candidate_dir("m"))
+    assert served(ModelRegistry(registry.models_dir).get_slot("m")) == 1.0
+
+
+def test_try_acquire_does_not_load(registry):
+    assert registry.try_acquire("m") is None
+    registry.get_slot("m")
+    slot = registry.try_acquire("m")
+    assert slot is not None and slot.refcount == 1
+    registry.release(slot)
+
+
+def test_lru_eviction_notifies(tmp_path):
+    evicted = []
+    registry = ModelRegistry(str(tmp_path), max_resident=1, on_evict=evicted.append)
+    write_model(registry.model_dir("a"), 1.0, "1")
+    write_model(registry.model_dir("b"), 2.0, "1")
+    registry.get_slot("a")
+    registry.get_slot("b")
+    assert evicted == ["a"]
+    assert not registry.is_resident("a") and registry.is_resident("b")
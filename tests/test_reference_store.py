@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from reference_store import ReferenceStore
+
+
+@pytest.fixture
+def frame():
+    rng = np.random.default_rng(0)
+    n = 5000
+    return pd.DataFrame({
+        "ds": pd.date_range("2020-01-01", periods=n, freq="h"),
+        "value": rng.normal(size=n),
+        "city": rng.choice(["paris", "rome"], size=n),
+    })
+
+
+def test_sample_keeps_columns_and_dtypes(frame):
+    data = ReferenceStore(sample_size=200).add("m", frame)
+    sample = data.sample()
+    assert list(sample.columns) == ["ds", "value", "city"]
+    assert len(sample) == 200
+    assert sample["ds"].dtype.kind == "M"
+    assert set(sample["city"]) <= {"paris", "rome"}
+
+
+def test_datetime_columns_are_stored_as_numbers(frame):
+    data = ReferenceStore(sample_size=200).add("m", frame)
+    assert "ds" in data.numeric_columns
+    assert list(data.categories) == ["city"]
+    # Sampled timestamps are ones from the data, not categories of every distinct value
+    assert data.sample()["ds"].isin(frame["ds"]).all()
+    assert data.quantile_frame()["ds"].iloc[0] == 0.0
+
+
+def test_timezone_and_missing_datetimes_round_trip(frame):
+    frame["ds"] = frame["ds"].dt.tz_localize("UTC").dt.tz_convert("Europe/Berlin")
+    frame.loc[::50, "ds"] = pd.NaT
+    store = ReferenceStore(sample_size=500)
+    sample = store.add("m", frame).sample()
+    assert str(sample["ds"].dt.tz) == "Europe/Berlin"
+    assert sample["ds"].dropna().isin(frame["ds"]).all()
+
+
+def test_update_folds_in_later_datetimes(frame):
+    store = ReferenceStore(sample_size=200)
+    store.add("m", frame)
+    later = frame.assign(ds=frame["ds"] + pd.Timedelta(days=1000))
+    data = store.update("m", later)
+    assert data.sample()["ds"].max() > frame["ds"].max()
+
+
+def test_spilled_sample_round_trips(frame, tmp_path):
+    store = ReferenceStore(sample_size=100, spill_dir=str(tmp_path))
+    store.add("m", frame)
+    sample = store.background("m", n=50)
+    assert len(sample) == 50
+    assert sample["ds"].isin(frame["ds"]).all()
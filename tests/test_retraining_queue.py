@@ -0,0 +1,127 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from retraining_queue import FAILED, QUEUED, RUNNING, SUCCEEDED, RetrainingJobStore, RetrainingService
+
+
+def succeed(model_id, models_dir):
+    return "2"
+
+
+def fail(model_id, models_dir):
+    raise RuntimeError("no training data")
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = RetrainingJobStore(str(tmp_path / "jobs.db"))
+    yield store
+    store.close()
+
+
+def fail_job(store, model_id, finished_ago=0.0):
+    job, _ = store.enqueue(model_id)
+    store.claim_next()
+    store.finish(job["id"], error="boom")
+    finished_at = (datetime.now() - timedelta(seconds=finished_ago)).isoformat()
+    store._conn.execute("UPDATE jobs SET finished_at = ? WHERE id = ?", (finished_at, job["id"]))
+    return job
+
+
+def test_enqueue_deduplicates_queued_and_running_jobs(store):
+    job, created = store.enqueue("m", "drift")
+    assert created and job["status"] == QUEUED
+    again, created = store.enqueue("m", "manual")
+    assert not created and again["id"] == job["id"]
+
+    assert store.claim_next()["status"] == RUNNING
+    again, created = store.enqueue("m")
+    assert not created and again["id"] == job["id"]
+    # Other models are queued independently
+    assert store.enqueue("other")[1]
+
+    store.finish(job["id"], version="2")
+    assert store.get(job["id"])["status"] == SUCCEEDED
+    assert store.enqueue("m")[1]
+
+
+def test_recover_requeues_running_jobs(store):
+    job, _ = store.enqueue("m")
+    store.claim_next()
+    assert store.recover() == 1
+    claimed = store.claim_next()
+    assert claimed["id"] == job["id"] and claimed["attempts"] == 2
+
+
+def test_failure_streak_resets_after_success(store):
+    assert store.failure_streak("m") == (0, None)
+    fail_job(store, "m")
+    fail_job(store, "m")
+    assert store.failure_streak("m")[0] == 2
+    assert store.failure_streak("other")[0] == 0
+
+    job, _ = store.enqueue("m")
+    store.claim_next()
+    store.finish(job["id"], version="3")
+    assert store.failure_streak("m") == (0, None)
+
+
+def test_backoff_doubles_per_failure_up_to_maximum(store):
+    service = RetrainingService(store, failure_backoff_seconds=100, max_backoff_seconds=250)
+    assert service.backoff_remaining("m") == 0.0
+    fail_job(store, "m", finished_ago=10)
+    assert service.backoff_remaining("m") == pytest.approx(90, abs=1)
+    fail_job(store, "m", finished_ago=10)
+    assert service.backoff_remaining("m") == pytest.approx(190, abs=1)
+    fail_job(store, "m", finished_ago=10)
+    assert service.backoff_remaining("m") == pytest.approx(240, abs=1)
+    # Once the longest wait has passed since the latest failure, retraining may run again
+    finished_at = (datetime.now() - timedelta(seconds=300)).isoformat()
+    store._conn.execute("UPDATE jobs SET finished_at = ? WHERE model_id = ?", (finished_at, "m"))
+    assert service.backoff_remaining("m") == 0.0
+
+
+def test_backoff_disabled(store):
+    fail_job(store, "m")
+    assert RetrainingService(store, failure_backoff_seconds=0).backoff_remaining("m") == 0.0
+
+
+def run_service(store, trainer):
+    completed, failed = [], []
+
+    async def on_complete(model_id, version):
+        completed.append((model_id, version))
+
+    async def on_failure(model_id, error):
+        failed.append((model_id, error))
+
+    async def main():
+        service = RetrainingService(store, trainer=trainer, on_complete=on_complete, on_failure=on_failure)
+        await service.start()
+        job = service.submit("m", "test")
+        assert service.submit("m", "again")["deduplicated"]
+        try:
+            for _ in range(600):
+                if store.get(job["id"])["status"] in (SUCCEEDED, FAILED):
+                    break
+                await asyncio.sleep(0.05)
+        finally:
+            await service.stop()
+        return store.get(job["id"])
+
+    return asyncio.run(main()), completed, failed
+
+
+def test_service_runs_job_to_success(store):
+    job, completed, failed = run_service(store, succeed)
+    assert job["status"] == SUCCEEDED and job["version"] == "2"
+    assert completed == [("m", "2")] and failed == []
+
+
+def test_service_records_failure(store):
+    job, completed, failed = run_service(store, fail)
+    assert job["status"] == FAILED and "no training data" in job["error"]
+    assert completed == [] and failed[0][0] == "m"
+    assert store.failure_streak("m")[0] == 1